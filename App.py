@@ -1,10 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import plotly.graph_objects as go
-import json
-from datetime import datetime
+import hmac
+import os
+import time
+
+from etf_data import ETFS_FILE_PATH, file_signature
+from fees import resolve_swap_schedules
+from prices import (
+    DEFAULT_BATCH_FETCH_TIMEOUT_SECONDS, DEFAULT_FETCH_TIMEOUT_SECONDS, DEFAULT_TTL_SECONDS, PriceService,
+    wait_for_prices
+)
+from price_providers import provider_from_spec
+from quote_store import (
+    DEFAULT_RETENTION_DAYS as DEFAULT_QUOTE_RETENTION_DAYS, QUOTE_STORE_PATH as DEFAULT_QUOTE_STORE_PATH, QuoteStore,
+    StoreBackedProvider
+)
+from shared_data import SharedFile, load_broker_snapshot, load_universe_snapshot
+from telemetry import (
+    DEFAULT_PROFILE_KEEP, PROFILE_DIRECTORY as DEFAULT_PROFILE_DIRECTORY, profile, registry as metrics_registry, rerun as timed_rerun,
+    span, time_future
+)
 
 st.set_page_config(
     page_title="Simulateur d'Arbitrage d'ETFs - Tracking Difference",
@@ -12,8 +28,31 @@ st.set_page_config(
     layout="wide"
 )
 
-ETFS_FILE_PATH = "etfs_TD.csv"
 BROKERS_FILE_PATH = "courtiers.json"
+PRICE_TTL_SECONDS = int(os.environ.get("PRICE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+PRICE_FETCH_TIMEOUT_SECONDS = float(os.environ.get("PRICE_FETCH_TIMEOUT_SECONDS", DEFAULT_FETCH_TIMEOUT_SECONDS))
+PRICE_BATCH_FETCH_TIMEOUT_SECONDS = float(os.environ.get("PRICE_BATCH_FETCH_TIMEOUT_SECONDS",
+                                                         DEFAULT_BATCH_FETCH_TIMEOUT_SECONDS))
+QUOTE_STORE_PATH = os.environ.get("QUOTE_STORE_PATH", DEFAULT_QUOTE_STORE_PATH)
+# Âge maximal d'un cours stocké servi sans le fournisseur : par défaut le TTL du cache de prix
+QUOTE_MAX_AGE_SECONDS = int(os.environ.get("QUOTE_MAX_AGE_SECONDS", PRICE_TTL_SECONDS))
+QUOTE_RETENTION_DAYS = float(os.environ.get("QUOTE_RETENTION_DAYS", DEFAULT_QUOTE_RETENTION_DAYS))
+# Mode hors-ligne : uniquement les cours déjà stockés, aucun appel à yfinance
+# Chaîne de fournisseurs amont, ex : "replay:prix.csv,yfinance"
+PRICE_PROVIDERS = os.environ.get("PRICE_PROVIDERS", "yfinance")
+OFFLINE_MODE = os.environ.get("OFFLINE_MODE", "").lower() in ("1", "true", "yes")
+# Mesure des temps par réexécution : fichier de métriques (.json, sinon texte Prometheus)
+# et panneau de débogage (aussi activable par session avec ?timings=1 dans l'URL)
+METRICS_PATH = os.environ.get("METRICS_PATH")
+TIMINGS_PANEL = os.environ.get("TIMINGS_PANEL", "").lower() in ("1", "true", "yes")
+# Profil complet (cProfile) d'une réexécution : ?profile=<PROFILE_TOKEN> dans l'URL (une seule
+# fois, désactivé sans jeton), ou PROFILE_RERUNS=1 pour profiler toutes les réexécutions
+PROFILE_RERUNS = os.environ.get("PROFILE_RERUNS", "").lower() in ("1", "true", "yes")
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", DEFAULT_PROFILE_DIRECTORY)
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", DEFAULT_PROFILE_KEEP))
+# Nombre de scénarios de rentabilité mémorisés (cache LRU partagé par les sessions ; défaut : profitability_memo)
+PROFITABILITY_MEMO_ENTRIES = os.environ.get("PROFITABILITY_MEMO_ENTRIES")
 
 def load_custom_css():
     st.markdown("""
@@ -211,74 +250,117 @@ def render_custom_header():
     </div>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_shared_universe():
+    """Univers et index de recherche partagés par toutes les sessions, rechargés quand etfs_TD.csv change"""
+    return SharedFile(ETFS_FILE_PATH, load_universe_snapshot)
+
+@st.cache_resource
+def get_shared_brokers():
+    """Catalogue des courtiers et grilles compilées partagés par toutes les sessions"""
+    return SharedFile(BROKERS_FILE_PATH, load_broker_snapshot)
+
+def warn_if_stale(shared):
+    """Signale qu'une nouvelle version du fichier n'a pas pu être chargée (l'ancienne reste servie)"""
+    if shared.last_error is not None:
+        st.warning(f"{shared.path} n'a pas pu être rechargé, version précédente utilisée : {shared.last_error}")
+
 def load_etfs_data():
-    """Charge les données des ETFs depuis etfs_TD.csv"""
+    """Charge les données des ETFs depuis etfs_TD.csv (objet partagé en lecture seule)"""
+    shared = get_shared_universe()
     try:
-        df = pd.read_csv(ETFS_FILE_PATH, delimiter=',')
-        df['Ticker'] = df['Ticker'].str.strip()
-        
-        # Créer un dictionnaire avec les infos ETF
-        etf_info = {}
-        for _, row in df.iterrows():
-            ticker = row['Ticker']
-            
-            # Convertir la TD en nombre (les valeurs sont déjà en %, ex: "-2.011" = -2.011%)
-            td_str = str(row.get('Annualised_Tracking_Difference', '0')).strip()
-            td_str = td_str.replace(',', '.')  # Remplacer virgule par point
-            
-            try:
-                tracking_difference = float(td_str)  # Directement en %, pas besoin de conversion
-            except (ValueError, TypeError):
-                tracking_difference = 0.0
-            
-            # Convertir les frais en nombre (gérer les virgules et pourcentages)
-            frais_str = str(row.get('Frais', '0')).strip()
-            if frais_str.endswith('%'):
-                frais_str = frais_str[:-1]  # Enlever le %
-            frais_str = frais_str.replace(',', '.')  # Remplacer virgule par point
-            
-            try:
-                ter = float(frais_str)
-            except (ValueError, TypeError):
-                ter = 0.0
-            
-            etf_info[ticker] = {
-                'name': row.get('Nom du fonds', 'Nom inconnu'),
-                'tracking_difference': tracking_difference,
-                'ter': ter,
-                'isin': row.get('ISIN', 'ISIN inconnu'),
-                'index': row.get('Index', row.get('Réplication', 'Index inconnu'))  # Utiliser Réplication si Index n'existe pas
-            }
-        
-        return etf_info
+        etf_info = shared.current()['etf_info']
     except Exception as e:
         st.error(f"Erreur lors du chargement des ETFs : {e}")
         return {}
+    warn_if_stale(shared)
+    return etf_info
+
+def get_search_index():
+    """Index de recherche de l'univers chargé"""
+    return get_shared_universe().current()['search_index']
+
+def select_etf(label, key, search_index):
+    """
+    Champ de recherche (ticker, ISIN, nom) suivi d'une liste limitée aux meilleurs résultats
+    L'ETF déjà choisi reste dans la liste même s'il ne correspond plus à la recherche
+    """
+    query = st.text_input(label, key=f"{key}_search", placeholder="Rechercher : ticker, ISIN ou nom du fonds")
+    selected = st.session_state.get(key, "")
+    options = [""] + ([selected] if selected in search_index.labels else [])
+    options += [ticker for ticker in search_index.search(query) if ticker != selected]
+    return st.selectbox(
+        label,
+        options=options,
+        format_func=lambda x: search_index.labels[x] if x else "-- Sélectionnez un ETF --",
+        key=key,
+        label_visibility="collapsed"
+    )
 
 def load_broker_structures():
-    """Charge les structures de courtiers depuis le fichier JSON"""
+    """Charge les structures de courtiers depuis le fichier JSON (objet partagé en lecture seule)"""
+    shared = get_shared_brokers()
     try:
-        with open(BROKERS_FILE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        broker_structures = shared.current()['broker_structures']
     except FileNotFoundError:
         st.error(f"Fichier {BROKERS_FILE_PATH} non trouvé")
         return {}
     except Exception as e:
         st.error(f"Erreur lors du chargement des courtiers : {e}")
         return {}
+    warn_if_stale(shared)
+    return broker_structures
+
+def get_compiled_schedules(broker_structures):
+    """Grilles compilées partagées de ce catalogue (None s'il a été remplacé entre-temps : compilation à la volée)"""
+    snapshot = get_shared_brokers().current()
+    return snapshot['compiled_schedules'] if snapshot['broker_structures'] is broker_structures else None
+
+@st.cache_resource
+def get_price_service():
+    """Service de prix unique par processus, partagé entre toutes les sessions"""
+    # Cours lus d'abord sur disque, fournisseurs amont seulement pour les tickers absents ou trop anciens
+    provider = StoreBackedProvider(QuoteStore(QUOTE_STORE_PATH, retention_days=QUOTE_RETENTION_DAYS),
+                                   provider_from_spec(PRICE_PROVIDERS), max_age_seconds=QUOTE_MAX_AGE_SECONDS,
+                                   offline=OFFLINE_MODE)
+    return PriceService(provider, ttl_seconds=PRICE_TTL_SECONDS,
+                        fetch_timeout_seconds=PRICE_FETCH_TIMEOUT_SECONDS)
+
+@st.cache_resource
+def get_profitability_memo():
+    """Cache LRU unique par processus des calculs de rentabilité, partagé entre toutes les sessions"""
+    from profitability_memo import DEFAULT_MAX_ENTRIES, ProfitabilityMemo  # chargé au premier calcul
+    
+    return ProfitabilityMemo(max_entries=int(PROFITABILITY_MEMO_ENTRIES or DEFAULT_MAX_ENTRIES))
+
+def get_universe_prices(tickers, timeout=PRICE_BATCH_FETCH_TIMEOUT_SECONDS):
+    """Récupère les derniers prix de plusieurs ETFs en un seul téléchargement groupé (cache TTL)"""
+    service = get_price_service()
+    prices = service.get_prices(tickers, timeout=timeout)
+    errors = service.errors([ticker for ticker in tickers if ticker not in prices])
+    if errors:
+        st.error(f"Erreur lors de la récupération des prix ({len(errors)} ETFs) : {next(iter(errors.values()))}")
+    return prices
 
 def get_etf_price(ticker):
-    """Récupère le prix actuel d'un ETF via yfinance"""
-    try:
-        etf = yf.Ticker(ticker)
-        hist = etf.history(period="1d")
-        if not hist.empty:
-            return hist['Close'].iloc[-1]
-        else:
-            return None
-    except Exception as e:
-        st.error(f"Erreur lors de la récupération du prix pour {ticker}: {e}")
+    """Récupère le prix actuel d'un ETF via le service de prix"""
+    with span("get_etf_price"):
+        return get_universe_prices([ticker], PRICE_FETCH_TIMEOUT_SECONDS).get(ticker)
+
+def submit_etf_price(ticker):
+    """Lance la récupération du prix d'un ETF sans attendre le résultat"""
+    if not ticker:
         return None
+    # Mesuré de la soumission à la réception : même span que get_etf_price
+    return time_future("get_etf_price", get_price_service().submit_price(ticker, PRICE_FETCH_TIMEOUT_SECONDS))
+
+def collect_etf_prices(tickers, price_futures):
+    """Attend ensemble plusieurs demandes de prix ; un prix non obtenu à temps vaut 0 (affiché N/A)"""
+    prices = wait_for_prices(price_futures, timeout=PRICE_FETCH_TIMEOUT_SECONDS)
+    errors = get_price_service().errors([ticker for ticker, price in zip(tickers, prices) if ticker and price is None])
+    for ticker, error in errors.items():
+        st.error(f"Erreur lors de la récupération du prix pour {ticker}: {error}")
+    return [price or 0 for price in prices]
 
 def format_td_display(td_value):
     """Formate l'affichage de la TD avec couleur appropriée"""
@@ -289,174 +371,6 @@ def format_td_display(td_value):
     else:
         return f'<span class="td-neutral">{td_value:.2f}%</span>'
 
-def calculate_fees(amount, broker_name, grille_name, broker_structures, custom_fee=None, custom_fee_type=None):
-    """Calcule les frais selon la structure tarifaire ou les frais personnalisés"""
-    
-    # Si frais personnalisés
-    if broker_name == "Personnalisé" and custom_fee is not None and custom_fee_type is not None:
-        if custom_fee_type == "fixed":
-            return custom_fee
-        elif custom_fee_type == "percentage":
-            return amount * custom_fee / 100
-    
-    # Sinon, utiliser la structure tarifaire classique
-    if broker_name not in broker_structures or grille_name not in broker_structures[broker_name]["grilles"]:
-        return 0
-    
-    grille = broker_structures[broker_name]["grilles"][grille_name]
-    
-    if grille["type"] == "simple":
-        if grille["fee_type"] == "fixed":
-            return grille["fee"]
-        elif grille["fee_type"] == "percentage":
-            return amount * grille["fee"] / 100
-    
-    elif grille["type"] == "paliers":
-        for palier in grille["paliers"]:
-            if palier["min"] <= amount < palier["max"]:
-                if palier["fee_type"] == "fixed":
-                    return palier["fee"]
-                elif palier["fee_type"] == "percentage":
-                    fee = amount * palier["fee"] / 100
-                    return max(fee, palier.get("min_fee", 0))
-    
-    elif grille["type"] == "mixed":
-        if amount <= grille["threshold"]:
-            return grille["fixed"]
-        else:
-            return amount * grille["percentage"] / 100
-    
-    return 0
-
-def calculate_optimal_etf2_purchase(net_amount_after_sell, etf2_price, broker_name, grille_name, broker_structures, custom_buy_fee=None, custom_buy_fee_type=None):
-    """
-    Détermine le nombre optimal de parts ETF2 à acheter
-    en s'assurant que les liquidités restantes couvrent les frais d'achat
-    """
-    
-    # Vérification préliminaire : peut-on acheter au moins 1 part ?
-    if net_amount_after_sell < etf2_price:
-        return {
-            'etf2_shares': 0,
-            'purchase_amount': 0.0,
-            'buy_fees': 0.0,
-            'remaining_cash': net_amount_after_sell,
-            'total_cost': 0.0,
-            'impossible_purchase': True
-        }
-    
-    # Nombre maximum théorique de parts qu'on pourrait acheter
-    max_possible_shares = int(net_amount_after_sell / etf2_price)
-    
-    # On teste en partant du maximum et on descend jusqu'à trouver une solution viable
-    for etf2_shares in range(max_possible_shares, 0, -1):
-        
-        # Montant nécessaire pour acheter ces parts
-        purchase_amount = etf2_shares * etf2_price
-        
-        # Frais d'achat pour ce montant
-        buy_fees = calculate_fees(purchase_amount, broker_name, grille_name, broker_structures, custom_buy_fee, custom_buy_fee_type)
-        
-        # Liquidités restantes après achat + frais
-        remaining_cash = net_amount_after_sell - purchase_amount - buy_fees
-        
-        # Si on a assez de liquidités (pas de découvert), c'est bon !
-        if remaining_cash >= 0:
-            return {
-                'etf2_shares': etf2_shares,
-                'purchase_amount': purchase_amount,
-                'buy_fees': buy_fees,
-                'remaining_cash': remaining_cash,
-                'total_cost': purchase_amount + buy_fees,
-                'impossible_purchase': False
-            }
-    
-    # Si même 1 part ne peut pas être achetée (frais trop élevés)
-    return {
-        'etf2_shares': 0,
-        'purchase_amount': 0.0,
-        'buy_fees': 0.0,
-        'remaining_cash': net_amount_after_sell,
-        'total_cost': 0.0,
-        'impossible_purchase': True
-    }
-
-def calculate_replacement_profitability_td(etf1_shares, etf1_price, etf1_td, 
-                                         etf2_price, etf2_td, broker_name, grille_name, broker_structures,
-                                         custom_sell_fee=None, custom_sell_fee_type=None,
-                                         custom_buy_fee=None, custom_buy_fee_type=None):
-    """
-    Calcule la rentabilité du remplacement basée sur la Tracking Difference
-    """
-    
-    # 1. Vente de tous les ETF1
-    sell_amount = etf1_shares * etf1_price
-    
-    # 2. Frais de vente
-    sell_fees = calculate_fees(sell_amount, broker_name, grille_name, broker_structures, custom_sell_fee, custom_sell_fee_type)
-    
-    # 3. Montant net après vente
-    net_amount_after_sell = sell_amount - sell_fees
-    
-    # 4. Calcul optimal du nombre d'ETF2 à acheter
-    purchase_result = calculate_optimal_etf2_purchase(
-        net_amount_after_sell, etf2_price, broker_name, grille_name, broker_structures,
-        custom_buy_fee, custom_buy_fee_type
-    )
-    
-    # 5. Gestion du cas où aucun achat n'est possible
-    if purchase_result.get('impossible_purchase', False):
-        return {
-            'sell_amount': sell_amount,
-            'sell_fees': sell_fees,
-            'net_after_sell': net_amount_after_sell,
-            'etf2_shares': 0,
-            'purchase_amount': 0.0,
-            'buy_fees': 0.0,
-            'remaining_cash': net_amount_after_sell,
-            'total_transaction_cost': sell_fees,
-            'annual_performance_etf1': 0.0,
-            'annual_performance_etf2': 0.0,
-            'annual_performance_gain': 0.0,
-            'payback_years': float('inf'),
-            'payback_months': float('inf'),
-            'impossible_replacement': True,
-            'reason': f"Impossible d'acheter même 1 part ETF2 (prix: {etf2_price:.2f}€, disponible: {net_amount_after_sell:.2f}€)"
-        }
-    
-    # 6. Gain annuel basé sur la TD (seulement si achat possible)
-    # Les valeurs TD sont déjà en %, donc on divise par 100 pour les calculs
-    # TD positive = surperformance du benchmark
-    annual_performance_etf1 = sell_amount * (etf1_td / 100)
-    annual_performance_etf2 = purchase_result['purchase_amount'] * (etf2_td / 100)
-    annual_performance_gain = annual_performance_etf2 - annual_performance_etf1
-    
-    # 7. Temps pour rentabiliser
-    total_transaction_cost = sell_fees + purchase_result['buy_fees']
-    if annual_performance_gain > 0:
-        payback_years = total_transaction_cost / annual_performance_gain
-        payback_months = payback_years * 12
-    else:
-        payback_years = float('inf')
-        payback_months = float('inf')
-    
-    return {
-        'sell_amount': sell_amount,
-        'sell_fees': sell_fees,
-        'net_after_sell': net_amount_after_sell,
-        'etf2_shares': purchase_result['etf2_shares'],
-        'purchase_amount': purchase_result['purchase_amount'],
-        'buy_fees': purchase_result['buy_fees'],
-        'remaining_cash': purchase_result['remaining_cash'],
-        'total_transaction_cost': total_transaction_cost,
-        'annual_performance_etf1': annual_performance_etf1,
-        'annual_performance_etf2': annual_performance_etf2,
-        'annual_performance_gain': annual_performance_gain,
-        'payback_years': payback_years,
-        'payback_months': payback_months,
-        'impossible_replacement': False
-    }
-
 def render_grille_display(grille_name, grille_data):
     """Affiche une grille tarifaire de manière lisible"""
     st.markdown(f"""
@@ -487,13 +401,527 @@ def render_grille_display(grille_name, grille_data):
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+def render_screener(etfs_data, etf1_ticker, etf1_shares, etf1_price,
+                    broker_name, grille_name, broker_structures,
+                    custom_sell_fee=None, custom_sell_fee_type=None,
+                    custom_buy_fee=None, custom_buy_fee_type=None):
+    """Affiche le screener des meilleurs remplacements de l'ETF 1 sur tout l'univers"""
+    with st.expander(f"🔎 Screener : meilleurs remplacements pour {etf1_ticker}"):
+        top_k = st.slider("Nombre de remplacements affichés", min_value=5, max_value=100, value=20, key="screener_top_k")
+        
+        if not st.button("Analyser tout l'univers", key="screener_run"):
+            return
+        
+        from screener import build_universe, screen_holding  # chargé à la première analyse seulement
+        
+        prices = get_universe_prices(tuple(etfs_data.keys()))
+        # Le prix affiché de l'ETF 1 fait foi pour la vente
+        prices = {**prices, etf1_ticker: etf1_price}
+        universe = build_universe(etfs_data, prices)
+        sell_schedule, buy_schedule = resolve_swap_schedules(
+            broker_name, grille_name, broker_structures,
+            custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type,
+            get_compiled_schedules(broker_structures)
+        )
+        
+        start = time.perf_counter()
+        ranking = screen_holding(universe, etf1_ticker, etf1_shares, sell_schedule, buy_schedule, top_k)
+        elapsed = time.perf_counter() - start
+        
+        st.caption(f"{int(np.isfinite(universe['price']).sum())} ETFs avec prix évalués en {elapsed * 1000:.0f} ms")
+        if ranking.empty:
+            st.info("Aucun remplacement rentable trouvé")
+            return
+        
+        ranking['name'] = [etfs_data[ticker]['name'] for ticker in ranking['etf2']]
+        st.dataframe(
+            ranking[['etf2', 'name', 'etf2_shares', 'total_transaction_cost', 'remaining_cash',
+                     'annual_performance_gain', 'payback_months']].rename(columns={
+                'etf2': "ETF 2",
+                'name': "Nom du fonds",
+                'etf2_shares': "Parts ETF2",
+                'total_transaction_cost': "Frais totaux (€)",
+                'remaining_cash': "Liquidité restante (€)",
+                'annual_performance_gain': "Gain annuel (€)",
+                'payback_months': "Rentabilisé en (mois)",
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def render_broker_comparison(etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td, broker_structures,
+                             custom_sell_fee=None, custom_sell_fee_type=None,
+                             custom_buy_fee=None, custom_buy_fee_type=None):
+    """Affiche l'arbitrage choisi évalué sur tous les courtiers et toutes les grilles"""
+    with st.expander("🏦 Comparer tous les courtiers"):
+        from broker_comparison import compare_brokers  # chargé une fois deux ETFs choisis
+        
+        comparison = compare_brokers(
+            etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td, broker_structures,
+            custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type,
+            get_compiled_schedules(broker_structures)
+        )
+        st.dataframe(
+            comparison.rename(columns={
+                'broker': "Courtier",
+                'grille': "Grille",
+                'sell_fees': "Frais de vente (€)",
+                'buy_fees': "Frais d'achat (€)",
+                'total_transaction_cost': "Frais totaux (€)",
+                'etf2_shares': "Parts ETF2",
+                'remaining_cash': "Liquidité restante (€)",
+                'annual_performance_gain': "Gain annuel (€)",
+                'payback_months': "Rentabilisé en (mois)",
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def payback_sensitivity_cached(etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td, max_delta, axis,
+                               broker_name, grille_name, _broker_structures, brokers_signature,
+                               custom_sell_fee=None, custom_sell_fee_type=None,
+                               custom_buy_fee=None, custom_buy_fee_type=None):
+    """Grille (parts, variations, délais en mois) de la carte de sensibilité, mémorisée pour des entrées identiques"""
+    from sensitivity import DEFAULT_GRID_SIZE, payback_sensitivity, shares_grid  # chargé à la première carte
+    
+    sell_schedule, buy_schedule = resolve_swap_schedules(
+        broker_name, grille_name, _broker_structures,
+        custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type,
+        get_compiled_schedules(_broker_structures)
+    )
+    shares = shares_grid(etf1_shares)
+    deltas = np.linspace(-max_delta, max_delta, DEFAULT_GRID_SIZE)
+    # Pour l'axe TD, une amplitude de 20 correspond à ±2 points
+    if axis == 'td':
+        deltas = deltas / 10
+    payback_months = payback_sensitivity(
+        shares, etf1_price, etf1_td, etf2_price, etf2_td, sell_schedule, buy_schedule, deltas, axis
+    )
+    return shares, deltas, payback_months
+
+def render_payback_sensitivity(etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+                               broker_name, grille_name, broker_structures,
+                               custom_sell_fee=None, custom_sell_fee_type=None,
+                               custom_buy_fee=None, custom_buy_fee_type=None):
+    """Carte de chaleur du délai de rentabilisation (taille de position x variation prix/TD de l'ETF2)"""
+    with st.expander("🌡️ Sensibilité du délai de rentabilisation"):
+        col1, col2 = st.columns(2)
+        with col1:
+            axis_label = st.radio(
+                "Variation étudiée",
+                options=["Prix de l'ETF2 (%)", "TD de l'ETF2 (points)"],
+                horizontal=True,
+                key="sensitivity_axis"
+            )
+        with col2:
+            max_delta = st.slider("Amplitude de la variation", min_value=1, max_value=50, value=20, key="sensitivity_delta")
+        axis = 'price' if axis_label.startswith("Prix") else 'td'
+        
+        # Grille et graphique seulement sur demande : rien n'est calculé ni envoyé aux autres réexécutions
+        if not st.button("Afficher la carte", key="sensitivity_run"):
+            return
+        
+        shares, deltas, payback_months = payback_sensitivity_cached(
+            etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td, max_delta, axis,
+            broker_name, grille_name, broker_structures, file_signature(BROKERS_FILE_PATH),
+            custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type
+        )
+        
+        import plotly.graph_objects as go  # chargé au premier graphique seulement
+        
+        # Les arbitrages jamais rentables sont laissés en blanc ; l'échelle est plafonnée à 10 ans
+        z = np.where(np.isfinite(payback_months), np.minimum(payback_months, 120), np.nan)
+        fig = go.Figure(go.Heatmap(
+            x=shares * etf1_price,
+            y=deltas,
+            z=z,
+            colorscale="RdYlGn_r",
+            colorbar=dict(title="Mois"),
+            hovertemplate="Position : %{x:,.0f}€<br>Variation : %{y:.2f}<br>Rentabilisé en %{z:.1f} mois<extra></extra>"
+        ))
+        fig.update_layout(
+            xaxis_title="Montant de la position ETF1 (€)",
+            yaxis_title=axis_label,
+            height=450,
+            margin=dict(l=40, r=20, t=20, b=40)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+def render_td_monte_carlo(etf1_ticker, etf1_shares, etf1_price, etf1_td, etf2_ticker, etf2_price, etf2_td,
+                          broker_name, grille_name, broker_structures,
+                          custom_sell_fee=None, custom_sell_fee_type=None,
+                          custom_buy_fee=None, custom_buy_fee_type=None):
+    """Distribution du délai de rentabilisation quand les TD futures sont incertaines"""
+    with st.expander("🎲 Incertitude sur la TD (Monte Carlo)"):
+        from monte_carlo import DEFAULT_HORIZON_YEARS, simulate_swap, summarise_simulation  # chargé une fois deux ETFs choisis
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            etf1_td_std = st.number_input("Écart-type TD ETF1 (points)", min_value=0.0, value=0.2, step=0.05, key="mc_etf1_std")
+            etf2_td_std = st.number_input("Écart-type TD ETF2 (points)", min_value=0.0, value=0.2, step=0.05, key="mc_etf2_std")
+        with col2:
+            correlation = st.slider("Corrélation des TD", min_value=-1.0, max_value=1.0, value=0.5, step=0.05, key="mc_correlation")
+            distribution_label = st.radio("Loi des TD", options=["Normale", "Student (queues épaisses)"], key="mc_distribution")
+        with col3:
+            n_paths = st.select_slider("Trajectoires", options=[10_000, 100_000, 1_000_000], value=100_000, key="mc_paths")
+            horizon_years = st.slider("Horizon (années)", min_value=1, max_value=30, value=DEFAULT_HORIZON_YEARS, key="mc_horizon")
+            seed = st.number_input("Graine", min_value=0, value=42, step=1, key="mc_seed")
+        
+        if not st.button("Lancer la simulation", key="mc_run"):
+            return
+        
+        swap = get_profitability_memo().calculate(
+            etf1_ticker, etf2_ticker, etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+            broker_name, grille_name, broker_structures,
+            custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type,
+            get_compiled_schedules(broker_structures)
+        )
+        if swap.get('impossible_replacement', False):
+            st.error(f"🚫 {swap['reason']}")
+            return
+        
+        distribution = 'normal' if distribution_label == "Normale" else 'student_t'
+        start = time.perf_counter()
+        months, net_gains = simulate_swap(
+            swap, etf1_td, etf2_td, etf1_td_std, etf2_td_std, correlation, distribution,
+            n_paths=n_paths, horizon_years=horizon_years, seed=int(seed)
+        )
+        elapsed = time.perf_counter() - start
+        summary = summarise_simulation(months, net_gains, horizon_years)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Probabilité de rentabiliser", f"{summary['probability_break_even']:.1%}")
+        with col2:
+            st.metric("Délai médian", f"{summary['break_even_months_percentiles'][50]:.1f} mois")
+        with col3:
+            st.metric("Délai (95e centile)", f"{summary['break_even_months_percentiles'][95]:.1f} mois")
+        with col4:
+            st.metric(f"Gain net moyen à {horizon_years} ans", f"{summary['net_gain_mean']:,.2f}€")
+        
+        import plotly.graph_objects as go  # chargé au premier graphique seulement
+        
+        # Histogramme calculé ici : le navigateur reçoit 60 barres, pas une valeur par trajectoire
+        counts, edges = np.histogram(months[np.isfinite(months)], bins=60)
+        fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                               marker_color="#667eea"))
+        fig.update_layout(
+            xaxis_title="Délai de rentabilisation (mois)",
+            yaxis_title="Trajectoires",
+            height=350,
+            margin=dict(l=40, r=20, t=20, b=40)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{summary['paths']:,} trajectoires simulées en {elapsed:.2f}s · "
+                   f"probabilité de perte à {horizon_years} ans : {summary['probability_loss']:.1%}")
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def evaluate_portfolio_cached(_etfs_data, etfs_signature, prices, holdings, max_payback_months,
+                              broker_name, grille_name, _broker_structures, brokers_signature,
+                              custom_sell_fee=None, custom_sell_fee_type=None,
+                              custom_buy_fee=None, custom_buy_fee_type=None):
+    """Évaluation du portefeuille, mémorisée pour des entrées identiques (reruns, retours en arrière)"""
+    from portfolio import evaluate_portfolio  # chargé à la première analyse seulement
+    from screener import build_universe
+    
+    universe = build_universe(_etfs_data, prices)
+    sell_schedule, buy_schedule = resolve_swap_schedules(
+        broker_name, grille_name, _broker_structures,
+        custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type,
+        get_compiled_schedules(_broker_structures)
+    )
+    return evaluate_portfolio(universe, holdings, sell_schedule, buy_schedule, max_payback_months)
+
+def render_portfolio(etfs_data, broker_name, grille_name, broker_structures,
+                     custom_sell_fee=None, custom_sell_fee_type=None,
+                     custom_buy_fee=None, custom_buy_fee_type=None):
+    """Affiche le mode portefeuille : meilleur remplacement de chaque ligne et agrégats"""
+    with st.expander("📁 Portefeuille multi-lignes"):
+        holdings_df = st.data_editor(
+            pd.DataFrame({"Ticker": pd.Series([], dtype="object"), "Parts": pd.Series([], dtype="int64")}),
+            num_rows="dynamic",
+            column_config={
+                "Ticker": st.column_config.SelectboxColumn("Ticker", options=list(etfs_data.keys()), required=True),
+                "Parts": st.column_config.NumberColumn("Parts", min_value=0, step=1, required=True),
+            },
+            use_container_width=True,
+            key="portfolio_holdings"
+        )
+        max_payback_months = st.number_input(
+            "Délai de rentabilisation maximal (mois)",
+            min_value=1,
+            value=36,
+            step=1,
+            key="portfolio_max_payback"
+        )
+        
+        if st.button("Analyser le portefeuille", key="portfolio_run"):
+            holdings = tuple(
+                (ticker, int(shares)) for ticker, shares in zip(holdings_df["Ticker"], holdings_df["Parts"])
+                if ticker and pd.notna(shares) and shares > 0
+            )
+            prices = get_universe_prices(tuple(etfs_data.keys()))
+            st.session_state['portfolio_result'] = evaluate_portfolio_cached(
+                etfs_data, file_signature(ETFS_FILE_PATH), prices, holdings, max_payback_months,
+                broker_name, grille_name, broker_structures, file_signature(BROKERS_FILE_PATH),
+                custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type
+            )
+        
+        if 'portfolio_result' not in st.session_state:
+            return
+        
+        lines, summary = st.session_state['portfolio_result']
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Lignes remplacées", f"{summary['replaced_lines']} / {summary['lines']}")
+        col2.metric("Frais totaux", f"{summary['total_transaction_cost']:,.2f}€")
+        col3.metric("Liquidité non réinvestie", f"{summary['cash_drag']:,.2f}€",
+                    help=f"{summary['cash_drag_percent']:.3f}% du portefeuille")
+        if summary['payback_months'] != float('inf'):
+            col4.metric("Rentabilisé en", f"{summary['payback_months']:.1f} mois")
+        else:
+            col4.metric("Rentabilisé en", "Jamais")
+        if summary['skipped']:
+            st.warning(f"Lignes ignorées (prix ou ETF inconnu) : {', '.join(summary['skipped'])}")
+        
+        st.dataframe(
+            lines.rename(columns={
+                'etf1': "ETF détenu",
+                'etf1_shares': "Parts",
+                'etf1_price': "Prix (€)",
+                'position_value': "Valeur (€)",
+                'etf2': "Remplacement",
+                'etf2_shares': "Parts ETF2",
+                'total_transaction_cost': "Frais totaux (€)",
+                'remaining_cash': "Liquidité restante (€)",
+                'annual_performance_gain': "Gain annuel (€)",
+                'payback_months': "Rentabilisé en (mois)",
+                'replace': "Remplacer",
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def render_results(results, etf1_ticker, etf1_shares, etf1_td, etf1_ter,
+                   etf2_ticker, etf2_price, etf2_td, etf2_ter):
+    """Affiche le résultat détaillé du calcul de rentabilité"""
+    st.markdown("---")
+    st.header("📊 Résultats de l'Analyse")
+    
+    # Gestion du cas impossible
+    if results.get('impossible_replacement', False):
+        st.error("🚫 **REMPLACEMENT IMPOSSIBLE**")
+        st.error(f"**Raison :** {results['reason']}")
+        
+        # Affichage simplifié pour le cas impossible
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric(
+                label="💰 Montant de vente",
+                value=f"{results['sell_amount']:,.2f}€"
+            )
+        
+        with col2:
+            st.metric(
+                label="💸 Frais de vente",
+                value=f"{results['sell_fees']:,.2f}€"
+            )
+        
+        with col3:
+            st.metric(
+                label="💵 Liquidité disponible",
+                value=f"{results['net_after_sell']:,.2f}€"
+            )
+        
+        st.warning(f"💡 **Solution :** Augmentez le nombre de parts d'ETF1 ou choisissez un ETF2 moins cher (prix actuel: {etf2_price:.2f}€)")
+        return
+    
+    # Métriques principales (cas normal)
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric(
+            label="💰 Montant de vente",
+            value=f"{results['sell_amount']:,.2f}€"
+        )
+    
+    with col2:
+        st.metric(
+            label="💸 Frais totaux",
+            value=f"{results['total_transaction_cost']:,.2f}€"
+        )
+    
+    with col3:
+        st.metric(
+            label="📈 Parts ETF2",
+            value=f"{results['etf2_shares']:.0f}"
+        )
+    
+    with col4:
+        st.metric(
+            label="💵 Liquidité restante",
+            value=f"{results['remaining_cash']:,.2f}€"
+        )
+    
+    with col5:
+        delta_color = "normal" if results['annual_performance_gain'] > 0 else "inverse"
+        st.metric(
+            label="📈 Gain de performance annuel",
+            value=f"{results['annual_performance_gain']:,.2f}€",
+            delta=f"{results['annual_performance_gain']:+.2f}€" if results['annual_performance_gain'] != 0 else None,
+            delta_color=delta_color
+        )
+    
+    # Seuil de rentabilité en ligne séparée
+    st.markdown("### ⏱️ Seuil de rentabilité")
+    if results['annual_performance_gain'] > 0 and results['payback_months'] != float('inf'):
+        if results['payback_months'] < 12:
+            st.success(f"**Rentable en {results['payback_months']:.2f} mois**")
+        else:
+            st.info(f"**Rentable en {results['payback_years']:.2f} ans**")
+    else:
+        st.error("**❌ Jamais rentable**")
+
+    # Recommandation basée sur la TD
+    if results['annual_performance_gain'] > 0:     
+        if results['payback_months'] < 12:
+            st.success(f"✅ **Recommandation : REMPLACER** - Rentable en {results['payback_months']:.1f} mois grâce à la meilleure TD")
+        elif results['payback_years'] < 3:
+            st.warning(f"⚠️ **Recommandation : À CONSIDÉRER** - Rentable en {results['payback_years']:.1f} ans")
+        else:
+            st.error(f"❌ **Recommandation : NE PAS REMPLACER** - Rentable seulement après {results['payback_years']:.1f} ans")
+    else:
+        st.error("❌ **Ce remplacement n'est jamais rentable** - L'ETF2 a une TD moins favorable que l'ETF1")
+    
+    # Détails de l'opération
+    st.subheader("🔍 Détail de l'Opération")
+    
+    details_data = {
+        "Élément": [
+            f"💼 Vente {etf1_shares:.0f} parts {etf1_ticker}",
+            f"💸 Frais de vente",
+            f"💰 Net après vente",
+            f"📊 Prix ETF2 ({etf2_ticker})",
+            f"📈 Parts ETF2 optimales",
+            f"💰 Montant achat ETF2",
+            f"💸 Frais d'achat ETF2",
+            f"💵 Liquidité finale restante"
+        ],
+        "Montant": [
+            f"{results['sell_amount']:,.2f}€",
+            f"-{results['sell_fees']:,.2f}€",
+            f"{results['net_after_sell']:,.2f}€",
+            f"{etf2_price:.2f}€/part",
+            f"{results['etf2_shares']:.0f} parts",
+            f"{results['purchase_amount']:,.2f}€",
+            f"-{results['buy_fees']:,.2f}€",
+            f"{results['remaining_cash']:,.2f}€"
+        ]
+    }
+    
+    details_df = pd.DataFrame(details_data)
+    st.dataframe(details_df, use_container_width=True, hide_index=True)
+    
+    # Résumé des frais de courtage
+    st.subheader("💸 Détail des Frais de Courtage")
+    
+    fees_summary_data = {
+        "Type d'opération": ["Vente ETF1", "Achat ETF2", "Total"],
+        "Montant de l'opération": [
+            f"{results['sell_amount']:,.2f}€",
+            f"{results['purchase_amount']:,.2f}€",
+            f"{results['sell_amount']:,.2f}€"
+        ],
+        "Frais": [
+            f"{results['sell_fees']:,.2f}€",
+            f"{results['buy_fees']:,.2f}€",
+            f"{results['total_transaction_cost']:,.2f}€"
+        ],
+        "% du montant": [
+            f"{(results['sell_fees']/results['sell_amount']*100):.3f}%",
+            f"{(results['buy_fees']/results['purchase_amount']*100 if results['purchase_amount'] > 0 else 0):.3f}%",
+            f"{(results['total_transaction_cost']/results['sell_amount']*100):.3f}%"
+        ]
+    }
+    
+    fees_summary_df = pd.DataFrame(fees_summary_data)
+    st.dataframe(fees_summary_df, use_container_width=True, hide_index=True)
+    
+    # Comparaison des Tracking Differences
+    st.subheader("📊 Comparaison des Tracking Differences")
+    
+    td_data = {
+        "ETF": [etf1_ticker, etf2_ticker, "Différence"],
+        "Tracking Difference (%)": [
+            f"{etf1_td:+.2f}%",
+            f"{etf2_td:+.2f}%",
+            f"{etf2_td - etf1_td:+.2f}%"
+        ],
+        "Capital investi": [
+            f"{results['sell_amount']:,.2f}€",
+            f"{results['purchase_amount']:,.2f}€",
+            f"{results['sell_amount'] - results['purchase_amount']:+,.2f}€"
+        ],
+        "Performance annuelle estimée": [
+            f"{results['annual_performance_etf1']:+,.2f}€",
+            f"{results['annual_performance_etf2']:+,.2f}€",
+            f"{results['annual_performance_gain']:+,.2f}€"
+        ],
+        "TER (pour info)": [
+            f"{etf1_ter:.2f}%",
+            f"{etf2_ter:.2f}%",
+            f"{etf2_ter - etf1_ter:+.2f}%"
+        ]
+    }
+    
+    td_df = pd.DataFrame(td_data)
+    st.dataframe(td_df, use_container_width=True, hide_index=True)
+
+def render_timings_panel(spans):
+    """Panneau de débogage : temps de la réexécution courante et histogrammes du processus"""
+    with st.expander("⏱️ Temps d'exécution (débogage)"):
+        st.dataframe(pd.DataFrame({
+            "Portion": [name for name, _ in spans],
+            "Durée (ms)": [seconds * 1000 for _, seconds in spans],
+        }), use_container_width=True, hide_index=True)
+        summary = metrics_registry.summary()
+        st.caption("Depuis le démarrage du processus")
+        st.dataframe(pd.DataFrame({
+            "Portion": list(summary),
+            "Appels": [stats['count'] for stats in summary.values()],
+            "Moyenne (ms)": [stats['mean'] * 1000 for stats in summary.values()],
+            "p50 (ms, ≤)": [stats['p50'] * 1000 for stats in summary.values()],
+            "p95 (ms, ≤)": [stats['p95'] * 1000 for stats in summary.values()],
+            "Max (ms)": [stats['max'] * 1000 for stats in summary.values()],
+        }), use_container_width=True, hide_index=True)
+
+def render_profile_summary(result):
+    """Résumé dans la barre latérale du dernier profil de la session"""
+    st.sidebar.markdown("**🔬 Profil de la réexécution**")
+    if not result['profiled']:
+        st.sidebar.caption("Un autre profil était en cours dans le processus : réexécution non profilée")
+        return
+    if result['path'] is None:
+        st.sidebar.caption(f"{result['seconds'] * 1000:.0f} ms, profil complet non enregistré : {result['error']}")
+    else:
+        st.sidebar.caption(f"{result['seconds'] * 1000:.0f} ms, profil complet : {result['path']}")
+    st.sidebar.dataframe(pd.DataFrame({
+        "Fonction": [row['function'] for row in result['top']],
+        "Appels": [row['calls'] for row in result['top']],
+        "Temps propre (ms)": [row['tottime'] * 1000 for row in result['top']],
+        "Cumulé (ms)": [row['cumtime'] * 1000 for row in result['top']],
+    }), hide_index=True)
+
 def main():
     load_custom_css()
     render_custom_header()
     
     # Charger les données ETF et courtiers
-    etfs_data = load_etfs_data()
-    broker_structures = load_broker_structures()
+    with span("load_etfs_data"):
+        etfs_data = load_etfs_data()
+    with span("load_broker_structures"):
+        broker_structures = load_broker_structures()
     
     if not etfs_data:
         st.error("Impossible de charger les données des ETFs")
@@ -503,6 +931,21 @@ def main():
         st.error("Impossible de charger les données des courtiers")
         return
     
+    st.sidebar.caption(f"Univers : {len(etfs_data)} ETFs chargés en {get_shared_universe().current()['load_seconds'] * 1000:.1f} ms"
+                       f" (partagé par toutes les sessions)")
+    if OFFLINE_MODE:
+        st.sidebar.warning("Mode hors-ligne : prix issus du stockage local uniquement")
+    price_stats = get_price_service().stats()
+    st.sidebar.caption(
+        f"Cache des prix : {price_stats['hits']} hits, {price_stats['stale_hits']} périmés servis, "
+        f"{price_stats['misses']} misses, {price_stats['fetches']} téléchargements"
+    )
+    memo_stats = get_profitability_memo().stats()
+    st.sidebar.caption(
+        f"Cache des calculs : {memo_stats['hits']} hits, {memo_stats['misses']} misses, "
+        f"{memo_stats['size']}/{memo_stats['max_entries']} scénarios, {memo_stats['evictions']} évincés"
+    )
+    
     st.header("🎯 Configuration de l'Arbitrage")
     
     # Section ETFs
@@ -512,13 +955,8 @@ def main():
     col1, col2, col3, col4, col5 = st.columns([3, 1.2, 1.2, 1.2, 1.2])
     
     with col1:
-        etf_tickers = [""] + list(etfs_data.keys())
-        etf1_ticker = st.selectbox(
-            "ETF 1 (à remplacer)",
-            options=etf_tickers,
-            format_func=lambda x: f"{x} - {etfs_data.get(x, {}).get('isin', 'N/A')} - {etfs_data.get(x, {}).get('name', 'N/A')}" if x else "-- Sélectionnez un ETF --",
-            key="etf1_select"
-        )
+        search_index = get_search_index()
+        etf1_ticker = select_etf("ETF 1 (à remplacer)", "etf1_select", search_index)
     
     with col2:
         etf1_shares = st.number_input(
@@ -530,16 +968,9 @@ def main():
         )
     
     with col3:
-        if etf1_ticker:
-            etf1_price = get_etf_price(etf1_ticker)
-            if etf1_price:
-                st.metric("Prix", f"{etf1_price:.2f}€")
-            else:
-                st.metric("Prix", "N/A")
-                etf1_price = 0
-        else:
-            st.metric("Prix", "N/A")
-            etf1_price = 0
+        # Demande lancée dès que le ticker est connu, affichée une fois les deux prix reçus
+        etf1_price_slot = st.empty()
+        etf1_price_future = submit_etf_price(etf1_ticker)
     
     with col4:
         if etf1_ticker:
@@ -567,27 +998,14 @@ def main():
     col1, col2, col3, col4, col5 = st.columns([3, 1.2, 1.2, 1.2, 1.2])
     
     with col1:
-        etf2_ticker = st.selectbox(
-            "ETF 2 (remplacement)",
-            options=etf_tickers,
-            format_func=lambda x: f"{x} - {etfs_data.get(x, {}).get('isin', 'N/A')} - {etfs_data.get(x, {}).get('name', 'N/A')}" if x else "-- Sélectionnez un ETF --",
-            key="etf2_select"
-        )
+        etf2_ticker = select_etf("ETF 2 (remplacement)", "etf2_select", search_index)
     
     with col2:
         st.metric("Parts", " X ")
     
     with col3:
-        if etf2_ticker:
-            etf2_price = get_etf_price(etf2_ticker)
-            if etf2_price:
-                st.metric("Prix", f"{etf2_price:.2f}€")
-            else:
-                st.metric("Prix", "N/A")
-                etf2_price = 0
-        else:
-            st.metric("Prix", "N/A")
-            etf2_price = 0
+        etf2_price_slot = st.empty()
+        etf2_price_future = submit_etf_price(etf2_ticker)
     
     with col4:
         if etf2_ticker:
@@ -611,6 +1029,13 @@ def main():
     if etf2_ticker:
         st.caption(f"**Réplication :** {etfs_data[etf2_ticker]['index']} | **ISIN :** {etfs_data[etf2_ticker]['isin']}")
     
+    # Attente groupée des deux prix : la latence est celle de la demande la plus lente
+    etf1_price, etf2_price = collect_etf_prices(
+        [etf1_ticker, etf2_ticker], [etf1_price_future, etf2_price_future]
+    )
+    for price_slot, price in ((etf1_price_slot, etf1_price), (etf2_price_slot, etf2_price)):
+        price_slot.metric("Prix", f"{price:.2f}€" if price else "N/A")
+    
     # Comparaison rapide TD
     if etf1_ticker and etf2_ticker:
         td_difference = etf2_td - etf1_td
@@ -753,6 +1178,61 @@ def main():
         grille_data = broker_structures[selected_broker]["grilles"][selected_grille]
         render_grille_display(selected_grille, grille_data)
     
+    # Préparer les paramètres pour les frais personnalisés
+    if selected_broker == "Personnalisé":
+        custom_sell_fee_param = custom_sell_fee
+        custom_sell_fee_type_param = custom_sell_fee_type
+        custom_buy_fee_param = custom_buy_fee
+        custom_buy_fee_type_param = custom_buy_fee_type
+    else:
+        custom_sell_fee_param = None
+        custom_sell_fee_type_param = None
+        custom_buy_fee_param = None
+        custom_buy_fee_type_param = None
+    
+    # Screener : meilleurs remplacements pour l'ETF 1 sur tout l'univers
+    if etf1_ticker and etf1_price and etf1_shares > 0 and selected_broker and selected_grille:
+        render_screener(
+            etfs_data, etf1_ticker, etf1_shares, etf1_price,
+            selected_broker, selected_grille, broker_structures,
+            custom_sell_fee_param, custom_sell_fee_type_param,
+            custom_buy_fee_param, custom_buy_fee_type_param
+        )
+    
+    # Comparaison de l'arbitrage sur toutes les grilles du catalogue
+    if etf1_ticker and etf2_ticker and etf1_price and etf2_price and etf1_shares > 0:
+        render_broker_comparison(
+            etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td, broker_structures,
+            custom_sell_fee_param, custom_sell_fee_type_param,
+            custom_buy_fee_param, custom_buy_fee_type_param
+        )
+    
+    # Sensibilité du délai de rentabilisation
+    if etf1_ticker and etf2_ticker and etf1_price and etf2_price and etf1_shares > 0 and selected_broker and selected_grille:
+        render_payback_sensitivity(
+            etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+            selected_broker, selected_grille, broker_structures,
+            custom_sell_fee_param, custom_sell_fee_type_param,
+            custom_buy_fee_param, custom_buy_fee_type_param
+        )
+    
+    # Incertitude sur les TD futures
+    if etf1_ticker and etf2_ticker and etf1_price and etf2_price and etf1_shares > 0 and selected_broker and selected_grille:
+        render_td_monte_carlo(
+            etf1_ticker, etf1_shares, etf1_price, etf1_td, etf2_ticker, etf2_price, etf2_td,
+            selected_broker, selected_grille, broker_structures,
+            custom_sell_fee_param, custom_sell_fee_type_param,
+            custom_buy_fee_param, custom_buy_fee_type_param
+        )
+    
+    # Portefeuille multi-lignes
+    if selected_broker and selected_grille:
+        render_portfolio(
+            etfs_data, selected_broker, selected_grille, broker_structures,
+            custom_sell_fee_param, custom_sell_fee_type_param,
+            custom_buy_fee_param, custom_buy_fee_type_param
+        )
+    
     # Calcul et affichage des résultats
     if st.button("🚀 Calculer la Rentabilité", type="primary", use_container_width=True):
         
@@ -760,199 +1240,50 @@ def main():
             st.error("Veuillez remplir tous les champs nécessaires")
             return
         
-        # Préparer les paramètres pour les frais personnalisés
-        if selected_broker == "Personnalisé":
-            custom_sell_fee_param = custom_sell_fee
-            custom_sell_fee_type_param = custom_sell_fee_type
-            custom_buy_fee_param = custom_buy_fee
-            custom_buy_fee_type_param = custom_buy_fee_type
-        else:
-            custom_sell_fee_param = None
-            custom_sell_fee_type_param = None
-            custom_buy_fee_param = None
-            custom_buy_fee_type_param = None
-        
         # CALCUL AVEC LA LOGIQUE TD
-        results = calculate_replacement_profitability_td(
-            etf1_shares, etf1_price, etf1_td,
-            etf2_price, etf2_td,
-            selected_broker, selected_grille, broker_structures,
-            custom_sell_fee_param, custom_sell_fee_type_param,
-            custom_buy_fee_param, custom_buy_fee_type_param
-        )
-        
-        st.markdown("---")
-        st.header("📊 Résultats de l'Analyse")
-        
-        # Gestion du cas impossible
-        if results.get('impossible_replacement', False):
-            st.error("🚫 **REMPLACEMENT IMPOSSIBLE**")
-            st.error(f"**Raison :** {results['reason']}")
-            
-            # Affichage simplifié pour le cas impossible
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric(
-                    label="💰 Montant de vente",
-                    value=f"{results['sell_amount']:,.2f}€"
-                )
-            
-            with col2:
-                st.metric(
-                    label="💸 Frais de vente",
-                    value=f"{results['sell_fees']:,.2f}€"
-                )
-            
-            with col3:
-                st.metric(
-                    label="💵 Liquidité disponible",
-                    value=f"{results['net_after_sell']:,.2f}€"
-                )
-            
-            st.warning(f"💡 **Solution :** Augmentez le nombre de parts d'ETF1 ou choisissez un ETF2 moins cher (prix actuel: {etf2_price:.2f}€)")
-            return
-        
-        # Métriques principales (cas normal)
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            st.metric(
-                label="💰 Montant de vente",
-                value=f"{results['sell_amount']:,.2f}€"
-            )
-        
-        with col2:
-            st.metric(
-                label="💸 Frais totaux",
-                value=f"{results['total_transaction_cost']:,.2f}€"
-            )
-        
-        with col3:
-            st.metric(
-                label="📈 Parts ETF2",
-                value=f"{results['etf2_shares']:.0f}"
+        with span("calculate_replacement_profitability_td"):
+            results = get_profitability_memo().calculate(
+                etf1_ticker, etf2_ticker,
+                etf1_shares, etf1_price, etf1_td,
+                etf2_price, etf2_td,
+                selected_broker, selected_grille, broker_structures,
+                custom_sell_fee_param, custom_sell_fee_type_param,
+                custom_buy_fee_param, custom_buy_fee_type_param,
+                get_compiled_schedules(broker_structures)
             )
         
-        with col4:
-            st.metric(
-                label="💵 Liquidité restante",
-                value=f"{results['remaining_cash']:,.2f}€"
-            )
-        
-        with col5:
-            delta_color = "normal" if results['annual_performance_gain'] > 0 else "inverse"
-            st.metric(
-                label="📈 Gain de performance annuel",
-                value=f"{results['annual_performance_gain']:,.2f}€",
-                delta=f"{results['annual_performance_gain']:+.2f}€" if results['annual_performance_gain'] != 0 else None,
-                delta_color=delta_color
-            )
-        
-        # Seuil de rentabilité en ligne séparée
-        st.markdown("### ⏱️ Seuil de rentabilité")
-        if results['annual_performance_gain'] > 0 and results['payback_months'] != float('inf'):
-            if results['payback_months'] < 12:
-                st.success(f"**Rentable en {results['payback_months']:.2f} mois**")
-            else:
-                st.info(f"**Rentable en {results['payback_years']:.2f} ans**")
-        else:
-            st.error("**❌ Jamais rentable**")
-
-        # Recommandation basée sur la TD
-        if results['annual_performance_gain'] > 0:     
-            if results['payback_months'] < 12:
-                st.success(f"✅ **Recommandation : REMPLACER** - Rentable en {results['payback_months']:.1f} mois grâce à la meilleure TD")
-            elif results['payback_years'] < 3:
-                st.warning(f"⚠️ **Recommandation : À CONSIDÉRER** - Rentable en {results['payback_years']:.1f} ans")
-            else:
-                st.error(f"❌ **Recommandation : NE PAS REMPLACER** - Rentable seulement après {results['payback_years']:.1f} ans")
-        else:
-            st.error("❌ **Ce remplacement n'est jamais rentable** - L'ETF2 a une TD moins favorable que l'ETF1")
-        
-        # Détails de l'opération
-        st.subheader("🔍 Détail de l'Opération")
-        
-        details_data = {
-            "Élément": [
-                f"💼 Vente {etf1_shares:.0f} parts {etf1_ticker}",
-                f"💸 Frais de vente",
-                f"💰 Net après vente",
-                f"📊 Prix ETF2 ({etf2_ticker})",
-                f"📈 Parts ETF2 optimales",
-                f"💰 Montant achat ETF2",
-                f"💸 Frais d'achat ETF2",
-                f"💵 Liquidité finale restante"
-            ],
-            "Montant": [
-                f"{results['sell_amount']:,.2f}€",
-                f"-{results['sell_fees']:,.2f}€",
-                f"{results['net_after_sell']:,.2f}€",
-                f"{etf2_price:.2f}€/part",
-                f"{results['etf2_shares']:.0f} parts",
-                f"{results['purchase_amount']:,.2f}€",
-                f"-{results['buy_fees']:,.2f}€",
-                f"{results['remaining_cash']:,.2f}€"
-            ]
-        }
-        
-        details_df = pd.DataFrame(details_data)
-        st.dataframe(details_df, use_container_width=True, hide_index=True)
-        
-        # Résumé des frais de courtage
-        st.subheader("💸 Détail des Frais de Courtage")
-        
-        fees_summary_data = {
-            "Type d'opération": ["Vente ETF1", "Achat ETF2", "Total"],
-            "Montant de l'opération": [
-                f"{results['sell_amount']:,.2f}€",
-                f"{results['purchase_amount']:,.2f}€",
-                f"{results['sell_amount']:,.2f}€"
-            ],
-            "Frais": [
-                f"{results['sell_fees']:,.2f}€",
-                f"{results['buy_fees']:,.2f}€",
-                f"{results['total_transaction_cost']:,.2f}€"
-            ],
-            "% du montant": [
-                f"{(results['sell_fees']/results['sell_amount']*100):.3f}%",
-                f"{(results['buy_fees']/results['purchase_amount']*100 if results['purchase_amount'] > 0 else 0):.3f}%",
-                f"{(results['total_transaction_cost']/results['sell_amount']*100):.3f}%"
-            ]
-        }
-        
-        fees_summary_df = pd.DataFrame(fees_summary_data)
-        st.dataframe(fees_summary_df, use_container_width=True, hide_index=True)
-        
-        # Comparaison des Tracking Differences
-        st.subheader("📊 Comparaison des Tracking Differences")
-        
-        td_data = {
-            "ETF": [etf1_ticker, etf2_ticker, "Différence"],
-            "Tracking Difference (%)": [
-                f"{etf1_td:+.2f}%",
-                f"{etf2_td:+.2f}%",
-                f"{etf2_td - etf1_td:+.2f}%"
-            ],
-            "Capital investi": [
-                f"{results['sell_amount']:,.2f}€",
-                f"{results['purchase_amount']:,.2f}€",
-                f"{results['sell_amount'] - results['purchase_amount']:+,.2f}€"
-            ],
-            "Performance annuelle estimée": [
-                f"{results['annual_performance_etf1']:+,.2f}€",
-                f"{results['annual_performance_etf2']:+,.2f}€",
-                f"{results['annual_performance_gain']:+,.2f}€"
-            ],
-            "TER (pour info)": [
-                f"{etf1_ter:.2f}%",
-                f"{etf2_ter:.2f}%",
-                f"{etf2_ter - etf1_ter:+.2f}%"
-            ]
-        }
-        
-        td_df = pd.DataFrame(td_data)
-        st.dataframe(td_df, use_container_width=True, hide_index=True)
-        
+        with span("render_results"):
+            render_results(results, etf1_ticker, etf1_shares, etf1_td, etf1_ter,
+                           etf2_ticker, etf2_price, etf2_td, etf2_ter)
+
+def run_main(show_timings):
+    """main() dans un enregistrement des temps si les métriques ou le panneau sont activés"""
+    with timed_rerun(enabled=bool(METRICS_PATH) or show_timings) as spans:
+        main()
+    return spans
+
+def profile_requested():
+    """?profile=<jeton> dans l'URL, avec le jeton PROFILE_TOKEN du serveur (jamais sans jeton configuré)"""
+    requested = st.query_params.get("profile")
+    return bool(PROFILE_TOKEN) and requested is not None and hmac.compare_digest(requested, PROFILE_TOKEN)
+
+def run():
+    """Une réexécution du script, mesurée et profilée à la demande"""
+    show_timings = TIMINGS_PANEL or st.query_params.get("timings") == "1"
+    if PROFILE_RERUNS or profile_requested():
+        # Paramètre consommé : seule cette réexécution est profilée
+        st.query_params.pop("profile", None)
+        with profile(PROFILE_DIRECTORY, keep=PROFILE_KEEP) as result:
+            spans = run_main(show_timings)
+        st.session_state['last_profile'] = result
+    else:
+        spans = run_main(show_timings)
+    if 'last_profile' in st.session_state:
+        render_profile_summary(st.session_state['last_profile'])
+    if METRICS_PATH:
+        metrics_registry.write(METRICS_PATH)
+    if show_timings:
+        render_timings_panel(spans)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+API HTTP locale (JSON) pour l'évaluation des arbitrages
+
+Expose les calculs de frais, d'achat optimal et de rentabilité sans passer par
+l'interface Streamlit. L'univers d'ETFs et les grilles compilées sont chargés
+une seule fois au démarrage ; chaque processus de travail en hérite, et chaque
+processus sert les requêtes sur plusieurs threads.
+
+Points d'entrée (POST, corps JSON) :
+- /fees : {amount, broker, grille, custom_fee?, custom_fee_type?}
+- /fees/batch : {amounts: [...], broker, grille, custom_fee?, custom_fee_type?}
+- /optimal-purchase : {net_amount, etf2_price, broker, grille, custom_buy_fee?, custom_buy_fee_type?}
+- /profitability : un scénario (mêmes champs qu'une ligne de batch.py)
+- /profitability/batch : {scenarios: [...]}
+et GET /health.
+
+Les prix absents d'un scénario sont demandés au fournisseur configuré
+(--prices, voir price_providers). Les délais infinis sont renvoyés à null.
+
+Usage (depuis la racine du dépôt) :
+    python -m api [--port 8765] [--workers 4] [--prices replay:prix.csv]
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from arbitrage import calculate_optimal_etf2_purchase, calculate_replacement_profitability_td
+from batch import evaluate_scenarios
+from etf_data import ETFS_FILE_PATH, load_etf_info
+from fees import (
+    BROKERS_FILE_PATH, calculate_fees, calculate_fees_batch, compile_broker_structures, is_known_grille,
+    read_broker_structures
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Taille maximale d'un corps de requête (protège le service des envois démesurés)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class ApiError(Exception):
+    """Erreur de requête renvoyée au client avec un code HTTP"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json_value(value):
+    """Convertit les valeurs numpy / infinies en valeurs JSON standard"""
+    if isinstance(value, dict):
+        return {key: to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is pd.NA:
+        return None
+    return value
+
+
+class SwapService:
+    """Univers, grilles et fournisseur de prix partagés par toutes les requêtes d'un processus"""
+
+    def __init__(self, etf_info, broker_structures, price_provider=None):
+        self.etf_info = etf_info
+        self.broker_structures = broker_structures
+        self.compiled_schedules = compile_broker_structures(broker_structures)
+        self.price_provider = price_provider
+
+    @classmethod
+    def from_files(cls, etfs_path=ETFS_FILE_PATH, brokers_path=BROKERS_FILE_PATH, price_provider=None):
+        return cls(load_etf_info(etfs_path)[0], read_broker_structures(brokers_path), price_provider)
+
+    def _check_grille(self, request):
+        """Courtier et grille du catalogue (sinon des frais nuls seraient calculés sans le signaler)"""
+        if not is_known_grille(request.get('broker'), request.get('grille'), self.broker_structures):
+            raise ApiError(f"Courtier/grille inconnu : {request.get('broker')} / {request.get('grille')}")
+        for key in ('custom_fee', 'custom_sell_fee', 'custom_buy_fee'):
+            if request.get(key) is not None:
+                _number(request, key)
+
+    def fees(self, request):
+        self._check_grille(request)
+        fees = calculate_fees(_number(request, 'amount'), request.get('broker'), request.get('grille'),
+                              self.broker_structures, request.get('custom_fee'), request.get('custom_fee_type'))
+        return {'fees': fees}
+
+    def fees_batch(self, request):
+        amounts = request.get('amounts')
+        if not isinstance(amounts, list) or not all(_is_number(amount) for amount in amounts):
+            raise ApiError("Le champ amounts doit être une liste de montants")
+        self._check_grille(request)
+        fees = calculate_fees_batch(amounts, request.get('broker'), request.get('grille'), self.broker_structures,
+                                    request.get('custom_fee'), request.get('custom_fee_type'),
+                                    self.compiled_schedules)
+        return {'fees': fees}
+
+    def optimal_purchase(self, request):
+        self._check_grille(request)
+        return calculate_optimal_etf2_purchase(
+            _number(request, 'net_amount'), _positive_number(request, 'etf2_price'),
+            request.get('broker'), request.get('grille'), self.broker_structures,
+            request.get('custom_buy_fee'), request.get('custom_buy_fee_type'), self.compiled_schedules
+        )
+
+    def _swap_inputs(self, scenario):
+        """Complète un scénario avec les TD de l'univers et les prix du fournisseur"""
+        values = {}
+        for side in ('etf1', 'etf2'):
+            ticker = scenario.get(f'{side}_ticker')
+            td = scenario.get(f'{side}_td')
+            if td is None:
+                if ticker not in self.etf_info:
+                    raise ApiError(f"Ticker {side.upper()} inconnu : {ticker}")
+                td = self.etf_info[ticker]['tracking_difference']
+            price = scenario.get(f'{side}_price')
+            if price is None and ticker and self.price_provider is not None:
+                price = self.price_provider([ticker]).get(ticker)
+            if price is None:
+                raise ApiError(f"Prix {side.upper()} indisponible")
+            values[f'{side}_td'] = _number({f'{side}_td': td}, f'{side}_td')
+            values[f'{side}_price'] = _positive_number({f'{side}_price': price}, f'{side}_price')
+        return values
+
+    def profitability(self, request):
+        self._check_grille(request)
+        etf1_shares = _positive_number(request, 'etf1_shares')
+        values = self._swap_inputs(request)
+        return calculate_replacement_profitability_td(
+            etf1_shares, values['etf1_price'], values['etf1_td'],
+            values['etf2_price'], values['etf2_td'],
+            request.get('broker'), request.get('grille'), self.broker_structures,
+            request.get('custom_sell_fee'), request.get('custom_sell_fee_type'),
+            request.get('custom_buy_fee'), request.get('custom_buy_fee_type'),
+            self.compiled_schedules
+        )
+
+    def profitability_batch(self, request):
+        scenarios = request.get('scenarios')
+        if not isinstance(scenarios, list):
+            raise ApiError("Le champ scenarios doit être une liste")
+        if not scenarios:
+            return {'results': []}
+        chunk = pd.DataFrame(scenarios)
+        for column in ('etf1_ticker', 'etf2_ticker'):
+            chunk[column] = chunk.get(column, pd.Series('', index=chunk.index)).fillna('').astype(str).str.strip()
+        for column in ('etf1_shares', 'broker', 'grille'):
+            if column not in chunk.columns:
+                raise ApiError(f"Champ manquant dans les scénarios : {column}")
+
+        prices = {}
+        if self.price_provider is not None:
+            tickers = [ticker for side in ('etf1', 'etf2')
+                       for ticker, price in zip(chunk[f'{side}_ticker'], chunk.get(f'{side}_price', [None] * len(chunk)))
+                       if ticker and pd.isna(price)]
+            prices = self.price_provider(list(dict.fromkeys(tickers))) if tickers else {}
+
+        results = evaluate_scenarios(chunk, self.etf_info, self.broker_structures, self.compiled_schedules, prices)
+        results = results.astype(object).where(results.notna(), None)
+        return {'results': results.to_dict(orient='records')}
+
+
+def _is_number(value):
+    """Nombre JSON fini (les booléens et les chaînes sont refusés)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _number(request, key):
+    """Champ numérique obligatoire"""
+    if key not in request or request[key] is None:
+        raise ApiError(f"Champ manquant : {key}")
+    if not _is_number(request[key]):
+        raise ApiError(f"Champ numérique invalide : {key}")
+    return float(request[key])
+
+
+def _positive_number(request, key):
+    """Champ numérique obligatoire strictement positif (prix, nombre de parts)"""
+    value = _number(request, key)
+    if value <= 0:
+        raise ApiError(f"Le champ {key} doit être strictement positif")
+    return value
+
+
+ROUTES = {
+    '/fees': SwapService.fees,
+    '/fees/batch': SwapService.fees_batch,
+    '/optimal-purchase': SwapService.optimal_purchase,
+    '/profitability': SwapService.profitability,
+    '/profitability/batch': SwapService.profitability_batch,
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Traitement d'une requête JSON ; connexions persistantes (HTTP/1.1)"""
+
+    protocol_version = "HTTP/1.1"
+    # Réponses courtes : sans TCP_NODELAY, l'algorithme de Nagle ajoute ~40 ms par requête
+    disable_nagle_algorithm = True
+    service = None
+
+    def log_message(self, format, *args):
+        # Pas de journal par requête : il dominerait le temps de réponse sous charge
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(to_json_value(payload), ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'etfs': len(self.service.etf_info), 'pid': os.getpid()})
+        else:
+            self._send_json(404, {'error': f"Route inconnue : {self.path}"})
+
+    def do_POST(self):
+        route = ROUTES.get(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {'error': "Requête trop volumineuse"})
+            return
+        body = self.rfile.read(length)
+        if route is None:
+            self._send_json(404, {'error': f"Route inconnue : {self.path}"})
+            return
+        try:
+            request = json.loads(body or b'{}')
+            if not isinstance(request, dict):
+                raise ApiError("Le corps de la requête doit être un objet JSON")
+            self._send_json(200, route(self.service, request))
+        except json.JSONDecodeError as e:
+            self._send_json(400, {'error': f"JSON invalide : {e}"})
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'error': f"Erreur interne : {e}"})
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serveur multi-thread lié à (host, port) ; port 0 = port libre choisi par le système"""
+    handler = type('BoundApiHandler', (ApiHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=1):
+    """
+    Sert l'API ; avec workers > 1, plusieurs processus (fork) se partagent la même socket
+    Le service est construit avant le fork : univers et grilles sont chargés une seule fois
+    """
+    server = create_server(service, host, port)
+    # SIGTERM arrête proprement le processus principal, qui arrête alors les autres
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    processes = []
+    if workers > 1:
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=server.serve_forever, daemon=True) for _ in range(workers - 1)]
+        for process in processes:
+            process.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP locale d'évaluation des arbitrages")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="processus de travail (fork)")
+    parser.add_argument("--prices", default=os.environ.get("PRICE_PROVIDERS"),
+                        help='fournisseurs pour les prix absents des requêtes, ex : "replay:prix.csv,yfinance"')
+    parser.add_argument("--etfs", default=ETFS_FILE_PATH)
+    parser.add_argument("--brokers", default=BROKERS_FILE_PATH)
+    args = parser.parse_args()
+
+    price_provider = None
+    if args.prices:
+        from price_providers import provider_from_spec
+        from prices import PriceService
+
+        # Cache TTL par processus devant le fournisseur
+        price_provider = PriceService(provider_from_spec(args.prices)).get_prices
+
+    service = SwapService.from_files(args.etfs, args.brokers, price_provider)
+    print(f"API sur http://{args.host}:{args.port} ({args.workers} processus, {len(service.etf_info)} ETFs)")
+    serve(service, args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Calcul de la rentabilité d'un arbitrage ETF1 -> ETF2 basé sur la Tracking Difference
+
+Ce module ne dépend pas de Streamlit.
+"""
+import math
+
+import numpy as np
+
+from fees import FEE_KIND_FIXED, FEE_KIND_PERCENTAGE, calculate_fees, evaluate_fee_schedule, resolve_fee_schedule
+
+
+def _impossible_purchase(net_amount_after_sell):
+    """Résultat d'achat lorsqu'aucune part ETF2 ne peut être achetée"""
+    return {
+        'etf2_shares': 0,
+        'purchase_amount': 0.0,
+        'buy_fees': 0.0,
+        'remaining_cash': net_amount_after_sell,
+        'total_cost': 0.0,
+        'impossible_purchase': True
+    }
+
+
+def _first_shares_reaching(amount_bound, etf2_price):
+    """Plus petit nombre de parts n >= 1 tel que n * prix >= borne"""
+    if amount_bound == -math.inf or amount_bound <= etf2_price:
+        return 1
+    shares = math.ceil(amount_bound / etf2_price)
+    # Corrige les arrondis flottants de la division
+    while shares * etf2_price < amount_bound:
+        shares += 1
+    while shares > 1 and (shares - 1) * etf2_price >= amount_bound:
+        shares -= 1
+    return shares
+
+
+def _max_affordable_shares(net_amount_after_sell, etf2_price, max_possible_shares, schedule, buy_fees_for):
+    """
+    Plus grand nombre de parts dont l'achat + frais tient dans le montant disponible
+
+    Sur chaque segment de la grille compilée, le coût total (montant + frais) est
+    croissant avec le nombre de parts : on cherche donc le maximum par dichotomie,
+    en parcourant les segments du plus élevé au plus bas.
+    """
+    def is_affordable(shares):
+        purchase_amount = shares * etf2_price
+        return net_amount_after_sell - purchase_amount - buy_fees_for(purchase_amount) >= 0
+
+    bounds = schedule['bounds']
+    for segment in range(len(bounds) - 1, -1, -1):
+        low = _first_shares_reaching(bounds[segment], etf2_price)
+        high = max_possible_shares
+        if segment + 1 < len(bounds):
+            high = min(high, _first_shares_reaching(bounds[segment + 1], etf2_price) - 1)
+
+        if low > high or not is_affordable(low):
+            continue
+
+        # Dichotomie : low est finançable, on cherche le dernier n finançable
+        while low < high:
+            middle = (low + high + 1) // 2
+            if is_affordable(middle):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    return 0
+
+
+def calculate_optimal_etf2_purchase(net_amount_after_sell, etf2_price, broker_name, grille_name, broker_structures,
+                                    custom_buy_fee=None, custom_buy_fee_type=None, compiled_schedules=None):
+    """
+    Détermine le nombre optimal de parts ETF2 à acheter
+    en s'assurant que les liquidités restantes couvrent les frais d'achat
+    """
+
+    # Vérification préliminaire : peut-on acheter au moins 1 part ?
+    if net_amount_after_sell < etf2_price:
+        return _impossible_purchase(net_amount_after_sell)
+
+    # Nombre maximum théorique de parts qu'on pourrait acheter
+    max_possible_shares = int(net_amount_after_sell / etf2_price)
+
+    def buy_fees_for(purchase_amount):
+        return calculate_fees(purchase_amount, broker_name, grille_name, broker_structures,
+                              custom_buy_fee, custom_buy_fee_type)
+
+    # Recherche logarithmique par segment de la grille (au lieu de tester chaque nombre de parts)
+    schedule = resolve_fee_schedule(broker_name, grille_name, broker_structures, custom_buy_fee,
+                                    custom_buy_fee_type, compiled_schedules)
+    etf2_shares = _max_affordable_shares(net_amount_after_sell, etf2_price, max_possible_shares,
+                                         schedule, buy_fees_for)
+
+    # Si même 1 part ne peut pas être achetée (frais trop élevés)
+    if etf2_shares == 0:
+        return _impossible_purchase(net_amount_after_sell)
+
+    purchase_amount = etf2_shares * etf2_price
+    buy_fees = buy_fees_for(purchase_amount)
+    return {
+        'etf2_shares': etf2_shares,
+        'purchase_amount': purchase_amount,
+        'buy_fees': buy_fees,
+        'remaining_cash': net_amount_after_sell - purchase_amount - buy_fees,
+        'total_cost': purchase_amount + buy_fees,
+        'impossible_purchase': False
+    }
+
+
+def calculate_replacement_profitability_td(etf1_shares, etf1_price, etf1_td, 
+                                         etf2_price, etf2_td, broker_name, grille_name, broker_structures,
+                                         custom_sell_fee=None, custom_sell_fee_type=None,
+                                         custom_buy_fee=None, custom_buy_fee_type=None,
+                                         compiled_schedules=None):
+    """
+    Calcule la rentabilité du remplacement basée sur la Tracking Difference
+    """
+    
+    # 1. Vente de tous les ETF1
+    sell_amount = etf1_shares * etf1_price
+    
+    # 2. Frais de vente
+    sell_fees = calculate_fees(sell_amount, broker_name, grille_name, broker_structures, custom_sell_fee, custom_sell_fee_type)
+    
+    # 3. Montant net après vente
+    net_amount_after_sell = sell_amount - sell_fees
+    
+    # 4. Calcul optimal du nombre d'ETF2 à acheter
+    purchase_result = calculate_optimal_etf2_purchase(
+        net_amount_after_sell, etf2_price, broker_name, grille_name, broker_structures,
+        custom_buy_fee, custom_buy_fee_type, compiled_schedules
+    )
+    
+    # 5. Gestion du cas où aucun achat n'est possible
+    if purchase_result.get('impossible_purchase', False):
+        return {
+            'sell_amount': sell_amount,
+            'sell_fees': sell_fees,
+            'net_after_sell': net_amount_after_sell,
+            'etf2_shares': 0,
+            'purchase_amount': 0.0,
+            'buy_fees': 0.0,
+            'remaining_cash': net_amount_after_sell,
+            'total_transaction_cost': sell_fees,
+            'annual_performance_etf1': 0.0,
+            'annual_performance_etf2': 0.0,
+            'annual_performance_gain': 0.0,
+            'payback_years': float('inf'),
+            'payback_months': float('inf'),
+            'impossible_replacement': True,
+            'reason': f"Impossible d'acheter même 1 part ETF2 (prix: {etf2_price:.2f}€, disponible: {net_amount_after_sell:.2f}€)"
+        }
+    
+    # 6. Gain annuel basé sur la TD (seulement si achat possible)
+    # Les valeurs TD sont déjà en %, donc on divise par 100 pour les calculs
+    # TD positive = surperformance du benchmark
+    annual_performance_etf1 = sell_amount * (etf1_td / 100)
+    annual_performance_etf2 = purchase_result['purchase_amount'] * (etf2_td / 100)
+    annual_performance_gain = annual_performance_etf2 - annual_performance_etf1
+    
+    # 7. Temps pour rentabiliser
+    total_transaction_cost = sell_fees + purchase_result['buy_fees']
+    if annual_performance_gain > 0:
+        payback_years = total_transaction_cost / annual_performance_gain
+        payback_months = payback_years * 12
+    else:
+        payback_years = float('inf')
+        payback_months = float('inf')
+    
+    return {
+        'sell_amount': sell_amount,
+        'sell_fees': sell_fees,
+        'net_after_sell': net_amount_after_sell,
+        'etf2_shares': purchase_result['etf2_shares'],
+        'purchase_amount': purchase_result['purchase_amount'],
+        'buy_fees': purchase_result['buy_fees'],
+        'remaining_cash': purchase_result['remaining_cash'],
+        'total_transaction_cost': total_transaction_cost,
+        'annual_performance_etf1': annual_performance_etf1,
+        'annual_performance_etf2': annual_performance_etf2,
+        'annual_performance_gain': annual_performance_gain,
+        'payback_years': payback_years,
+        'payback_months': payback_months,
+        'impossible_replacement': False
+    }
+
+
+def _first_shares_reaching_batch(amount_bounds, etf2_prices):
+    """Version vectorisée de _first_shares_reaching (bornes et prix diffusés, bornes infinies acceptées)"""
+    shares = np.ceil(amount_bounds / etf2_prices)
+    # Corrige les arrondis flottants de la division
+    shares = np.where(shares * etf2_prices < amount_bounds, shares + 1, shares)
+    shares = np.where((shares > 1) & ((shares - 1) * etf2_prices >= amount_bounds), shares - 1, shares)
+    return np.maximum(shares, 1)
+
+
+def _segment_candidate(kind, value, min_fee, net, price):
+    """Nombre de parts (réel) tel que montant + frais = liquidités, selon le type de segment"""
+    def fixed():
+        return (net - value) / price
+
+    def percentage():
+        return np.minimum(net / (price * (1 + value / 100)), (net - min_fee) / price)
+
+    if np.ndim(kind) == 0:
+        return fixed() if kind == FEE_KIND_FIXED else percentage() if kind == FEE_KIND_PERCENTAGE else net / price
+    # Grilles empilées : un type de segment par grille
+    return np.where(kind == FEE_KIND_FIXED, fixed(), np.where(kind == FEE_KIND_PERCENTAGE, percentage(), net / price))
+
+
+def calculate_optimal_etf2_purchase_batch(net_amounts_after_sell, etf2_prices, buy_schedule):
+    """
+    Version vectorisée de calculate_optimal_etf2_purchase pour une grille compilée
+
+    Les montants et les prix sont diffusés (broadcasting) l'un contre l'autre, ainsi
+    que les grilles empilées par fees.stack_fee_schedules (une grille par élément).
+    Pour chaque segment de la grille, le nombre de parts maximal est obtenu en
+    forme fermée puis corrigé d'une part au plus pour coller exactement au calcul
+    scalaire. Retourne un dictionnaire de tableaux avec les mêmes clés.
+    """
+    net, price = np.broadcast_arrays(np.asarray(net_amounts_after_sell, dtype=float),
+                                     np.asarray(etf2_prices, dtype=float))
+
+    def is_affordable(shares):
+        purchase_amount = shares * price
+        return net - purchase_amount - evaluate_fee_schedule(buy_schedule, purchase_amount) >= 0
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        tradable = (price > 0) & (net >= price)
+        max_possible_shares = np.where(tradable, np.floor(net / price), 0.0)
+        best_shares = np.zeros(net.shape)
+
+        bounds = buy_schedule['bounds']
+        n_segments = bounds.shape[-1]
+        for segment in range(n_segments):
+            low = _first_shares_reaching_batch(bounds[..., segment], price)
+            high = max_possible_shares
+            if segment + 1 < n_segments:
+                high = np.minimum(high, _first_shares_reaching_batch(bounds[..., segment + 1], price) - 1)
+
+            # Forme fermée : montant + frais <= liquidités disponibles
+            candidate = _segment_candidate(buy_schedule['kind'][..., segment], buy_schedule['value'][..., segment],
+                                           buy_schedule['min_fee'][..., segment], net, price)
+            candidate = np.minimum(np.floor(np.nan_to_num(candidate, nan=0.0, posinf=0.0, neginf=0.0)), high)
+            candidate = np.maximum(candidate, low - 1)
+
+            # Corrections d'arrondi : au plus une ou deux parts dans chaque sens
+            for _ in range(2):
+                candidate = np.where((candidate >= low) & ~is_affordable(candidate), candidate - 1, candidate)
+            for _ in range(2):
+                following = candidate + 1
+                candidate = np.where((following <= high) & is_affordable(following), following, candidate)
+
+            valid = tradable & (candidate >= low) & (candidate <= high) & is_affordable(candidate)
+            best_shares = np.where(valid, np.maximum(best_shares, candidate), best_shares)
+
+        purchase_amount = best_shares * price
+        buy_fees = np.where(best_shares > 0, evaluate_fee_schedule(buy_schedule, purchase_amount), 0.0)
+        purchase_amount = np.where(best_shares > 0, purchase_amount, 0.0)
+
+    return {
+        'etf2_shares': best_shares,
+        'purchase_amount': purchase_amount,
+        'buy_fees': buy_fees,
+        'remaining_cash': np.where(best_shares > 0, net - purchase_amount - buy_fees, net),
+        'total_cost': purchase_amount + buy_fees,
+        'impossible_purchase': best_shares == 0
+    }
+
+
+def calculate_replacement_profitability_batch(etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+                                              sell_schedule, buy_schedule):
+    """
+    Version vectorisée de calculate_replacement_profitability_td
+
+    Tous les paramètres numériques peuvent être des tableaux diffusables entre eux
+    (ex: ETF1 en colonne, ETF2 en ligne pour une matrice de paires). Les grilles
+    de vente et d'achat sont des grilles compilées (voir fees.resolve_fee_schedule).
+    """
+    # 1-3. Vente de tous les ETF1 et montant net
+    sell_amount = np.asarray(etf1_shares, dtype=float) * np.asarray(etf1_price, dtype=float)
+    sell_fees = evaluate_fee_schedule(sell_schedule, sell_amount)
+    net_amount_after_sell = sell_amount - sell_fees
+
+    # 4. Calcul optimal du nombre d'ETF2 à acheter
+    purchase = calculate_optimal_etf2_purchase_batch(net_amount_after_sell, etf2_price, buy_schedule)
+    possible = ~purchase['impossible_purchase']
+
+    # 5-6. Gain annuel basé sur la TD (nul si aucun achat n'est possible)
+    sell_amount, sell_fees, net_amount_after_sell = (
+        np.broadcast_to(array, possible.shape) for array in (sell_amount, sell_fees, net_amount_after_sell))
+    annual_performance_etf1 = np.where(possible, sell_amount * (np.asarray(etf1_td, dtype=float) / 100), 0.0)
+    annual_performance_etf2 = np.where(possible, purchase['purchase_amount'] * (np.asarray(etf2_td, dtype=float) / 100), 0.0)
+    annual_performance_gain = annual_performance_etf2 - annual_performance_etf1
+
+    # 7. Temps pour rentabiliser
+    total_transaction_cost = sell_fees + purchase['buy_fees']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payback_years = np.where(annual_performance_gain > 0, total_transaction_cost / annual_performance_gain, np.inf)
+
+    return {
+        'sell_amount': sell_amount,
+        'sell_fees': sell_fees,
+        'net_after_sell': net_amount_after_sell,
+        'etf2_shares': purchase['etf2_shares'],
+        'purchase_amount': purchase['purchase_amount'],
+        'buy_fees': purchase['buy_fees'],
+        'remaining_cash': purchase['remaining_cash'],
+        'total_transaction_cost': total_transaction_cost,
+        'annual_performance_etf1': annual_performance_etf1,
+        'annual_performance_etf2': annual_performance_etf2,
+        'annual_performance_gain': annual_performance_gain,
+        'payback_years': payback_years,
+        'payback_months': payback_years * 12,
+        'impossible_replacement': ~possible
+    }
@@ -0,0 +1,308 @@
+"""
+Calcul de rentabilité en lot, sans interface Streamlit
+
+Lit des scénarios d'arbitrage depuis un fichier CSV ou JSONL, par paquets, et
+écrit les résultats au fil de l'eau (CSV ou Parquet) : la mémoire utilisée ne
+dépend que de la taille des paquets, pas de celle du fichier.
+
+Colonnes attendues : etf1_ticker, etf2_ticker, etf1_shares, broker, grille.
+Colonnes optionnelles : etf1_price, etf2_price (sinon demandés au fournisseur
+de prix), etf1_td, etf2_td (sinon lues dans etfs_TD.csv), custom_sell_fee,
+custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type. Les autres colonnes
+(identifiant client, etc.) sont recopiées telles quelles dans les résultats.
+
+Chaque paquet est regroupé par grille et évalué par
+calculate_replacement_profitability_batch, dont les résultats sont identiques
+à ceux de calculate_replacement_profitability_td scénario par scénario.
+
+Usage (depuis la racine du dépôt) :
+    python -m batch scenarios.csv resultats.parquet [--workers 4] [--prices replay:prix.csv]
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from arbitrage import calculate_replacement_profitability_batch
+from etf_data import ETFS_FILE_PATH, EtfTable, load_etf_info
+from fees import (
+    BROKERS_FILE_PATH, compile_broker_structures, is_known_grille, read_broker_structures, resolve_swap_schedules
+)
+
+DEFAULT_CHUNK_ROWS = 10_000
+# Paquets en cours de calcul par processus (borne la mémoire en mode parallèle)
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+SCENARIO_COLUMNS = ['etf1_ticker', 'etf2_ticker', 'etf1_shares', 'broker', 'grille']
+CUSTOM_FEE_COLUMNS = ['custom_sell_fee', 'custom_sell_fee_type', 'custom_buy_fee', 'custom_buy_fee_type']
+RESULT_COLUMNS = [
+    'etf1_price', 'etf2_price', 'etf1_td', 'etf2_td',
+    'sell_amount', 'sell_fees', 'net_after_sell', 'etf2_shares', 'purchase_amount', 'buy_fees',
+    'remaining_cash', 'total_transaction_cost', 'annual_performance_etf1', 'annual_performance_etf2',
+    'annual_performance_gain', 'payback_years', 'payback_months', 'impossible_replacement', 'error',
+]
+# Types Parquet des colonnes connues : identiques pour tous les paquets, même entièrement vides
+PARQUET_TYPES = {
+    'etf1_shares': 'float64', 'custom_sell_fee': 'float64', 'custom_buy_fee': 'float64',
+    'custom_sell_fee_type': 'string', 'custom_buy_fee_type': 'string',
+    **{column: 'float64' for column in RESULT_COLUMNS},
+    'etf2_shares': 'int64', 'impossible_replacement': 'bool', 'error': 'string',
+}
+
+# Contexte de calcul d'un processus (chargé une seule fois par processus)
+_context = {}
+
+
+def read_scenarios(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Itère sur les scénarios par paquets de chunk_rows lignes (CSV ou JSONL)"""
+    if str(path).endswith((".jsonl", ".ndjson")):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_rows)
+    for chunk in reader:
+        missing = [column for column in SCENARIO_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans {path} : {', '.join(missing)}")
+        chunk['etf1_ticker'] = chunk['etf1_ticker'].astype(str).str.strip()
+        chunk['etf2_ticker'] = chunk['etf2_ticker'].astype(str).str.strip()
+        yield chunk.reset_index(drop=True)
+
+
+def _optional_column(chunk, column, fallback):
+    """Colonne optionnelle du scénario, complétée ligne à ligne par fallback (Series)"""
+    if column not in chunk.columns:
+        return fallback.astype(float)
+    return pd.to_numeric(chunk[column], errors='coerce').fillna(fallback).astype(float)
+
+
+def _custom_fee_value(value):
+    """Normalise une cellule de frais personnalisés (vide -> None)"""
+    return None if pd.isna(value) else value
+
+
+def evaluate_scenarios(chunk, etf_info, broker_structures, compiled_schedules=None, prices=None):
+    """
+    Évalue un paquet de scénarios et retourne le paquet complété des colonnes de résultat
+    Les scénarios incomplets (ticker, courtier ou grille inconnu, prix indisponible) sont signalés dans la colonne error
+    """
+    prices = prices or {}
+    result = chunk.copy()
+    if isinstance(etf_info, EtfTable):
+        tds = dict(zip(etf_info.tickers, etf_info.tracking_difference.tolist()))
+    else:
+        tds = {ticker: info['tracking_difference'] for ticker, info in etf_info.items()}
+    for side in ('etf1', 'etf2'):
+        tickers = chunk[f'{side}_ticker']
+        result[f'{side}_price'] = _optional_column(chunk, f'{side}_price', tickers.map(prices))
+        result[f'{side}_td'] = _optional_column(chunk, f'{side}_td', tickers.map(tds))
+    result['etf1_shares'] = pd.to_numeric(chunk['etf1_shares'], errors='coerce')
+    for column in CUSTOM_FEE_COLUMNS:
+        if column in chunk.columns:
+            values = chunk[column].astype(object).where(chunk[column].notna(), None)
+            result[column] = pd.to_numeric(values, errors='coerce') if column.endswith('_fee') else values.astype('string')
+
+    error = pd.Series(None, index=chunk.index, dtype=object)
+    for side in ('etf2', 'etf1'):
+        error[result[f'{side}_price'].isna()] = f"Prix {side.upper()} indisponible"
+        error[result[f'{side}_td'].isna()] = f"Ticker {side.upper()} inconnu"
+    error[result['etf1_shares'].isna() | (result['etf1_shares'] <= 0)] = "Nombre de parts invalide"
+    # Courtier ou grille absent du catalogue (faute de frappe) : pas de calcul à frais nuls
+    unknown = [not is_known_grille(broker_name, grille_name, broker_structures)
+               for broker_name, grille_name in zip(chunk['broker'].tolist(), chunk['grille'].tolist())]
+    error[np.array(unknown, dtype=bool)] = "Courtier/grille inconnu"
+    result['error'] = error.astype('string')
+
+    outputs = {column: np.full(len(chunk), np.nan) for column in RESULT_COLUMNS[4:-2]}
+    outputs['impossible_replacement'] = np.zeros(len(chunk), dtype=bool)
+
+    custom_columns = [column for column in CUSTOM_FEE_COLUMNS if column in chunk.columns]
+    valid = result[error.isna()]
+    inputs = [result[column].to_numpy(dtype=float)
+              for column in ('etf1_shares', 'etf1_price', 'etf1_td', 'etf2_price', 'etf2_td')]
+    valid_rows = valid.index.to_numpy()
+    # Un seul appel vectorisé par combinaison (courtier, grille, frais personnalisés)
+    for key, positions in valid.groupby(['broker', 'grille'] + custom_columns, dropna=False, sort=False).indices.items():
+        key = key if isinstance(key, tuple) else (key,)
+        custom = dict(zip(custom_columns, (_custom_fee_value(value) for value in key[2:])))
+        sell_schedule, buy_schedule = resolve_swap_schedules(
+            key[0], key[1], broker_structures,
+            custom.get('custom_sell_fee'), custom.get('custom_sell_fee_type'),
+            custom.get('custom_buy_fee'), custom.get('custom_buy_fee_type'),
+            compiled_schedules
+        )
+        rows = valid_rows[positions]
+        swap = calculate_replacement_profitability_batch(*(values[rows] for values in inputs), sell_schedule, buy_schedule)
+        for column, values in swap.items():
+            outputs[column][rows] = values
+
+    for column, values in outputs.items():
+        result[column] = values
+    result['etf2_shares'] = result['etf2_shares'].astype('Int64')
+    return result
+
+
+def _init_worker(etfs_path, brokers_path):
+    """Charge l'univers et les grilles compilées une fois par processus"""
+    broker_structures = read_broker_structures(brokers_path)
+    _context['etf_info'] = load_etf_info(etfs_path)[0]
+    _context['broker_structures'] = broker_structures
+    _context['compiled_schedules'] = compile_broker_structures(broker_structures)
+
+
+def _evaluate_task(task):
+    """Évalue un paquet dans un processus du pool"""
+    chunk, prices = task
+    return evaluate_scenarios(chunk, _context['etf_info'], _context['broker_structures'],
+                              _context['compiled_schedules'], prices)
+
+
+def _chunk_prices(chunk, price_provider):
+    """Prix manquants du paquet, demandés en un seul lot au fournisseur"""
+    if price_provider is None:
+        return {}
+    tickers = []
+    for side in ('etf1', 'etf2'):
+        column = f'{side}_price'
+        needed = chunk[column].isna() if column in chunk.columns else pd.Series(True, index=chunk.index)
+        tickers += chunk.loc[needed, f'{side}_ticker'].tolist()
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    try:
+        return price_provider(tickers)
+    except Exception:
+        # Fournisseur en échec (réseau, yfinance) : les lignes sans prix sont signalées, le lot continue
+        return {}
+
+
+def iter_results(chunks, price_provider=None, workers=1, etfs_path=ETFS_FILE_PATH, brokers_path=BROKERS_FILE_PATH):
+    """
+    Évalue les paquets de scénarios dans l'ordre, en série ou sur plusieurs processus
+    Les prix sont résolus dans le processus principal, un lot par paquet
+    """
+    tasks = ((chunk, _chunk_prices(chunk, price_provider)) for chunk in chunks)
+    if workers <= 1:
+        _init_worker(etfs_path, brokers_path)
+        for task in tasks:
+            yield _evaluate_task(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(etfs_path, brokers_path)) as executor:
+        # Fenêtre glissante : on ne lit pas le paquet suivant tant que trop de paquets sont en cours
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(executor.submit(_evaluate_task, task))
+            if len(in_flight) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class ResultWriter:
+    """Écrit les paquets de résultats au fil de l'eau dans un fichier CSV ou Parquet"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet = str(path).endswith(".parquet")
+        self._writer = None
+        self._schema = None
+
+    @staticmethod
+    def _parquet_schema(frame):
+        """
+        Schéma commun à tous les paquets : types déclarés pour les colonnes connues,
+        types du premier paquet pour les colonnes recopiées (texte si elles y sont vides)
+        """
+        import pyarrow as pa
+
+        fields = []
+        for field in pa.Schema.from_pandas(frame, preserve_index=False):
+            if field.name in PARQUET_TYPES:
+                field = pa.field(field.name, pa.type_for_alias(PARQUET_TYPES[field.name]))
+            elif frame[field.name].isna().all():
+                field = pa.field(field.name, pa.string())
+            fields.append(field)
+        return pa.schema(fields)
+
+    def _conform(self, frame):
+        """Colonnes recopiées déclarées texte mais lues autrement dans ce paquet (vides -> float) converties en texte"""
+        import pyarrow as pa
+
+        for field in self._schema:
+            if pa.types.is_string(field.type) and frame[field.name].dtype != object:
+                frame = frame.assign(**{field.name: frame[field.name].astype('string')})
+        return frame
+
+    def write(self, frame):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._schema = self._parquet_schema(frame)
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            table = pa.Table.from_pandas(self._conform(frame), schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_batch(input_path, output_path, price_provider=None, workers=1, chunk_rows=DEFAULT_CHUNK_ROWS,
+              etfs_path=ETFS_FILE_PATH, brokers_path=BROKERS_FILE_PATH):
+    """Traite un fichier de scénarios complet ; retourne {'rows', 'errors', 'seconds'}"""
+    start = time.perf_counter()
+    errors = 0
+    with ResultWriter(output_path) as writer:
+        for result in iter_results(read_scenarios(input_path, chunk_rows), price_provider, workers,
+                                   etfs_path, brokers_path):
+            errors += int(result['error'].notna().sum())
+            writer.write(result)
+    return {'rows': writer.rows, 'errors': errors, 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcule la rentabilité d'arbitrages en lot")
+    parser.add_argument("input", help="scénarios (.csv ou .jsonl)")
+    parser.add_argument("output", help="résultats (.csv ou .parquet)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--prices", default=os.environ.get("PRICE_PROVIDERS"),
+                        help='fournisseurs pour les prix absents du fichier, ex : "replay:prix.csv,yfinance"')
+    parser.add_argument("--offline", action="store_true", help="uniquement les cours du stockage local")
+    parser.add_argument("--etfs", default=ETFS_FILE_PATH)
+    parser.add_argument("--brokers", default=BROKERS_FILE_PATH)
+    args = parser.parse_args()
+
+    price_provider = None
+    if args.prices or args.offline:
+        from price_providers import provider_from_spec
+        from quote_store import QuoteStore, StoreBackedProvider
+
+        upstream = provider_from_spec(args.prices) if args.prices else None
+        price_provider = StoreBackedProvider(QuoteStore(), upstream, offline=args.offline)
+
+    summary = run_batch(args.input, args.output, price_provider, args.workers, args.chunk_rows,
+                        args.etfs, args.brokers)
+    print(f"{summary['rows']} scénarios traités en {summary['seconds']:.2f}s "
+          f"({summary['errors']} en erreur) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark du mode lot (batch.run_batch)
+
+Génère des scénarios synthétiques : grilles du catalogue d'abord, puis frais
+personnalisés et une colonne recopiée renseignée seulement en fin de fichier
+(les premiers paquets n'ont donc que des valeurs vides dans ces colonnes).
+Mesure le débit en CSV et en Parquet, et vérifie que le Parquet écrit en
+plusieurs paquets contient les mêmes résultats que le CSV écrit d'un bloc.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_batch [--rows 100000] [--chunk-rows 10000]
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from batch import RESULT_COLUMNS, run_batch
+from etf_data import read_etfs_frame
+from fees import BROKERS_FILE_PATH, read_broker_structures
+
+SEED = 42
+
+
+def synthetic_scenarios(n_rows, seed=SEED):
+    """Scénarios aléatoires ; la seconde moitié utilise des frais personnalisés"""
+    rng = np.random.default_rng(seed)
+    tickers = read_etfs_frame()['Ticker'].to_numpy()
+    grilles = [(broker_name, grille_name) for broker_name, broker in read_broker_structures(BROKERS_FILE_PATH).items()
+               for grille_name in broker['grilles']]
+    chosen = rng.integers(0, len(grilles), n_rows)
+    custom = np.arange(n_rows) >= n_rows // 2
+    return pd.DataFrame({
+        'client': np.arange(n_rows),
+        'note': np.where(custom, "frais négociés", None),
+        'etf1_ticker': rng.choice(tickers, n_rows),
+        'etf2_ticker': rng.choice(tickers, n_rows),
+        'etf1_shares': rng.integers(1, 5_000, n_rows),
+        'broker': np.where(custom, "Personnalisé", [grilles[i][0] for i in chosen]),
+        'grille': np.where(custom, "custom", [grilles[i][1] for i in chosen]),
+        'etf1_price': rng.uniform(5, 500, n_rows).round(2),
+        'etf2_price': rng.uniform(5, 500, n_rows).round(2),
+        'custom_sell_fee': np.where(custom, 0.99, np.nan),
+        'custom_sell_fee_type': np.where(custom, "fixed", None),
+        'custom_buy_fee': np.where(custom, 0.1, np.nan),
+        'custom_buy_fee_type': np.where(custom, "percentage", None),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--chunk-rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "scenarios.csv")
+        synthetic_scenarios(args.rows).to_csv(input_path, index=False)
+
+        outputs = {}
+        for extension, chunk_rows in (("csv", args.rows), ("parquet", args.chunk_rows)):
+            output_path = os.path.join(directory, f"resultats.{extension}")
+            summary = run_batch(input_path, output_path, chunk_rows=chunk_rows)
+            outputs[extension] = output_path
+            print(f"{extension:<8} paquets de {chunk_rows:>7} : {summary['rows'] / summary['seconds']:10.0f} "
+                  f"scénarios/s ({summary['errors']} en erreur)")
+
+        from_csv = pd.read_csv(outputs['csv'])
+        from_parquet = pd.read_parquet(outputs['parquet'])
+        numeric = [column for column in RESULT_COLUMNS if column not in ('impossible_replacement', 'error')]
+        identical = (np.allclose(from_csv[numeric].to_numpy(float), from_parquet[numeric].to_numpy(float),
+                                 rtol=0, atol=1e-9, equal_nan=True)
+                     and from_csv['note'].fillna("").tolist() == from_parquet['note'].fillna("").tolist())
+        print(f"Parquet en plusieurs paquets identique au CSV : {identical}")
+
+
+if __name__ == "__main__":
+    main()
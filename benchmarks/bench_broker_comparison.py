@@ -0,0 +1,56 @@
+"""
+Benchmark de la comparaison de courtiers sur un catalogue de grande taille
+
+Génère un catalogue synthétique de plusieurs centaines de grilles (tous types
+confondus) et mesure le temps d'une comparaison complète pour un arbitrage.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_broker_comparison
+"""
+import time
+
+import numpy as np
+
+from broker_comparison import compare_brokers
+from fees import compile_broker_structures
+
+CATALOGUE_SIZES = [10, 100, 500, 1000]
+SEED = 42
+
+
+def synthetic_catalogue(n_grilles, seed=SEED):
+    """Catalogue de n_grilles grilles réparties entre types simple, paliers et mixed"""
+    rng = np.random.default_rng(seed)
+    grilles = {}
+    for index in range(n_grilles):
+        kind = index % 3
+        if kind == 0:
+            grilles[f"Simple {index}"] = {"type": "simple", "fee_type": "percentage",
+                                          "fee": round(rng.uniform(0.05, 0.6), 2)}
+        elif kind == 1:
+            threshold = float(rng.integers(500, 20000))
+            grilles[f"Paliers {index}"] = {"type": "paliers", "paliers": [
+                {"min": 0, "max": threshold, "fee_type": "fixed", "fee": round(rng.uniform(1, 20), 2)},
+                {"min": threshold, "max": 999999999, "fee_type": "percentage",
+                 "fee": round(rng.uniform(0.05, 0.6), 2), "min_fee": round(rng.uniform(0, 10), 2)},
+            ]}
+        else:
+            grilles[f"Mixed {index}"] = {"type": "mixed", "fixed": round(rng.uniform(1, 10), 2),
+                                         "threshold": float(rng.integers(500, 20000)),
+                                         "percentage": round(rng.uniform(0.05, 0.3), 2)}
+    return {"Synthétique": {"grilles": grilles}}
+
+
+def main():
+    for n_grilles in CATALOGUE_SIZES:
+        broker_structures = synthetic_catalogue(n_grilles)
+        compiled = compile_broker_structures(broker_structures)
+
+        start = time.perf_counter()
+        table = compare_brokers(100, 95.3, 0.1, 41.7, 0.6, broker_structures, compiled_schedules=compiled)
+        elapsed = time.perf_counter() - start
+        print(f"{n_grilles:>5} grilles : {elapsed * 1000:7.2f} ms (meilleure : {table.iloc[0]['grille']})")
+
+
+if __name__ == "__main__":
+    main()
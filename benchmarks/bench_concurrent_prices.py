@@ -0,0 +1,46 @@
+"""
+Latence de récupération des prix ETF1 / ETF2 : séquentielle contre concurrente
+
+Utilise un fournisseur local avec délai artificiel : en mode concurrent, la
+latence totale doit être celle de la demande la plus lente, pas la somme.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_concurrent_prices [--delay 0.5]
+"""
+import argparse
+import time
+
+from price_providers import FakePriceProvider
+from prices import PriceService, wait_for_prices
+
+TICKERS = ["MEUD.PA", "SP5C.PA"]
+
+
+def fresh_service(delay_seconds):
+    """Service sans cache, adossé à un fournisseur lent"""
+    return PriceService(FakePriceProvider({"MEUD.PA": 250.1, "SP5C.PA": 41.7}, delay_seconds=delay_seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=0.5, help="délai du fournisseur par demande (s)")
+    args = parser.parse_args()
+
+    service = fresh_service(args.delay)
+    start = time.perf_counter()
+    sequential = [service.get_price(ticker) for ticker in TICKERS]
+    sequential_seconds = time.perf_counter() - start
+
+    service = fresh_service(args.delay)
+    start = time.perf_counter()
+    concurrent = wait_for_prices([service.submit_price(ticker) for ticker in TICKERS])
+    concurrent_seconds = time.perf_counter() - start
+
+    assert sequential == concurrent
+    print(f"Délai fournisseur : {args.delay:.2f} s par demande")
+    print(f"Séquentiel : {sequential_seconds:.3f} s")
+    print(f"Concurrent : {concurrent_seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
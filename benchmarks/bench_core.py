@@ -0,0 +1,296 @@
+"""
+Suite de benchmarks du cœur de calcul, avec comparaison à une référence
+
+Cas paramétrés :
+- calculate_fees (et calculate_fees_batch) : chaque type de grille, montants de 1 € à 10^7 € ;
+- calculate_optimal_etf2_purchase : chaque type de grille, montants de 1 € à 10^7 €, prix de 1 € à 500 € ;
+- calculate_replacement_profitability_td : mêmes paramètres ;
+- load_etf_info (chargement de l'univers) : fichier réel et univers synthétiques jusqu'à 100 000 lignes.
+
+Chaque cas est mesuré en temps par appel (meilleure de plusieurs séries), puis
+rapporté au temps d'un noyau de référence fixe (boucle Python et tri numpy)
+mesuré juste après lui : les résultats comparés sont des multiples de ce noyau,
+et non des durées propres à une machine. La référence enregistrée reste ainsi
+utilisable sur une autre machine ou un runner de CI plus ou moins rapide, et
+une variation de vitesse de la machine en cours d'exécution touche le cas et
+son noyau de la même façon.
+
+Les résultats sont écrits en JSON (temps relatifs, et temps absolus pour
+information) ; avec --baseline, le script échoue (code 1) si une famille de
+cas (moyenne géométrique des ratios mesure / référence) est plus lente que la
+référence au-delà de --threshold, ou si un cas isolé l'est au-delà de
+--case-threshold. Le seuil par cas est plus large : sur une machine partagée,
+un cas de quelques microsecondes varie facilement de 30 %. Les familles sur de
+gros tableaux ou avec lecture de fichiers (BULK_FAMILIES) dépendent de la
+mémoire et des E/S plus que du noyau de référence : elles ont leur propre
+seuil, --bulk-threshold. Avant d'échouer, les cas en régression sont mesurés à
+nouveau (CONFIRM_ROUNDS passes) : seul un ralentissement confirmé fait échouer.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_core --save resultats.json
+    python -m benchmarks.bench_core --baseline benchmarks/baseline_core.json [--threshold 0.25]
+    python -m benchmarks.bench_core --save-baseline   # remplace la référence
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+import numpy as np
+
+from arbitrage import calculate_optimal_etf2_purchase, calculate_replacement_profitability_td
+from etf_data import ETFS_FILE_PATH, load_etf_info
+from fees import calculate_fees, calculate_fees_batch, compile_broker_structures
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline_core.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_CASE_THRESHOLD = 1.0
+# Cas sur 10^5 éléments ou lisant un CSV : ils varient de ±30 % d'une mesure à l'autre
+BULK_FAMILIES = ("calculate_fees_batch", "load_etf_info")
+DEFAULT_BULK_THRESHOLD = 0.5
+# Durée minimale d'une série de mesures (le nombre d'appels est ajusté en conséquence)
+MIN_SERIES_SECONDS = 0.02
+SERIES = 3
+DEFAULT_ROUNDS = 3
+# Passes supplémentaires sur les cas en régression avant de conclure
+CONFIRM_ROUNDS = 3
+SEED = 42
+
+POSITION_AMOUNTS = [1, 100, 10_000, 1_000_000, 10_000_000]
+SHARE_PRICES = [1, 50, 500]
+UNIVERSE_SIZES = [10_000, 100_000]
+BATCH_AMOUNTS = 100_000
+# Noyau de référence : travail fixe, interprété et vectorisé, auquel chaque cas est rapporté
+REFERENCE_CASE = "reference_kernel"
+_REFERENCE_VALUES = [float(value) for value in range(2_000)]
+_REFERENCE_ARRAY = np.random.default_rng(SEED).uniform(0, 1, 20_000)
+
+# Une grille de chaque type ; les frais personnalisés passent par le courtier "Personnalisé"
+BENCH_BROKER = "Bench"
+BENCH_STRUCTURES = {
+    BENCH_BROKER: {"grilles": {
+        "simple_fixed": {"type": "simple", "fee_type": "fixed", "fee": 2.0},
+        "simple_percentage": {"type": "simple", "fee_type": "percentage", "fee": 0.35},
+        "paliers": {"type": "paliers", "paliers": [
+            {"min": 0, "max": 500, "fee_type": "fixed", "fee": 1.99},
+            {"min": 500, "max": 2000, "fee_type": "percentage", "fee": 0.6, "min_fee": 3},
+            {"min": 2000, "max": 999999999, "fee_type": "percentage", "fee": 0.48, "min_fee": 5.5},
+        ]},
+        "mixed": {"type": "mixed", "fixed": 1.5, "threshold": 500, "percentage": 0.35},
+    }}
+}
+CUSTOM_FEES = {
+    "custom_fixed": (2.5, "fixed"),
+    "custom_percentage": (0.2, "percentage"),
+}
+
+
+def fee_cases():
+    """(nom, courtier, grille, frais personnalisé, type) pour chaque type de grille"""
+    cases = [(name, BENCH_BROKER, name, None, None) for name in BENCH_STRUCTURES[BENCH_BROKER]["grilles"]]
+    cases += [(name, "Personnalisé", "Frais personnalisés", fee, fee_type)
+              for name, (fee, fee_type) in CUSTOM_FEES.items()]
+    return cases
+
+
+def reference_kernel():
+    """Travail de référence : boucle Python sur des floats et tri numpy"""
+    total = 0.0
+    for value in _REFERENCE_VALUES:
+        total += value * 1.0001
+    np.sort(_REFERENCE_ARRAY)
+    return total
+
+
+def time_per_call(function, series=SERIES):
+    """Meilleur temps par appel (secondes) sur plusieurs séries calibrées (la série de calibrage compte)"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SERIES_SECONDS:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(MIN_SERIES_SECONDS / elapsed * 1.2))
+    best = elapsed / number
+    for _ in range(series - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def write_synthetic_universe(path, n_rows, seed=SEED):
+    """CSV au format de etfs_TD.csv avec n_rows ETFs synthétiques"""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Ticker", "Nom du fonds", "Frais", "Distribution", "Réplication", "ISIN",
+                         "Annualised_Tracking_Difference"])
+        for index in range(n_rows):
+            writer.writerow([f"SYN{index:06d}.PA", f"ETF synthétique {index}",
+                             f"{rng.uniform(0.03, 0.8):.2f}%".replace(".", ","), "Capitalisation",
+                             "Réplication complète", f"FR{index:010d}", f"{rng.normal(-0.2, 0.5):.3f}"])
+
+
+def build_cases(directory):
+    """Liste des cas (nom, fonction sans argument) ; les univers synthétiques sont écrits dans directory"""
+    cases = []
+    structures = BENCH_STRUCTURES
+    compiled = compile_broker_structures(structures)
+    amounts = np.random.default_rng(SEED).uniform(1, 10_000_000, BATCH_AMOUNTS)
+
+    for case, broker, grille, fee, fee_type in fee_cases():
+        for amount in POSITION_AMOUNTS:
+            cases.append((f"calculate_fees/{case}/amount={amount}",
+                          partial(calculate_fees, amount, broker, grille, structures, fee, fee_type)))
+        cases.append((f"calculate_fees_batch/{case}/n={BATCH_AMOUNTS}",
+                      partial(calculate_fees_batch, amounts, broker, grille, structures, fee, fee_type, compiled)))
+
+        for amount in POSITION_AMOUNTS:
+            for price in SHARE_PRICES:
+                cases.append((f"calculate_optimal_etf2_purchase/{case}/amount={amount}/price={price}",
+                              partial(calculate_optimal_etf2_purchase, amount, price, broker, grille, structures,
+                                      fee, fee_type)))
+                # Position ETF1 de `amount` € au prix `price`, remplacée par un ETF2 de prix voisin
+                shares = max(1, round(amount / price))
+                cases.append((f"calculate_replacement_profitability_td/{case}/amount={amount}/price={price}",
+                              partial(calculate_replacement_profitability_td, shares, price, -0.3, price * 0.97, 0.1,
+                                      broker, grille, structures, fee, fee_type, fee, fee_type)))
+
+    # Lecture du CSV mesurée, même si un sidecar binaire existe
+    cases.append(("load_etf_info/etfs_TD.csv", partial(load_etf_info, ETFS_FILE_PATH, use_sidecar=False)))
+    for n_rows in UNIVERSE_SIZES:
+        path = os.path.join(directory, f"universe_{n_rows}.csv")
+        write_synthetic_universe(path, n_rows)
+        cases.append((f"load_etf_info/synthetic/rows={n_rows}", partial(load_etf_info, path, use_sidecar=False)))
+    return cases
+
+
+def run_cases(selected=None, rounds=DEFAULT_ROUNDS):
+    """
+    Exécute les cas (filtrés par sous-chaîne)
+    Retourne ({nom du cas: secondes par appel}, {nom du cas: secondes par appel du noyau de référence})
+    Les cas sont mesurés à tour de rôle sur plusieurs passes et le meilleur temps est retenu,
+    pour qu'un ralentissement passager de la machine ne touche pas toutes les séries d'un même cas ;
+    le noyau de référence est mesuré juste après chaque cas, son meilleur temps est retenu de même
+    """
+    results = {}
+    references = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [(name, function) for name, function in build_cases(directory)
+                 if not selected or any(pattern in name for pattern in selected)]
+        for _ in range(rounds):
+            for name, function in cases:
+                results[name] = min(results.get(name, float('inf')), time_per_call(function))
+                references[name] = min(references.get(name, float('inf')), time_per_call(reference_kernel, series=1))
+    for name, seconds in results.items():
+        print(f"{name:<80} {seconds * 1e6:12.2f} µs")
+    return results, references
+
+
+def relative_to_reference(results, references):
+    """Temps de chaque cas en multiples du noyau de référence mesuré à côté de lui"""
+    return {name: seconds / references[name] for name, seconds in results.items()}
+
+
+def family(name):
+    """Famille d'un cas : préfixe avant le premier "/" """
+    return name.split('/')[0]
+
+
+def compare(results, baseline, threshold, case_threshold, bulk_threshold=DEFAULT_BULK_THRESHOLD):
+    """
+    Régressions par famille de cas et par cas isolé
+    Retourne (familles, cas) : listes de (nom, ratio mesure / référence) au-delà des seuils
+    """
+    log_ratios = {}
+    cases = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = seconds / reference
+        log_ratios.setdefault(family(name), []).append(np.log(ratio))
+        if ratio > 1 + case_threshold:
+            cases.append((name, ratio))
+    families = [(name, float(np.exp(np.mean(values)))) for name, values in log_ratios.items()]
+    return [(name, ratio) for name, ratio in families
+            if ratio > 1 + (bulk_threshold if name in BULK_FAMILIES else threshold)], cases
+
+
+def environment():
+    return {
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--save', help="fichier JSON des résultats")
+    parser.add_argument('--baseline', help="référence JSON à laquelle comparer les résultats")
+    parser.add_argument('--save-baseline', action='store_true', help=f"écrit les résultats dans {BASELINE_PATH}")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="ralentissement toléré par famille de cas (0.25 = +25 %%)")
+    parser.add_argument('--case-threshold', type=float, default=DEFAULT_CASE_THRESHOLD,
+                        help="ralentissement toléré pour un cas isolé (1.0 = x2)")
+    parser.add_argument('--bulk-threshold', type=float, default=DEFAULT_BULK_THRESHOLD,
+                        help=f"ralentissement toléré pour les familles {', '.join(BULK_FAMILIES)}")
+    parser.add_argument('--filter', nargs='+', help="ne lance que les cas contenant l'une de ces chaînes")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="passes de mesure sur l'ensemble des cas")
+    args = parser.parse_args()
+
+    seconds, references = run_cases(args.filter, args.rounds)
+    results = relative_to_reference(seconds, references)
+    report = {
+        'environment': environment(),
+        'unit': f'multiple_of_adjacent_{REFERENCE_CASE}',
+        'reference_seconds': min(references.values()),
+        'results': results,
+        'seconds_per_call': seconds,
+    }
+    for path in filter(None, [args.save, BASELINE_PATH if args.save_baseline else None]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Résultats écrits dans {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline_report = json.load(f)
+        if baseline_report.get('unit') != report['unit']:
+            sys.exit(f"{args.baseline} : référence en {baseline_report.get('unit')}, attendue en {report['unit']} "
+                     f"(à régénérer avec --save-baseline)")
+        baseline = baseline_report['results']
+        families, cases = compare(results, baseline, args.threshold, args.case_threshold, args.bulk_threshold)
+        if families or cases:
+            # Une mesure malchanceuse ne suffit pas : les cas suspects sont mesurés à nouveau
+            suspects = [f"{name}/" for name, _ in families] + [name for name, _ in cases]
+            print(f"Nouvelle mesure de {', '.join(suspects)} ({CONFIRM_ROUNDS} passes)")
+            retried_seconds, retried_references = run_cases(suspects, CONFIRM_ROUNDS)
+            for name, ratio in relative_to_reference(retried_seconds, retried_references).items():
+                if name in results:
+                    results[name] = min(results[name], ratio)
+            families, cases = compare(results, baseline, args.threshold, args.case_threshold, args.bulk_threshold)
+        for name, ratio in families:
+            print(f"RÉGRESSION famille {name} : x{ratio:.2f} (moyenne géométrique)")
+        for name, ratio in cases:
+            print(f"RÉGRESSION cas {name} : {baseline[name]:.3g} -> {results[name]:.3g} noyaux de référence (x{ratio:.2f})")
+        if families or cases:
+            sys.exit(1)
+        print(f"Aucune régression ({len(results)} cas comparés, seuils +{args.threshold:.0%} par famille "
+              f"(+{args.bulk_threshold:.0%} pour {', '.join(BULK_FAMILIES)}), +{args.case_threshold:.0%} par cas)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark de la simulation Monte Carlo des TD
+
+Simule un million de trajectoires sur 10 ans pour un arbitrage type, avec un
+nombre croissant de processus, et vérifie que le résultat ne dépend pas du
+nombre de processus (même graine).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_monte_carlo [--paths 1000000] [--workers 1 2 4]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from arbitrage import calculate_replacement_profitability_td
+from monte_carlo import DEFAULT_PATHS, simulate_swap, summarise_simulation
+
+BROKERS_FILE_PATH = "courtiers.json"
+SEED = 42
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with open(BROKERS_FILE_PATH, 'r', encoding='utf-8') as f:
+        broker_structures = json.load(f)
+    swap = calculate_replacement_profitability_td(100, 95.3, 0.1, 41.7, 0.6, "Boursorama", "Classic",
+                                                  broker_structures)
+
+    reference = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        months, net_gains = simulate_swap(swap, 0.1, 0.6, 0.3, 0.3, correlation=0.5,
+                                          n_paths=args.paths, seed=SEED, workers=workers)
+        elapsed = time.perf_counter() - start
+        summary = summarise_simulation(months, net_gains)
+        if reference is None:
+            reference = months
+        identical = np.array_equal(months, reference)
+        print(f"{workers} processus : {elapsed:6.2f} s, médiane {summary['break_even_months_percentiles'][50]:.2f} mois, "
+              f"P(rentable) {summary['probability_break_even']:.4f}, identique : {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark du solveur de parts ETF2 (calculate_optimal_etf2_purchase)
+
+Compare le nombre d'évaluations de frais et le temps de calcul du solveur par
+segments à l'ancienne recherche linéaire, pour des positions croissantes.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_optimal_purchase
+"""
+import json
+import time
+
+import arbitrage
+from fees import calculate_fees
+
+BROKERS_FILE_PATH = "courtiers.json"
+ETF2_PRICE = 1.37
+POSITION_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+# Au-delà, la recherche linéaire prend trop de temps pour un benchmark interactif
+LINEAR_MAX_POSITION = 1_000_000
+
+
+def linear_reference(net_amount_after_sell, etf2_price, broker_name, grille_name, broker_structures):
+    """
+    Ancienne implémentation : décrémente le nombre de parts une par une
+    Retourne (nombre de parts, nombre d'évaluations de frais)
+    """
+    max_possible_shares = int(net_amount_after_sell / etf2_price)
+    for etf2_shares in range(max_possible_shares, 0, -1):
+        purchase_amount = etf2_shares * etf2_price
+        buy_fees = calculate_fees(purchase_amount, broker_name, grille_name, broker_structures)
+        if net_amount_after_sell - purchase_amount - buy_fees >= 0:
+            return etf2_shares, max_possible_shares - etf2_shares + 1
+    return 0, max_possible_shares
+
+
+def count_fee_calls(function, *args):
+    """Exécute function en comptant les appels à calculate_fees depuis arbitrage"""
+    calls = [0]
+
+    def counting_fees(*fee_args):
+        calls[0] += 1
+        return calculate_fees(*fee_args)
+
+    arbitrage.calculate_fees = counting_fees
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        return result, calls[0], time.perf_counter() - start
+    finally:
+        arbitrage.calculate_fees = calculate_fees
+
+
+def main():
+    with open(BROKERS_FILE_PATH, 'r', encoding='utf-8') as f:
+        broker_structures = json.load(f)
+
+    print(f"{'Grille':<28}{'Position (€)':>14}{'Appels':>10}{'Solveur (ms)':>15}"
+          f"{'Appels lin.':>13}{'Linéaire (ms)':>15}")
+    for broker_name, broker in broker_structures.items():
+        for grille_name in broker["grilles"]:
+            for position in POSITION_SIZES:
+                result, calls, elapsed = count_fee_calls(
+                    arbitrage.calculate_optimal_etf2_purchase,
+                    position, ETF2_PRICE, broker_name, grille_name, broker_structures
+                )
+                linear_calls_text = linear_time_text = "-"
+                if position <= LINEAR_MAX_POSITION:
+                    start = time.perf_counter()
+                    expected, linear_calls = linear_reference(
+                        position, ETF2_PRICE, broker_name, grille_name, broker_structures
+                    )
+                    linear_time_text = f"{(time.perf_counter() - start) * 1000:.2f}"
+                    linear_calls_text = f"{linear_calls:,}"
+                    assert expected == result['etf2_shares'], (broker_name, grille_name, position)
+                print(f"{broker_name + ' / ' + grille_name:<28}{position:>14,}{calls:>10}"
+                      f"{elapsed * 1000:>15.3f}{linear_calls_text:>13}{linear_time_text:>15}")
+
+
+if __name__ == "__main__":
+    main()
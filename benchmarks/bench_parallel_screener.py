@@ -0,0 +1,77 @@
+"""
+Rapport de passage à l'échelle du screener parallèle
+
+Balaye l'univers complet (N x N) pour chaque grille de courtiers.json et
+plusieurs tailles de position, avec 1, 2, 4 puis 8 processus, et vérifie
+que le classement est identique à l'exécution série.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_parallel_screener [--workers 1 2 4 8]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_screener import BROKERS_FILE_PATH, TOP_K, synthetic_prices
+from etf_data import load_etf_info
+from fees import resolve_swap_schedules
+from parallel_screener import ParallelScreener
+from screener import build_universe, position_shares
+
+POSITION_VALUES = [1_000, 10_000, 100_000]
+DEFAULT_WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def run_sweep(parallel, universe, scenarios):
+    """Exécute tous les scénarios (grille x taille de position) et retourne les classements"""
+    etf1_rows = np.arange(len(universe['tickers']))
+    rankings = []
+    for sell_schedule, buy_schedule, position_value in scenarios:
+        rankings.append(parallel.screen(etf1_rows, position_shares(universe, position_value),
+                                        sell_schedule, buy_schedule, TOP_K))
+    return rankings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKER_COUNTS)
+    args = parser.parse_args()
+
+    etf_info, _ = load_etf_info()
+    with open(BROKERS_FILE_PATH, 'r', encoding='utf-8') as f:
+        broker_structures = json.load(f)
+    universe = build_universe(etf_info, synthetic_prices(list(etf_info)))
+
+    scenarios = [
+        resolve_swap_schedules(broker_name, grille_name, broker_structures) + (position_value,)
+        for broker_name, broker in broker_structures.items()
+        for grille_name in broker["grilles"]
+        for position_value in POSITION_VALUES
+    ]
+    n_funds = len(universe['tickers'])
+    print(f"{len(scenarios)} scénarios x {n_funds} x {n_funds} paires, {os.cpu_count()} coeur(s) disponible(s)")
+    print(f"{'Processus':>10}{'Durée (s)':>12}{'Accélération':>14}{'Paires/s':>16}")
+
+    reference = None
+    serial_seconds = None
+    for workers in args.workers:
+        with ParallelScreener(universe, workers=workers) as parallel:
+            start = time.perf_counter()
+            rankings = run_sweep(parallel, universe, scenarios)
+            elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference, serial_seconds = rankings, elapsed
+        else:
+            for expected, ranking in zip(reference, rankings):
+                assert np.array_equal(expected['payback_months'], ranking['payback_months'])
+
+        pairs_per_second = len(scenarios) * n_funds * n_funds / elapsed
+        print(f"{workers:>10}{elapsed:>12.2f}{serial_seconds / elapsed:>13.2f}x{pairs_per_second:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
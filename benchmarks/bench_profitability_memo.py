@@ -0,0 +1,68 @@
+"""
+Benchmark de la mémoïsation des calculs de rentabilité
+
+Parcourt une série de scénarios (toutes les grilles du catalogue, plusieurs
+nombres de parts) une première fois (calculs), puis une seconde fois
+(scénarios revisités) : temps moyen d'un appel direct à
+calculate_replacement_profitability_td, d'un miss et d'un hit de
+ProfitabilityMemo, compteurs du cache et vérification que les résultats
+mémorisés sont ceux du calcul direct.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_profitability_memo [--max-entries 256]
+"""
+import argparse
+import time
+
+from arbitrage import calculate_replacement_profitability_td
+from fees import BROKERS_FILE_PATH, compile_broker_structures, read_broker_structures
+from profitability_memo import DEFAULT_MAX_ENTRIES, ProfitabilityMemo
+
+
+def scenarios(broker_structures):
+    """(parts, courtier, grille) : toutes les grilles du catalogue pour quelques tailles de ligne"""
+    return [(shares, broker_name, grille_name)
+            for shares in (10, 100, 1_000, 10_000)
+            for broker_name, broker in broker_structures.items()
+            for grille_name in broker['grilles']]
+
+
+def mean_microseconds(function, cases):
+    start = time.perf_counter()
+    results = [function(*case) for case in cases]
+    return (time.perf_counter() - start) / len(cases) * 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES)
+    args = parser.parse_args()
+
+    broker_structures = read_broker_structures(BROKERS_FILE_PATH)
+    compiled_schedules = compile_broker_structures(broker_structures)
+    cases = scenarios(broker_structures)
+    memo = ProfitabilityMemo(max_entries=args.max_entries)
+
+    def direct(shares, broker_name, grille_name):
+        return calculate_replacement_profitability_td(shares, 95.3, 0.1, 41.7, 0.6, broker_name, grille_name,
+                                                      broker_structures, compiled_schedules=compiled_schedules)
+
+    def memoised(shares, broker_name, grille_name):
+        return memo.calculate("CW8.PA", "WPEA.PA", shares, 95.3, 0.1, 41.7, 0.6, broker_name, grille_name,
+                              broker_structures, compiled_schedules=compiled_schedules)
+
+    direct_us, expected = mean_microseconds(direct, cases)
+    miss_us, _ = mean_microseconds(memoised, cases)
+    hit_us, revisited = mean_microseconds(memoised, cases)
+    stats = memo.stats()
+
+    print(f"{len(cases)} scénarios, cache de {args.max_entries} entrées")
+    print(f"  calcul direct  {direct_us:8.2f} µs / appel")
+    print(f"  miss           {miss_us:8.2f} µs / appel")
+    print(f"  hit            {hit_us:8.2f} µs / appel  (x{direct_us / hit_us:.1f})")
+    print(f"  compteurs : {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} évincés, "
+          f"{stats['size']} en cache ; résultats identiques : {revisited == expected}")
+
+
+if __name__ == "__main__":
+    main()
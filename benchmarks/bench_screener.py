@@ -0,0 +1,57 @@
+"""
+Benchmark du screener d'arbitrages sur l'univers complet
+
+Les prix sont synthétiques (graine fixe) pour ne pas dépendre du réseau ;
+les TD sont celles de etfs_TD.csv.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_screener
+"""
+import json
+import time
+
+import numpy as np
+
+from etf_data import load_etf_info
+from fees import resolve_swap_schedules
+from screener import build_universe, screen_holding, screen_universe
+
+BROKERS_FILE_PATH = "courtiers.json"
+POSITION_VALUE = 10_000
+TOP_K = 20
+SEED = 42
+
+
+def synthetic_prices(tickers, seed=SEED):
+    """Prix de parts entre 1 € et 500 €, reproductibles"""
+    rng = np.random.default_rng(seed)
+    return dict(zip(tickers, rng.uniform(1, 500, len(tickers))))
+
+
+def main():
+    etf_info, _ = load_etf_info()
+    with open(BROKERS_FILE_PATH, 'r', encoding='utf-8') as f:
+        broker_structures = json.load(f)
+    universe = build_universe(etf_info, synthetic_prices(list(etf_info)))
+    n_funds = len(universe['tickers'])
+
+    for broker_name, broker in broker_structures.items():
+        for grille_name in broker["grilles"]:
+            sell_schedule, buy_schedule = resolve_swap_schedules(broker_name, grille_name, broker_structures)
+
+            start = time.perf_counter()
+            screen_holding(universe, universe['tickers'][0], 100, sell_schedule, buy_schedule, TOP_K)
+            holding_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            ranking = screen_universe(universe, POSITION_VALUE, sell_schedule, buy_schedule, TOP_K)
+            sweep_seconds = time.perf_counter() - start
+
+            best = ranking.iloc[0] if not ranking.empty else None
+            best_text = f"{best['etf1']} -> {best['etf2']} ({best['payback_months']:.2f} mois)" if best is not None else "-"
+            print(f"{broker_name + ' / ' + grille_name:<28} 1 x {n_funds}: {holding_seconds * 1000:7.1f} ms"
+                  f"   {n_funds} x {n_funds}: {sweep_seconds:6.2f} s   meilleur : {best_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de la recherche d'ETFs pour les listes de sélection
+
+L'univers réel est dupliqué (tickers et ISIN suffixés, mêmes noms de fonds,
+comme les cotations multiples d'un même fonds) jusqu'à 50 000 lignes. Pour
+chaque taille : temps de construction de l'index, latence p50 / p99 d'une
+recherche (ticker, ISIN, début de nom, fautes de frappe) et nombre d'options
+envoyées au navigateur, comparés au formatage de toutes les options.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_search [--sizes 1488 10000 50000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from etf_data import load_etf_info
+from etf_search import DEFAULT_LIMIT, EtfSearchIndex
+
+QUERIES = ["CW8.PA", "cw8", "LU1681043599", "LU168", "amundi msci", "msci wrld", "stoxx euope 600",
+           "sp500", "ishares core", "world esg", "xtrackers", "em", "zzzz"]
+REPEATS = 20
+
+
+def synthetic_universe(etf_info, n_rows):
+    """Univers de n_rows lignes obtenu en dupliquant l'univers réel"""
+    items = list(etf_info.items())
+    universe = {}
+    for index in range(n_rows):
+        ticker, info = items[index % len(items)]
+        copy = index // len(items)
+        if copy:
+            ticker = f"{ticker}{copy}"
+            info = dict(info, isin=f"{info['isin']}{copy}")
+        universe[ticker] = info
+    return universe
+
+
+def all_labels(etf_info):
+    """Ancien comportement : toutes les options formatées à chaque réexécution"""
+    return [f"{x} - {etf_info.get(x, {}).get('isin', 'N/A')} - {etf_info.get(x, {}).get('name', 'N/A')}"
+            for x in [""] + list(etf_info)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1488, 10_000, 50_000])
+    args = parser.parse_args()
+
+    etf_info, _ = load_etf_info()
+    for n_rows in args.sizes:
+        universe = synthetic_universe(etf_info, n_rows)
+        start = time.perf_counter()
+        index = EtfSearchIndex(universe)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(REPEATS):
+            for query in QUERIES:
+                start = time.perf_counter()
+                results = index.search(query)
+                labels = [index.labels[ticker] for ticker in results]
+                latencies.append(time.perf_counter() - start)
+        latencies = np.array(latencies) * 1000
+
+        start = time.perf_counter()
+        labels = all_labels(universe)
+        format_all_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{n_rows:>6} ETFs  index {build_seconds:6.2f}s  recherche p50 {np.percentile(latencies, 50):6.3f} ms  "
+              f"p99 {np.percentile(latencies, 99):6.3f} ms  options {DEFAULT_LIMIT + 2:>3} "
+              f"(avant : {len(labels)} options formatées en {format_all_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
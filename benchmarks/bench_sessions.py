@@ -0,0 +1,114 @@
+"""
+Rapport mémoire : surcoût par session des données de référence
+
+Simule N sessions conservées en mémoire et mesure (tracemalloc) la mémoire
+retenue par session :
+- avant : chaque session construit son propre univers (etf_info), son propre
+  catalogue de courtiers, ses grilles compilées et les libellés des listes de
+  sélection ;
+- après : chaque session obtient les objets figés partagés par le processus
+  (shared_data.SharedFile).
+
+Avec --app, N sessions de l'application (streamlit.testing) sont en plus
+exécutées dans le même processus ; la mémoire retenue par les sessions
+suivant la première (arbre d'éléments de streamlit.testing compris) est
+rapportée au nombre de sessions.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_sessions [--sessions 50] [--app]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from etf_data import ETFS_FILE_PATH, frame_to_etf_info, read_etfs_frame
+from etf_search import format_label
+from fees import BROKERS_FILE_PATH, compile_broker_structures, read_broker_structures
+from shared_data import SharedFile, load_broker_snapshot, load_universe_snapshot
+
+
+def private_session():
+    """Données d'une session qui charge tout pour elle seule (comportement avant partage)"""
+    etf_info = frame_to_etf_info(read_etfs_frame(ETFS_FILE_PATH))
+    broker_structures = read_broker_structures(BROKERS_FILE_PATH)
+    return {
+        'etf_info': etf_info,
+        'broker_structures': broker_structures,
+        'compiled_schedules': compile_broker_structures(broker_structures),
+        'labels': [format_label(ticker, info) for ticker, info in etf_info.items()],
+    }
+
+
+def shared_session(universe, brokers):
+    """Données d'une session servie par les objets partagés du processus"""
+    universe_snapshot, broker_snapshot = universe.current(), brokers.current()
+    return {
+        'etf_info': universe_snapshot['etf_info'],
+        'broker_structures': broker_snapshot['broker_structures'],
+        'compiled_schedules': broker_snapshot['compiled_schedules'],
+        'labels': universe_snapshot['search_index'].labels,
+    }
+
+
+def retained_per_session(make_session, n_sessions):
+    """(mémoire retenue par session, mémoire fixe) en Mo, mesurées par tracemalloc"""
+    gc.collect()
+    tracemalloc.start()
+    sessions = [make_session()]
+    gc.collect()
+    one_session, _ = tracemalloc.get_traced_memory()
+    sessions += [make_session() for _ in range(n_sessions - 1)]
+    gc.collect()
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    per_session = (total - one_session) / max(1, n_sessions - 1)
+    return per_session / 2**20, (one_session - per_session) / 2**20
+
+
+def app_sessions(n_sessions):
+    """Mémoire retenue par session de l'application (tracemalloc, hors première session)"""
+    from streamlit.testing.v1 import AppTest
+
+    def run_session():
+        app = AppTest.from_file(os.path.abspath("App.py"), default_timeout=120)
+        app.run()
+        return app
+
+    sessions = [run_session()]
+    gc.collect()
+    tracemalloc.start()
+    sessions += [run_session() for _ in range(n_sessions - 1)]
+    gc.collect()
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total / 2**20 / max(1, n_sessions - 1), sum(len(app.exception) for app in sessions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--app', action='store_true', help="mesure aussi N sessions de l'application")
+    args = parser.parse_args()
+
+    universe = SharedFile(ETFS_FILE_PATH, load_universe_snapshot)
+    brokers = SharedFile(BROKERS_FILE_PATH, load_broker_snapshot)
+    for label, make_session in (("avant (données par session)", private_session),
+                                ("après (données partagées)", lambda: shared_session(universe, brokers))):
+        per_session, fixed = retained_per_session(make_session, args.sessions)
+        print(f"{label:<30} {per_session * 1024:10.1f} Ko par session  "
+              f"(fixe {fixed:6.1f} Mo, {args.sessions} sessions)")
+
+    if args.app:
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ.setdefault('OFFLINE_MODE', '1')
+            os.environ.setdefault('QUOTE_STORE_PATH', os.path.join(directory, 'quotes.sqlite'))
+            per_session, exceptions = app_sessions(args.sessions)
+        print(f"{'application':<30} {per_session * 1024:10.1f} Ko par session  "
+              f"({args.sessions} sessions, {exceptions} exceptions)")
+
+
+if __name__ == "__main__":
+    main()
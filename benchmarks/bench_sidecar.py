@@ -0,0 +1,71 @@
+"""
+Benchmark du démarrage : analyse du CSV / projection en mémoire du sidecar
+
+Pour l'univers réel et un univers dupliqué 100 fois :
+- temps de lecture du CSV (read_etfs_frame + EtfTable.from_frame) ;
+- temps de construction du sidecar (etf_sidecar.write_sidecar) ;
+- temps de chargement par load_etf_info() avec un sidecar à jour (mmap),
+  dont la vérification de fraîcheur ;
+- vérification que les deux chargements donnent les mêmes colonnes.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_sidecar [--sizes 1488 148800]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_universe_store import synthetic_frame
+from etf_data import EtfTable, load_etf_info, read_etfs_frame
+from etf_sidecar import write_sidecar
+
+
+def best_of(function, repeat=5):
+    """Meilleur temps (en ms) de repeat appels, et le résultat du dernier appel"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+
+def same_table(left, right):
+    """Mêmes tickers, mêmes TD / TER au bit près, mêmes lignes par ticker"""
+    if not (left.tickers.tolist() == right.tickers.tolist()
+            and np.array_equal(left.tracking_difference, right.tracking_difference, equal_nan=True)
+            and np.array_equal(left.ter, right.ter, equal_nan=True)):
+        return False
+    return all(left[ticker]['index'] == right[ticker]['index']
+               and left[ticker]['distribution'] == right[ticker]['distribution']
+               for ticker in left.tickers.tolist()[::97])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1488, 148_800])
+    args = parser.parse_args()
+
+    frame = read_etfs_frame()
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in args.sizes:
+            csv_path = os.path.join(directory, f"etfs_{n_rows}.csv")
+            synthetic_frame(frame, n_rows).drop(columns='distribution').to_csv(csv_path, index=False)
+
+            csv_ms, from_csv = best_of(lambda: EtfTable.from_frame(read_etfs_frame(csv_path)))
+            build_ms, _ = best_of(lambda: write_sidecar(csv_path), repeat=1)
+            mmap_ms, (from_sidecar, _) = best_of(lambda: load_etf_info(csv_path))
+            mapped = not from_sidecar.ter.flags.owndata and not from_sidecar.tickers.flags.owndata
+
+            print(f"{n_rows} fonds ({os.path.getsize(csv_path) / 2**20:.1f} Mo de CSV)")
+            print(f"  lecture du CSV       {csv_ms:9.2f} ms")
+            print(f"  écriture du sidecar  {build_ms:9.2f} ms")
+            print(f"  chargement mmap      {mmap_ms:9.2f} ms  (x{csv_ms / mmap_ms:.0f}, "
+                  f"mmap {'oui' if mapped else 'non'}, identique : {same_table(from_csv, from_sidecar)})")
+
+
+if __name__ == "__main__":
+    main()
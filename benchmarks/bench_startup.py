@@ -0,0 +1,119 @@
+"""
+Benchmark du démarrage à froid de l'application
+
+Chaque mesure est faite dans un processus Python neuf :
+- premier rendu : import de App.py et première exécution complète du script
+  pour une nouvelle session (streamlit.testing), avec la mémoire résidente maximale ;
+- serveur : lancement de `streamlit run App.py` jusqu'à ce que le point de
+  santé réponde, avec la mémoire résidente maximale du serveur.
+
+Le mode hors-ligne est forcé pour ne dépendre d'aucun appel réseau.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_startup [--runs 5] [--server]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Exécuté dans un processus neuf : mesure du premier rendu d'une session
+FIRST_RENDER_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+framework_seconds = time.perf_counter() - start
+app = AppTest.from_file("App.py", default_timeout=120)
+app.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'first_render_seconds': elapsed,
+    'app_seconds': elapsed - framework_seconds,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'exceptions': len(app.exception),
+    'modules': sorted(name for name in ('pandas', 'numpy', 'plotly', 'yfinance') if name in sys.modules),
+}))
+"""
+
+
+def bench_environment(store_directory):
+    """Variables d'environnement communes : hors-ligne, stockage des cours temporaire"""
+    environment = dict(os.environ)
+    environment.update({
+        'OFFLINE_MODE': '1',
+        'QUOTE_STORE_PATH': os.path.join(store_directory, 'quotes.sqlite'),
+        'STREAMLIT_BROWSER_GATHER_USAGE_STATS': 'false',
+    })
+    return environment
+
+
+def measure_first_render(environment):
+    """Temps jusqu'au premier rendu complet et mémoire maximale, dans un processus neuf"""
+    output = subprocess.run([sys.executable, "-c", FIRST_RENDER_SCRIPT], env=environment,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def peak_rss_mb(pid):
+    """Mémoire résidente maximale d'un processus (Linux, /proc)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def measure_server(environment, port, timeout=60):
+    """Temps jusqu'à ce que le serveur Streamlit réponde au point de santé"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "App.py", "--server.headless", "true",
+         "--server.port", str(port)],
+        env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return {'ready_seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb(process.pid)}
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("Le serveur Streamlit n'a pas démarré")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarise(label, measures, keys):
+    for key in keys:
+        values = [measure[key] for measure in measures]
+        print(f"{label} {key:<22} médiane {statistics.median(values):8.3f}  min {min(values):8.3f}  max {max(values):8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--server', action='store_true', help="mesure aussi le démarrage du serveur")
+    parser.add_argument('--port', type=int, default=8599)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store_directory:
+        environment = bench_environment(store_directory)
+        measures = [measure_first_render(environment) for _ in range(args.runs)]
+        summarise("premier rendu", measures, ['first_render_seconds', 'app_seconds', 'peak_rss_mb'])
+        print(f"modules chargés au premier rendu : {', '.join(measures[-1]['modules']) or 'aucun'}"
+              f" ; exceptions : {measures[-1]['exceptions']}")
+
+        if args.server:
+            measures = [measure_server(environment, args.port) for _ in range(args.runs)]
+            summarise("serveur", measures, ['ready_seconds', 'peak_rss_mb'])
+
+
+if __name__ == "__main__":
+    main()
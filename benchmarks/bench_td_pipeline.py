@@ -0,0 +1,69 @@
+"""
+Benchmark du calcul des TD annualisées depuis les historiques
+
+Génère dix ans d'historiques quotidiens synthétiques (fonds et indices) pour
+tout l'univers, mesure le calcul complet puis l'ajout d'un jour, et vérifie que
+le calcul incrémental donne les mêmes TD que le recalcul complet, y compris
+pour des fonds ajoutés aux historiques après la première exécution.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_td_pipeline
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from etf_data import read_etfs_frame
+from td_pipeline import align_benchmarks, annualised_tracking_difference, empty_state, pending_rows, update_state
+
+YEARS = 10
+SEED = 42
+
+
+def synthetic_histories(tickers, n_days, seed=SEED):
+    """Niveaux synthétiques : indice en marche aléatoire, fonds = indice + écart de suivi"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-01", periods=n_days)
+    benchmark_returns = rng.normal(0.0003, 0.01, (n_days, len(tickers)))
+    tracking = rng.normal(0.0, 0.0002, (n_days, len(tickers))) + rng.normal(0, 0.00002, len(tickers))
+    benchmark = pd.DataFrame(100 * np.exp(np.cumsum(benchmark_returns, axis=0)), index=dates, columns=tickers)
+    fund = pd.DataFrame(100 * np.exp(np.cumsum(benchmark_returns + tracking, axis=0)), index=dates, columns=tickers)
+    # Fonds lancés en cours de période
+    for column in range(0, len(tickers), 7):
+        fund.iloc[:rng.integers(0, n_days // 2), column] = np.nan
+    return fund, benchmark
+
+
+def main():
+    tickers = read_etfs_frame()['Ticker'].tolist()
+    n_days = YEARS * 261
+    fund, benchmark = synthetic_histories(tickers, n_days)
+    benchmark = align_benchmarks(fund, benchmark)
+    print(f"{len(tickers)} fonds x {n_days} jours")
+
+    start = time.perf_counter()
+    full_state = update_state(empty_state(), fund, benchmark)
+    full_td = annualised_tracking_difference(full_state)
+    print(f"Calcul complet : {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    state = update_state(empty_state(), fund.iloc[:-1], benchmark.iloc[:-1])
+    start = time.perf_counter()
+    state = update_state(state, fund.iloc[-1:], benchmark.iloc[-1:])
+    incremental_td = annualised_tracking_difference(state)
+    print(f"Ajout d'un jour : {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+    difference = (incremental_td - full_td).abs().max()
+    print(f"Écart incrémental / complet : {difference:.2e} points de TD ({len(full_td)} fonds publiés)")
+
+    # Un fonds sur trois n'apparaît dans les historiques qu'à la seconde exécution, avec tout son passé
+    first_run = fund.columns[::3]
+    state = update_state(empty_state(), *pending_rows(empty_state(), fund[first_run].iloc[:-5],
+                                                      benchmark[first_run].iloc[:-5]))
+    state = update_state(state, *pending_rows(state, fund, benchmark))
+    difference = (annualised_tracking_difference(state) - full_td).abs().max()
+    print(f"Écart avec fonds ajoutés après coup : {difference:.2e} points de TD")
+
+
+if __name__ == "__main__":
+    main()
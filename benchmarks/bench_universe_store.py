@@ -0,0 +1,67 @@
+"""
+Benchmark du stockage de l'univers : dictionnaire de dictionnaires / colonnes
+
+Pour l'univers réel et des univers dupliqués jusqu'à 50 000 lignes :
+- mémoire par fonds (tracemalloc) de frame_to_etf_info et de EtfTable ;
+- temps de build_universe (tableaux du screener) dans les deux cas ;
+- temps d'un accès par ticker (etfs_data[ticker]['tracking_difference']).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_universe_store [--sizes 1488 50000]
+"""
+import argparse
+import gc
+import timeit
+import tracemalloc
+
+import pandas as pd
+
+from etf_data import EtfTable, frame_to_etf_info, read_etfs_frame
+from screener import build_universe
+
+
+def synthetic_frame(frame, n_rows):
+    """DataFrame de n_rows lignes obtenu en dupliquant l'univers réel (tickers et ISIN suffixés)"""
+    copies = []
+    for copy in range(-(-n_rows // len(frame))):
+        part = frame.copy()
+        if copy:
+            part['Ticker'] = part['Ticker'] + str(copy)
+            part['isin'] = part['isin'] + str(copy)
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True).head(n_rows)
+
+
+def bytes_per_fund(build, frame):
+    """Mémoire retenue par la structure construite, rapportée au nombre de fonds"""
+    gc.collect()
+    tracemalloc.start()
+    structure = build(frame)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, size / len(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1488, 50_000])
+    args = parser.parse_args()
+
+    frame = read_etfs_frame()
+    for n_rows in args.sizes:
+        data = synthetic_frame(frame, n_rows)
+        print(f"{n_rows} fonds")
+        for label, build in (("dictionnaires", frame_to_etf_info), ("colonnes (EtfTable)", EtfTable.from_frame)):
+            etfs_data, per_fund = bytes_per_fund(build, data)
+            prices = {}
+            universe_ms = min(timeit.repeat(lambda: build_universe(etfs_data, prices), number=5, repeat=3)) / 5 * 1000
+            ticker = data['Ticker'].iloc[n_rows // 2]
+            lookup_us = min(timeit.repeat(lambda: etfs_data[ticker]['tracking_difference'],
+                                          number=10_000, repeat=3)) / 10_000 * 1e6
+            print(f"  {label:<22} {per_fund:7.0f} octets / fonds  build_universe {universe_ms:8.2f} ms  "
+                  f"accès par ticker {lookup_us:6.3f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Test de charge de l'API HTTP locale
+
+Démarre une instance locale de l'API (ou cible --url), puis envoie des requêtes
+depuis plusieurs clients concurrents à connexion persistante pendant une durée
+fixe. Affiche, par point d'entrée, les latences p50 / p99 et le débit
+(requêtes par seconde).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.load_test_api [--clients 16] [--duration 10] [--workers 4] [--url http://127.0.0.1:8765]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from api import SwapService, serve
+from benchmarks.bench_screener import synthetic_prices
+
+SEED = 42
+BATCH_SIZE = 100
+
+
+def build_payloads(service, seed=SEED):
+    """Requêtes représentatives de chaque point d'entrée, prix fournis dans la requête"""
+    rng = np.random.default_rng(seed)
+    tickers = list(service.etf_info)
+    prices = synthetic_prices(tickers)
+    grilles = [(broker, grille) for broker, data in service.broker_structures.items() for grille in data['grilles']]
+
+    def scenario():
+        etf1, etf2 = (tickers[i] for i in rng.integers(len(tickers), size=2))
+        broker, grille = grilles[rng.integers(len(grilles))]
+        return {'etf1_ticker': etf1, 'etf2_ticker': etf2, 'etf1_shares': int(rng.integers(1, 5000)),
+                'etf1_price': prices[etf1], 'etf2_price': prices[etf2], 'broker': broker, 'grille': grille}
+
+    broker, grille = grilles[0]
+    return {
+        '/fees': [{'amount': float(rng.uniform(10, 100_000)), 'broker': broker, 'grille': grille} for _ in range(100)],
+        '/optimal-purchase': [{'net_amount': float(rng.uniform(100, 100_000)), 'etf2_price': float(rng.uniform(1, 500)),
+                               'broker': broker, 'grille': grille} for _ in range(100)],
+        '/profitability': [scenario() for _ in range(100)],
+        '/profitability/batch': [{'scenarios': [scenario() for _ in range(BATCH_SIZE)]} for _ in range(10)],
+    }
+
+
+def run_client(host, port, path, payloads, deadline, latencies, errors):
+    """Un client : envoie des requêtes en boucle sur une connexion persistante jusqu'à l'échéance"""
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    bodies = [json.dumps(payload).encode('utf-8') for payload in payloads]
+    index = 0
+    while time.perf_counter() < deadline:
+        body = bodies[index % len(bodies)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            connection.request("POST", path, body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException):
+            errors.append('connexion')
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def load_test(host, port, path, payloads, clients, duration):
+    """Charge un point d'entrée avec plusieurs clients ; retourne les statistiques"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=run_client, args=(host, port, path, payloads, deadline, latencies, errors))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+    }
+
+
+def wait_until_ready(host, port, timeout=30):
+    """Attend que /health réponde"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"L'API ne répond pas sur {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="API déjà démarrée (sinon une instance locale est lancée)")
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--workers', type=int, default=1, help="processus de l'instance locale")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help="secondes par point d'entrée")
+    args = parser.parse_args()
+
+    service = SwapService.from_files()
+    server_process = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port
+    else:
+        host, port = "127.0.0.1", args.port
+        server_process = multiprocessing.get_context('fork').Process(
+            target=serve, args=(service, host, port, args.workers))
+        server_process.start()
+    try:
+        wait_until_ready(host, port)
+        print(f"{args.clients} clients, {args.duration:.0f}s par point d'entrée, "
+              f"lots de {BATCH_SIZE} scénarios pour /profitability/batch")
+        for path, payloads in build_payloads(service).items():
+            stats = load_test(host, port, path, payloads, args.clients, args.duration)
+            print(f"{path:<22} {stats['rps']:8.0f} req/s  p50 {stats['p50_ms']:7.2f} ms  "
+                  f"p99 {stats['p99_ms']:7.2f} ms  ({stats['requests']} requêtes, {stats['errors']} erreurs)")
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+
+
+if __name__ == "__main__":
+    main()
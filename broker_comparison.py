@@ -0,0 +1,54 @@
+"""
+Comparaison d'un arbitrage sur toutes les grilles tarifaires
+
+Toutes les grilles de courtiers.json, plus les frais personnalisés éventuels,
+sont empilées et évaluées en un seul calcul vectorisé : le coût ne dépend
+presque pas du nombre de grilles du catalogue.
+"""
+import pandas as pd
+
+from arbitrage import calculate_replacement_profitability_batch
+from fees import compile_broker_structures, resolve_fee_schedule, stack_fee_schedules
+
+CUSTOM_BROKER = "Personnalisé"
+CUSTOM_GRILLE = "Frais personnalisés"
+
+COMPARISON_COLUMNS = [
+    'broker', 'grille', 'sell_fees', 'buy_fees', 'total_transaction_cost', 'etf2_shares',
+    'remaining_cash', 'annual_performance_gain', 'payback_months'
+]
+
+
+def compare_brokers(etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td, broker_structures,
+                    custom_sell_fee=None, custom_sell_fee_type=None,
+                    custom_buy_fee=None, custom_buy_fee_type=None, compiled_schedules=None):
+    """
+    Évalue l'arbitrage ETF1 -> ETF2 pour chaque courtier et grille du catalogue
+    Retourne un DataFrame trié par délai de rentabilisation puis par frais totaux
+    """
+    compiled_schedules = compiled_schedules or compile_broker_structures(broker_structures)
+    labels = list(compiled_schedules)
+    sell_schedules = [compiled_schedules[label] for label in labels]
+    buy_schedules = list(sell_schedules)
+
+    # Frais personnalisés : une ligne supplémentaire si des frais ont été saisis
+    if custom_sell_fee is not None and custom_buy_fee is not None:
+        labels.append((CUSTOM_BROKER, CUSTOM_GRILLE))
+        sell_schedules.append(resolve_fee_schedule(CUSTOM_BROKER, CUSTOM_GRILLE, broker_structures,
+                                                   custom_sell_fee, custom_sell_fee_type))
+        buy_schedules.append(resolve_fee_schedule(CUSTOM_BROKER, CUSTOM_GRILLE, broker_structures,
+                                                  custom_buy_fee, custom_buy_fee_type))
+
+    if not labels:
+        return pd.DataFrame(columns=COMPARISON_COLUMNS)
+
+    results = calculate_replacement_profitability_batch(
+        etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+        stack_fee_schedules(sell_schedules), stack_fee_schedules(buy_schedules)
+    )
+    frame = pd.DataFrame({
+        'broker': [broker_name for broker_name, _ in labels],
+        'grille': [grille_name for _, grille_name in labels],
+        **{column: results[column] for column in COMPARISON_COLUMNS[2:]},
+    })
+    return frame.sort_values(['payback_months', 'total_transaction_cost'], kind='stable').reset_index(drop=True)
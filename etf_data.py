@@ -0,0 +1,186 @@
+"""
+Chargement de l'univers d'ETFs depuis etfs_TD.csv
+
+L'univers est stocké en colonnes (EtfTable) : TD et TER dans des tableaux
+float contigus, réplication et distribution en codes de catégories, index de
+hachage ticker -> ligne (construit au premier accès par ticker). Quand un
+sidecar binaire à jour existe (etf_sidecar), les colonnes sont projetées en
+mémoire au lieu d'analyser le CSV. L'accès par ticker (etfs_data[ticker]['ter']) reste
+disponible pour l'interface.
+
+Ce module ne dépend pas de Streamlit : il est utilisé par l'application
+et par les outils de calcul hors interface.
+"""
+import os
+import time
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+ETFS_FILE_PATH = "etfs_TD.csv"
+
+
+def file_signature(path):
+    """Signature (mtime, taille) du fichier, utilisée pour invalider les caches"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def parse_numeric_column(series, default=0.0):
+    """
+    Convertit une colonne texte en float de manière vectorisée
+    Gère les pourcentages ("0,07%") et les décimales françaises ("-2,011")
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(default)
+
+    cleaned = (
+        series.astype(str)
+        .str.strip()
+        .str.rstrip('%')
+        .str.replace(',', '.', regex=False)
+    )
+    try:
+        return cleaned.astype(float).fillna(default)
+    except ValueError:
+        # Valeurs non numériques : on les remplace par la valeur par défaut
+        return pd.to_numeric(cleaned, errors='coerce').fillna(default).astype(float)
+
+
+def read_etfs_frame(path=ETFS_FILE_PATH):
+    """Lit le CSV et retourne un DataFrame avec les colonnes numériques déjà converties"""
+    df = pd.read_csv(path, delimiter=',')
+    df['Ticker'] = df['Ticker'].str.strip()
+
+    # Les valeurs TD sont déjà en % (ex: "-2.011" = -2.011%)
+    df['tracking_difference'] = parse_numeric_column(df['Annualised_Tracking_Difference'])
+    df['ter'] = parse_numeric_column(df['Frais'])
+
+    # Utiliser Réplication si Index n'existe pas
+    index_column = 'Index' if 'Index' in df.columns else 'Réplication'
+    df['index'] = df[index_column] if index_column in df.columns else 'Index inconnu'
+    df['name'] = df['Nom du fonds'] if 'Nom du fonds' in df.columns else 'Nom inconnu'
+    df['isin'] = df['ISIN'] if 'ISIN' in df.columns else 'ISIN inconnu'
+    df['distribution'] = df['Distribution'] if 'Distribution' in df.columns else 'Distribution inconnue'
+    return df
+
+
+def frame_to_etf_info(df):
+    """Construit le dictionnaire {ticker: infos} attendu par l'interface"""
+    return {
+        ticker: {
+            'name': name,
+            'tracking_difference': td,
+            'ter': ter,
+            'isin': isin,
+            'index': index,
+        }
+        for ticker, name, td, ter, isin, index in zip(
+            df['Ticker'].tolist(),
+            df['name'].tolist(),
+            df['tracking_difference'].tolist(),
+            df['ter'].tolist(),
+            df['isin'].tolist(),
+            df['index'].tolist(),
+        )
+    }
+
+
+def _read_only(values, dtype):
+    """Tableau contigu non modifiable ; une colonne de chaînes déjà numpy (ex : mmap) est gardée telle quelle"""
+    if dtype is object and isinstance(values, np.ndarray) and values.dtype.kind == 'U':
+        array = values
+    else:
+        array = np.ascontiguousarray(values, dtype=dtype)
+    if array.flags.writeable:
+        array.setflags(write=False)
+    return array
+
+
+def categorical_codes(values):
+    """
+    (codes, catégories) d'une colonne texte à peu de valeurs distinctes
+    Valeur manquante : code -1, qui désigne le None ajouté en fin de catégories
+    """
+    categorical = pd.Categorical(values)
+    return categorical.codes, tuple(categorical.categories) + (None,)
+
+
+class EtfTable(Mapping):
+    """
+    Univers d'ETFs en colonnes, en lecture seule
+    Les tableaux (tickers, tracking_difference, ter...) sont lus directement par les calculs
+    vectorisés ; table[ticker] construit à la demande le dictionnaire de la ligne
+    """
+
+    def __init__(self, tickers, names, isins, tracking_difference, ter,
+                 index_codes, index_categories, distribution_codes, distribution_categories):
+        self.tickers = _read_only(tickers, object)
+        self.names = _read_only(names, object)
+        self.isins = _read_only(isins, object)
+        self.tracking_difference = _read_only(tracking_difference, float)
+        self.ter = _read_only(ter, float)
+        self.index_codes = _read_only(index_codes, np.asarray(index_codes).dtype)
+        self.index_categories = tuple(index_categories)
+        self.distribution_codes = _read_only(distribution_codes, np.asarray(distribution_codes).dtype)
+        self.distribution_categories = tuple(distribution_categories)
+        self._row_index = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Table construite depuis le DataFrame de read_etfs_frame (ticker en double : dernière ligne retenue)"""
+        df = df.drop_duplicates('Ticker', keep='last')
+        return cls(df['Ticker'].to_numpy(dtype=object), df['name'].to_numpy(dtype=object),
+                   df['isin'].to_numpy(dtype=object), df['tracking_difference'].to_numpy(dtype=float),
+                   df['ter'].to_numpy(dtype=float), *categorical_codes(df['index']),
+                   *categorical_codes(df['distribution']))
+
+    @property
+    def _rows(self):
+        # Index de hachage ticker -> ligne (tickers uniques), construit au premier accès par ticker
+        if self._row_index is None:
+            self._row_index = {ticker: row for row, ticker in enumerate(self.tickers.tolist())}
+        return self._row_index
+
+    def position(self, ticker):
+        """Ligne d'un ticker (KeyError s'il est inconnu)"""
+        return self._rows[ticker]
+
+    def row(self, row):
+        """Dictionnaire d'une ligne, aux clés de frame_to_etf_info (plus 'distribution')"""
+        return {
+            'name': self.names[row],
+            'tracking_difference': float(self.tracking_difference[row]),
+            'ter': float(self.ter[row]),
+            'isin': self.isins[row],
+            'index': self.index_categories[self.index_codes[row]],
+            'distribution': self.distribution_categories[self.distribution_codes[row]],
+        }
+
+    def __getitem__(self, ticker):
+        return self.row(self._rows[ticker])
+
+    def __contains__(self, ticker):
+        return ticker in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self.tickers)
+
+
+def load_etf_info(path=ETFS_FILE_PATH, use_sidecar=True):
+    """
+    Charge l'univers d'ETFs et mesure le temps de chargement
+    Le sidecar binaire (etf_sidecar) est projeté en mémoire s'il correspond au CSV, sinon le CSV est lu
+    Retourne (EtfTable, durée en secondes)
+    """
+    from etf_sidecar import load_fresh_sidecar
+
+    start = time.perf_counter()
+    etf_info = load_fresh_sidecar(path) if use_sidecar else None
+    if etf_info is None:
+        etf_info = EtfTable.from_frame(read_etfs_frame(path))
+    return etf_info, time.perf_counter() - start
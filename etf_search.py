@@ -0,0 +1,137 @@
+"""
+Index de recherche de l'univers d'ETFs (ticker, ISIN, nom du fonds)
+
+L'index est construit une fois par univers. Une recherche combine :
+- correspondance exacte du ticker ou de l'ISIN ;
+- préfixe du ticker, de l'ISIN, du nom ou d'un mot du nom (recherche
+  dichotomique dans une liste triée) ;
+- trigrammes (tolérance aux fautes de frappe et aux mots dans le désordre) :
+  chaque trigramme de la requête vote pour les ETFs qui le contiennent.
+
+Les libellés affichés dans les listes de sélection sont calculés à la
+construction de l'index. Seuls les meilleurs résultats sont renvoyés : le
+nombre d'options envoyées au navigateur ne dépend pas de la taille de l'univers.
+
+Ce module ne dépend pas de Streamlit.
+"""
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+DEFAULT_LIMIT = 50
+# Part minimale des trigrammes de la requête présents dans le texte d'un ETF
+MIN_TRIGRAM_SCORE = 0.4
+# Lignes candidates retenues par trigramme rare : borne le coût d'une recherche floue
+MAX_CANDIDATES = 2000
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalise(text):
+    """Minuscules sans accents, mots séparés par un espace ("Réplication S&P" -> "replication s p")"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii').lower()
+    return " ".join(_WORD.findall(text))
+
+
+def trigrams(text):
+    """Ensemble des trigrammes des mots d'un texte normalisé (mots complétés par des espaces)"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def format_label(ticker, info):
+    """Libellé d'un ETF dans les listes de sélection"""
+    return f"{ticker} - {info.get('isin', 'N/A')} - {info.get('name', 'N/A')}"
+
+
+class EtfSearchIndex:
+    """Index en lecture seule sur un univers {ticker: infos}"""
+
+    def __init__(self, etf_info):
+        self.tickers = list(etf_info)
+        self.labels = {ticker: format_label(ticker, info) for ticker, info in etf_info.items()}
+
+        self._exact = {}
+        prefix_entries = []
+        postings = {}
+        for row, (ticker, info) in enumerate(etf_info.items()):
+            ticker_key, isin_key, name_key = (normalise(value) for value in
+                                              (ticker, info.get('isin', ''), info.get('name', '')))
+            for key in (ticker_key, isin_key):
+                if key:
+                    self._exact.setdefault(key, row)
+            keys = {ticker_key, isin_key, name_key, *name_key.split()}
+            prefix_entries += [(key, row) for key in keys if key]
+            for gram in trigrams(f"{ticker_key} {isin_key} {name_key}"):
+                postings.setdefault(gram, []).append(row)
+
+        prefix_entries.sort()
+        self._prefix_keys = [key for key, _ in prefix_entries]
+        self._prefix_rows = [row for _, row in prefix_entries]
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _prefix_matches(self, query, limit):
+        """Lignes dont une clé commence par la requête, dans l'ordre alphabétique des clés"""
+        rows = {}
+        position = bisect_left(self._prefix_keys, query)
+        while position < len(self._prefix_keys) and len(rows) < limit:
+            if not self._prefix_keys[position].startswith(query):
+                break
+            rows.setdefault(self._prefix_rows[position], None)
+            position += 1
+        return list(rows)
+
+    def _trigram_matches(self, query, limit):
+        """
+        Lignes partageant au moins MIN_TRIGRAM_SCORE des trigrammes de la requête, meilleures d'abord
+        Une ligne retenue contient forcément l'un des trigrammes les plus rares de la requête :
+        les candidats viennent de ces seuls trigrammes (au plus MAX_CANDIDATES lignes chacun),
+        puis chaque trigramme est compté par recherche dichotomique dans sa liste triée
+        """
+        grams = trigrams(query)
+        postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+        needed = max(1, math.ceil(MIN_TRIGRAM_SCORE * len(grams)))
+        if len(postings) < needed:
+            return []
+        rarest = postings[:len(postings) - needed + 1]
+        candidates = np.unique(np.concatenate([rows[:MAX_CANDIDATES] for rows in rarest]))
+        counts = np.zeros(len(candidates), dtype=np.int32)
+        for rows in postings:
+            positions = np.minimum(np.searchsorted(rows, candidates), len(rows) - 1)
+            counts += rows[positions] == candidates
+        keep = counts >= needed
+        candidates, counts = candidates[keep], counts[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-counts, limit - 1)[:limit]
+            candidates, counts = candidates[top], counts[top]
+        # À score égal, ordre de l'univers
+        order = np.lexsort((candidates, -counts))
+        return candidates[order].tolist()
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Tickers correspondant à la requête, les plus pertinents d'abord (au plus limit)
+        Requête vide : les limit premiers ETFs de l'univers
+        """
+        query = normalise(query)
+        if not query:
+            return self.tickers[:limit]
+        rows = {}
+        exact = self._exact.get(query)
+        if exact is not None:
+            rows[exact] = None
+        for row in self._prefix_matches(query, limit):
+            rows.setdefault(row, None)
+        if len(rows) < limit:
+            for row in self._trigram_matches(query, limit):
+                rows.setdefault(row, None)
+        return [self.tickers[row] for row in list(rows)[:limit]]
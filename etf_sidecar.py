@@ -0,0 +1,171 @@
+"""
+Fichier binaire annexe (sidecar) de l'univers d'ETFs
+
+Convertit etfs_TD.csv en un répertoire etfs_TD.csv.sidecar : un fichier .npy
+par colonne (chaînes en largeur fixe, TD et TER en float64, codes de
+catégories) et un manifeste JSON (catégories, nombre de lignes, signature et
+empreinte SHA-256 du CSV source).
+
+load_etf_info() projette ces fichiers en mémoire (np.load, mmap_mode='r') au
+lieu d'analyser le CSV quand le sidecar correspond au CSV actuel : même
+signature (mtime, taille), ou à défaut même taille et même empreinte SHA-256
+(CSV recopié ou extrait à nouveau du dépôt). Sinon, le CSV est lu comme avant.
+Les valeurs numériques sont celles du CSV analysé par pandas, à l'identique ;
+un nom ou un ISIN manquant devient une chaîne vide.
+
+Écriture atomique : les colonnes sont écrites sous des noms propres au contenu
+du CSV, puis le manifeste qui les référence est remplacé d'un bloc ; un lecteur
+voit l'ancienne version ou la nouvelle.
+
+Usage (depuis la racine du dépôt) :
+    python -m etf_sidecar [etfs_TD.csv] [--check]
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from etf_data import ETFS_FILE_PATH, EtfTable, file_signature, read_etfs_frame
+
+SIDECAR_SUFFIX = ".sidecar"
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+STRING_COLUMNS = ('tickers', 'names', 'isins')
+ARRAY_COLUMNS = STRING_COLUMNS + ('tracking_difference', 'ter', 'index_codes', 'distribution_codes')
+
+
+def sidecar_path(csv_path=ETFS_FILE_PATH):
+    """Répertoire du sidecar d'un CSV"""
+    return f"{csv_path}{SIDECAR_SUFFIX}"
+
+
+def file_sha256(path):
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _string_array(values):
+    """Colonne de chaînes en largeur fixe (valeur manquante -> chaîne vide)"""
+    return np.array(["" if not isinstance(value, str) else value for value in values.tolist()], dtype=str)
+
+
+def write_sidecar(csv_path=ETFS_FILE_PATH, directory=None):
+    """Construit (ou remplace) le sidecar du CSV ; retourne le manifeste"""
+    directory = directory or sidecar_path(csv_path)
+    signature = file_signature(csv_path)
+    digest = file_sha256(csv_path)
+    table = EtfTable.from_frame(read_etfs_frame(csv_path))
+    if file_signature(csv_path) != signature:
+        raise RuntimeError(f"{csv_path} a été modifié pendant la conversion")
+
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for column in ARRAY_COLUMNS:
+        values = getattr(table, column)
+        values = _string_array(values) if column in STRING_COLUMNS else np.ascontiguousarray(values)
+        name = f"{column}-{digest[:16]}.npy"
+        temporary_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+        with open(temporary_path, "wb") as f:
+            np.save(f, values, allow_pickle=False)
+        os.replace(temporary_path, os.path.join(directory, name))
+        files[column] = name
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'rows': len(table.tickers),
+        'source': os.path.basename(csv_path),
+        'source_signature': list(signature),
+        'source_sha256': digest,
+        'files': files,
+        'index_categories': list(table.index_categories),
+        'distribution_categories': list(table.distribution_categories),
+    }
+    temporary_path = os.path.join(directory, f".{MANIFEST_NAME}.{os.getpid()}.tmp")
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temporary_path, os.path.join(directory, MANIFEST_NAME))
+
+    # Colonnes des versions précédentes (un lecteur qui les projette encore garde sa copie)
+    for name in os.listdir(directory):
+        if name.endswith(".npy") and name not in files.values():
+            os.remove(os.path.join(directory, name))
+    return manifest
+
+
+def read_manifest(directory):
+    """Manifeste du sidecar, None s'il est absent, illisible ou d'un autre format"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == FORMAT_VERSION else None
+
+
+def is_fresh(manifest, csv_path=ETFS_FILE_PATH):
+    """Le sidecar a-t-il été construit à partir du contenu actuel du CSV ?"""
+    if manifest is None:
+        return False
+    signature = list(file_signature(csv_path))
+    if signature == manifest['source_signature']:
+        return True
+    # Même contenu sous une autre date de modification (copie, git checkout)
+    return signature[1] == manifest['source_signature'][1] and file_sha256(csv_path) == manifest['source_sha256']
+
+
+def load_sidecar(directory, manifest):
+    """EtfTable dont les colonnes sont projetées en mémoire depuis le sidecar"""
+    columns = {
+        column: np.load(os.path.join(directory, manifest['files'][column]), mmap_mode='r', allow_pickle=False)
+        for column in ARRAY_COLUMNS
+    }
+    if any(len(values) != manifest['rows'] for values in columns.values()):
+        raise ValueError(f"Sidecar incohérent : {directory}")
+    return EtfTable(
+        columns['tickers'], columns['names'], columns['isins'],
+        columns['tracking_difference'], columns['ter'],
+        columns['index_codes'], manifest['index_categories'],
+        columns['distribution_codes'], manifest['distribution_categories'],
+    )
+
+
+def load_fresh_sidecar(csv_path=ETFS_FILE_PATH):
+    """EtfTable depuis le sidecar s'il correspond au CSV actuel, sinon None (lecture du CSV)"""
+    directory = sidecar_path(csv_path)
+    manifest = read_manifest(directory)
+    try:
+        if not is_fresh(manifest, csv_path):
+            return None
+        return load_sidecar(directory, manifest)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def refresh_sidecar(csv_path=ETFS_FILE_PATH):
+    """Reconstruit le sidecar s'il existe déjà (après une réécriture du CSV)"""
+    if os.path.isdir(sidecar_path(csv_path)):
+        write_sidecar(csv_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit le sidecar binaire de l'univers d'ETFs")
+    parser.add_argument("csv", nargs="?", default=ETFS_FILE_PATH)
+    parser.add_argument("--check", action="store_true", help="indique seulement si le sidecar est à jour")
+    args = parser.parse_args()
+
+    if args.check:
+        fresh = is_fresh(read_manifest(sidecar_path(args.csv)), args.csv)
+        print(f"{sidecar_path(args.csv)} : {'à jour' if fresh else 'absent ou périmé'}")
+        raise SystemExit(0 if fresh else 1)
+    manifest = write_sidecar(args.csv)
+    print(f"{manifest['rows']} ETFs -> {sidecar_path(args.csv)} (sha256 {manifest['source_sha256'][:16]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Calcul des frais de courtage à partir des grilles de courtiers.json
+
+Chaque grille peut être compilée une seule fois en une représentation par
+morceaux (bornes triées, type de frais, valeur, frais minimum) afin d'évaluer
+des milliers de montants en une seule passe np.searchsorted.
+"""
+import json
+
+import numpy as np
+
+BROKERS_FILE_PATH = "courtiers.json"
+
+# Types de segments d'une grille compilée
+FEE_KIND_NONE = 0
+FEE_KIND_FIXED = 1
+FEE_KIND_PERCENTAGE = 2
+
+_FEE_KINDS = {"fixed": FEE_KIND_FIXED, "percentage": FEE_KIND_PERCENTAGE}
+
+
+def read_broker_structures(path=BROKERS_FILE_PATH):
+    """Lit le catalogue des courtiers (sans gestion d'erreur d'interface)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def calculate_fees(amount, broker_name, grille_name, broker_structures, custom_fee=None, custom_fee_type=None):
+    """Calcule les frais selon la structure tarifaire ou les frais personnalisés"""
+
+    # Si frais personnalisés
+    if broker_name == "Personnalisé" and custom_fee is not None and custom_fee_type is not None:
+        if custom_fee_type == "fixed":
+            return custom_fee
+        elif custom_fee_type == "percentage":
+            return amount * custom_fee / 100
+
+    # Sinon, utiliser la structure tarifaire classique
+    if broker_name not in broker_structures or grille_name not in broker_structures[broker_name]["grilles"]:
+        return 0
+
+    grille = broker_structures[broker_name]["grilles"][grille_name]
+
+    if grille["type"] == "simple":
+        if grille["fee_type"] == "fixed":
+            return grille["fee"]
+        elif grille["fee_type"] == "percentage":
+            return amount * grille["fee"] / 100
+
+    elif grille["type"] == "paliers":
+        for palier in grille["paliers"]:
+            if palier["min"] <= amount < palier["max"]:
+                if palier["fee_type"] == "fixed":
+                    return palier["fee"]
+                elif palier["fee_type"] == "percentage":
+                    fee = amount * palier["fee"] / 100
+                    return max(fee, palier.get("min_fee", 0))
+
+    elif grille["type"] == "mixed":
+        if amount <= grille["threshold"]:
+            return grille["fixed"]
+        else:
+            return amount * grille["percentage"] / 100
+
+    return 0
+
+
+def _make_schedule(segments):
+    """
+    Construit une grille compilée à partir d'une liste de segments
+    (borne_inf, type, valeur, frais_min) triés par borne inférieure
+    """
+    bounds, kinds, values, min_fees = zip(*segments)
+    return {
+        'bounds': np.array(bounds, dtype=float),
+        'kind': np.array(kinds, dtype=np.int8),
+        'value': np.array(values, dtype=float),
+        'min_fee': np.array(min_fees, dtype=float),
+    }
+
+
+def _flat_schedule(fee_type, fee):
+    """Grille à un seul segment (frais fixe ou pourcentage sans minimum)"""
+    kind = _FEE_KINDS.get(fee_type, FEE_KIND_NONE)
+    return _make_schedule([(-np.inf, kind, fee if kind else 0.0, -np.inf)])
+
+
+def _compile_paliers(paliers):
+    """
+    Découpe la droite des montants en intervalles élémentaires [b_i, b_i+1)
+    et affecte à chacun le premier palier qui le couvre, comme la boucle scalaire
+    """
+    breakpoints = sorted({p["min"] for p in paliers} | {p["max"] for p in paliers})
+    segments = []
+    for lower in [-np.inf] + breakpoints:
+        segment = (lower, FEE_KIND_NONE, 0.0, -np.inf)
+        for palier in paliers:
+            kind = _FEE_KINDS.get(palier["fee_type"], FEE_KIND_NONE)
+            if kind and palier["min"] <= lower < palier["max"]:
+                if kind == FEE_KIND_FIXED:
+                    segment = (lower, kind, palier["fee"], -np.inf)
+                else:
+                    segment = (lower, kind, palier["fee"], palier.get("min_fee", 0))
+                break
+        segments.append(segment)
+    return _make_schedule(segments)
+
+
+def compile_grille(grille):
+    """Compile une grille de courtiers.json en représentation par morceaux"""
+    if grille["type"] == "simple":
+        return _flat_schedule(grille["fee_type"], grille["fee"])
+
+    elif grille["type"] == "paliers":
+        return _compile_paliers(grille["paliers"])
+
+    elif grille["type"] == "mixed":
+        # Le seuil appartient au segment fixe (montant <= seuil)
+        return _make_schedule([
+            (-np.inf, FEE_KIND_FIXED, grille["fixed"], -np.inf),
+            (np.nextafter(grille["threshold"], np.inf), FEE_KIND_PERCENTAGE, grille["percentage"], -np.inf),
+        ])
+
+    return _flat_schedule(None, 0.0)
+
+
+def compile_broker_structures(broker_structures):
+    """Compile toutes les grilles du catalogue : {(courtier, grille): grille compilée}"""
+    return {
+        (broker_name, grille_name): compile_grille(grille)
+        for broker_name, broker in broker_structures.items()
+        for grille_name, grille in broker["grilles"].items()
+    }
+
+
+def resolve_fee_schedule(broker_name, grille_name, broker_structures, custom_fee=None, custom_fee_type=None,
+                         compiled_schedules=None):
+    """Retourne la grille compilée correspondant aux paramètres de calculate_fees"""
+
+    # Frais personnalisés
+    if broker_name == "Personnalisé" and custom_fee is not None and custom_fee_type in _FEE_KINDS:
+        return _flat_schedule(custom_fee_type, custom_fee)
+
+    if compiled_schedules is not None and (broker_name, grille_name) in compiled_schedules:
+        return compiled_schedules[(broker_name, grille_name)]
+
+    if broker_name not in broker_structures or grille_name not in broker_structures[broker_name]["grilles"]:
+        return _flat_schedule(None, 0.0)
+
+    return compile_grille(broker_structures[broker_name]["grilles"][grille_name])
+
+
+def evaluate_fee_schedule(schedule, amounts):
+    """
+    Évalue une grille compilée sur un tableau de montants (toute forme)
+    Accepte aussi des grilles empilées (stack_fee_schedules), diffusées contre les montants
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    bounds = schedule['bounds']
+    if bounds.ndim == 1:
+        segment = np.searchsorted(bounds, amounts, side='right') - 1
+        kind = schedule['kind'][segment]
+        value = schedule['value'][segment]
+        min_fee = schedule['min_fee'][segment]
+    else:
+        # Grilles empilées : le segment est le nombre de bornes <= montant, grille par grille
+        segment = (amounts[..., None] >= bounds).sum(axis=-1, keepdims=True) - 1
+
+        def at_segment(values):
+            return np.take_along_axis(np.broadcast_to(values, segment.shape[:-1] + values.shape[-1:]), segment, axis=-1)[..., 0]
+
+        kind, value, min_fee = (at_segment(schedule[key]) for key in ('kind', 'value', 'min_fee'))
+
+    # Même ordre d'opérations que la version scalaire : montant * taux / 100
+    percentage_fee = np.maximum(amounts * value / 100, min_fee)
+    return np.where(kind == FEE_KIND_FIXED, value,
+                    np.where(kind == FEE_KIND_PERCENTAGE, percentage_fee, 0.0))
+
+
+def stack_fee_schedules(schedules):
+    """
+    Empile plusieurs grilles compilées en tableaux (nombre de grilles, segments)
+    Les grilles plus courtes sont complétées par des segments vides à borne infinie
+    """
+    n_segments = max(len(schedule['bounds']) for schedule in schedules)
+
+    def padded(key, fill):
+        return np.array([
+            np.concatenate([schedule[key], np.full(n_segments - len(schedule[key]), fill, dtype=schedule[key].dtype)])
+            for schedule in schedules
+        ])
+
+    return {
+        'bounds': padded('bounds', np.inf),
+        'kind': padded('kind', FEE_KIND_NONE),
+        'value': padded('value', 0.0),
+        'min_fee': padded('min_fee', -np.inf),
+    }
+
+
+def calculate_fees_batch(amounts, broker_name, grille_name, broker_structures, custom_fee=None, custom_fee_type=None,
+                         compiled_schedules=None):
+    """
+    Version vectorisée de calculate_fees : évalue un tableau de montants en une passe
+    compiled_schedules (optionnel) évite de recompiler la grille à chaque appel
+    """
+    schedule = resolve_fee_schedule(broker_name, grille_name, broker_structures, custom_fee, custom_fee_type,
+                                    compiled_schedules)
+    return evaluate_fee_schedule(schedule, amounts)
+
+
+def is_known_grille(broker_name, grille_name, broker_structures):
+    """Le couple (courtier, grille) existe-t-il dans le catalogue ? Le courtier "Personnalisé" est toujours accepté"""
+    if broker_name == "Personnalisé":
+        return True
+    try:
+        return grille_name in broker_structures[broker_name]["grilles"]
+    except (KeyError, TypeError):
+        return False
+
+
+def resolve_swap_schedules(broker_name, grille_name, broker_structures,
+                           custom_sell_fee=None, custom_sell_fee_type=None,
+                           custom_buy_fee=None, custom_buy_fee_type=None, compiled_schedules=None):
+    """Retourne les grilles compilées (vente, achat) d'un arbitrage"""
+    sell_schedule = resolve_fee_schedule(broker_name, grille_name, broker_structures,
+                                         custom_sell_fee, custom_sell_fee_type, compiled_schedules)
+    buy_schedule = resolve_fee_schedule(broker_name, grille_name, broker_structures,
+                                        custom_buy_fee, custom_buy_fee_type, compiled_schedules)
+    return sell_schedule, buy_schedule
@@ -0,0 +1,119 @@
+"""
+Simulation Monte Carlo de l'incertitude sur la Tracking Difference
+
+La TD annuelle de chaque ETF est tirée, année par année, dans une loi
+paramétrable (normale ou Student, avec corrélation entre les deux ETFs). Pour
+chaque trajectoire, on calcule le gain cumulé de l'arbitrage et le moment où il
+couvre les frais de transaction. Les trajectoires sont simulées par blocs
+(trajectoires x années) vectorisés, éventuellement répartis sur plusieurs
+processus ; chaque bloc a sa propre graine dérivée de la graine initiale, de
+sorte que le résultat ne dépend pas du nombre de processus.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_PATHS = 1_000_000
+DEFAULT_HORIZON_YEARS = 10
+DEFAULT_CHUNK_PATHS = 100_000
+DEFAULT_STUDENT_DF = 5
+TD_DISTRIBUTIONS = ('normal', 'student_t')
+SUMMARY_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def sample_td_paths(rng, n_paths, horizon_years, etf1_td, etf2_td, etf1_td_std, etf2_td_std,
+                    correlation=0.0, distribution='normal', df=DEFAULT_STUDENT_DF):
+    """
+    Tire des TD annuelles (en %) pour les deux ETFs : deux tableaux (trajectoires, années)
+    La loi Student partage le facteur d'échelle entre les deux ETFs (queues épaisses communes)
+    """
+    if distribution not in TD_DISTRIBUTIONS:
+        raise ValueError(f"Loi de TD inconnue : {distribution}")
+
+    shape = (n_paths, horizon_years)
+    first = rng.standard_normal(shape)
+    second = correlation * first + np.sqrt(1 - correlation ** 2) * rng.standard_normal(shape)
+    if distribution == 'student_t':
+        scale = np.sqrt(df / rng.chisquare(df, shape))
+        first *= scale
+        second *= scale
+    return etf1_td + etf1_td_std * first, etf2_td + etf2_td_std * second
+
+
+def break_even_months(sell_amount, purchase_amount, total_transaction_cost, etf1_tds, etf2_tds):
+    """
+    Délai (mois) pour que le gain cumulé couvre les frais, et gain net à l'horizon
+    Même convention que calculate_replacement_profitability_td, année par année
+    """
+    yearly_gain = purchase_amount * (etf2_tds / 100) - sell_amount * (etf1_tds / 100)
+    cumulative_gain = np.cumsum(yearly_gain, axis=1)
+
+    reached = cumulative_gain >= total_transaction_cost
+    year = np.argmax(reached, axis=1)
+    paths = np.arange(len(year))
+    previous = np.where(year > 0, cumulative_gain[paths, np.maximum(year - 1, 0)], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Interpolation linéaire dans l'année où le seuil est franchi
+        fraction = (total_transaction_cost - previous) / yearly_gain[paths, year]
+    months = np.where(reached.any(axis=1), 12 * (year + np.clip(fraction, 0, 1)), np.inf)
+    if total_transaction_cost <= 0:
+        months = np.zeros(len(year))
+    return months, cumulative_gain[:, -1] - total_transaction_cost
+
+
+def _simulate_chunk(task):
+    """Simule un bloc de trajectoires (exécutable dans un processus du pool)"""
+    seed, n_paths, swap, td_model, horizon_years = task
+    rng = np.random.default_rng(seed)
+    etf1_tds, etf2_tds = sample_td_paths(rng, n_paths, horizon_years, **td_model)
+    return break_even_months(swap['sell_amount'], swap['purchase_amount'], swap['total_transaction_cost'],
+                             etf1_tds, etf2_tds)
+
+
+def simulate_swap(swap, etf1_td, etf2_td, etf1_td_std, etf2_td_std, correlation=0.0, distribution='normal',
+                  df=DEFAULT_STUDENT_DF, n_paths=DEFAULT_PATHS, horizon_years=DEFAULT_HORIZON_YEARS,
+                  seed=None, workers=1, chunk_paths=DEFAULT_CHUNK_PATHS):
+    """
+    Simule n_paths trajectoires de TD pour un arbitrage déjà calculé
+
+    swap est le résultat de calculate_replacement_profitability_td (montants de
+    vente, d'achat et frais totaux). Retourne (délais en mois, gains nets à l'horizon).
+    """
+    swap = {key: float(swap[key]) for key in ('sell_amount', 'purchase_amount', 'total_transaction_cost')}
+    td_model = {
+        'etf1_td': etf1_td, 'etf2_td': etf2_td, 'etf1_td_std': etf1_td_std, 'etf2_td_std': etf2_td_std,
+        'correlation': correlation, 'distribution': distribution, 'df': df,
+    }
+    chunk_sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(chunk_seed, size, swap, td_model, horizon_years) for chunk_seed, size in zip(seeds, chunk_sizes)]
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, tasks))
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+
+    if not chunks:
+        return np.empty(0), np.empty(0)
+    months, net_gains = zip(*chunks)
+    return np.concatenate(months), np.concatenate(net_gains)
+
+
+def summarise_simulation(months, net_gains, horizon_years=DEFAULT_HORIZON_YEARS):
+    """Statistiques de la distribution des délais de rentabilisation et des gains nets"""
+    finite = np.isfinite(months)
+    return {
+        'paths': len(months),
+        'probability_break_even': float(finite.mean()) if len(months) else 0.0,
+        'probability_break_even_1y': float((months <= 12).mean()) if len(months) else 0.0,
+        'break_even_months_percentiles': {
+            p: float(value) for p, value in zip(SUMMARY_PERCENTILES, np.percentile(months, SUMMARY_PERCENTILES, method='nearest'))
+        } if len(months) else {},
+        'net_gain_mean': float(net_gains.mean()) if len(net_gains) else 0.0,
+        'net_gain_percentiles': {
+            p: float(value) for p, value in zip(SUMMARY_PERCENTILES, np.percentile(net_gains, SUMMARY_PERCENTILES))
+        } if len(net_gains) else {},
+        'probability_loss': float((net_gains < 0).mean()) if len(net_gains) else 0.0,
+        'horizon_years': horizon_years,
+    }
@@ -0,0 +1,120 @@
+"""
+Exécution parallèle du screener d'arbitrages
+
+Les lignes ETF1 sont découpées en fragments répartis sur un pool de processus.
+Les tableaux TD, TER et prix de l'univers sont placés une seule fois en mémoire
+partagée (multiprocessing.shared_memory) : les processus s'y attachent au
+démarrage au lieu de recevoir une copie sérialisée de l'univers à chaque tâche.
+Les K meilleurs candidats de chaque fragment sont ensuite fusionnés en un
+classement global.
+
+Point d'entrée de bibliothèque, pour les scripts et traitements hors interface
+qui balaient de grands univers (voir benchmarks/bench_parallel_screener.py).
+L'application et le mode lot ne l'utilisent pas : le screener de l'interface
+porte sur une seule ligne ETF1 et reste dans le processus Streamlit, et batch
+répartit déjà ses paquets sur son propre pool de processus.
+"""
+import os
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from screener import DEFAULT_CHUNK_ROWS, DEFAULT_TOP_K, candidates_to_frame, merge_top_k, screen_pairs_candidates
+
+SHARED_COLUMNS = ('tracking_difference', 'ter', 'price')
+# Plusieurs fragments par processus pour équilibrer la charge
+SHARDS_PER_WORKER = 4
+
+# État propre à chaque processus du pool
+_worker_universe = None
+_worker_segments = []
+
+
+def _attach_worker(layout):
+    """Initialisation d'un processus : rattache les tableaux partagés de l'univers"""
+    global _worker_universe
+    _worker_segments[:] = [shared_memory.SharedMemory(name=name) for name, _ in layout.values()]
+    _worker_universe = {
+        column: np.ndarray((length,), dtype=float, buffer=segment.buf)
+        for (column, (_, length)), segment in zip(layout.items(), _worker_segments)
+    }
+
+
+def _screen_shard(task):
+    """Évalue un fragment de lignes ETF1 dans un processus du pool"""
+    etf1_rows, etf1_shares, sell_schedule, buy_schedule, top_k, chunk_rows = task
+    return screen_pairs_candidates(_worker_universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                                   top_k, chunk_rows)
+
+
+class ParallelScreener:
+    """
+    Pool de processus partageant l'univers en mémoire
+
+    À utiliser comme gestionnaire de contexte pour libérer le pool et la mémoire
+    partagée :
+
+        with ParallelScreener(universe, workers=4) as parallel:
+            ranking = parallel.screen(rows, shares, sell_schedule, buy_schedule)
+    """
+
+    def __init__(self, universe, workers=None):
+        self.universe = universe
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._segments = []
+        self._pool = None
+
+        if self.workers > 1:
+            try:
+                layout = {}
+                for column in SHARED_COLUMNS:
+                    values = np.ascontiguousarray(universe[column], dtype=float)
+                    segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                    self._segments.append(segment)
+                    np.ndarray(values.shape, dtype=float, buffer=segment.buf)[:] = values
+                    layout[column] = (segment.name, len(values))
+                self._pool = get_context().Pool(self.workers, initializer=_attach_worker, initargs=(layout,))
+            except BaseException:
+                # Segments déjà créés libérés : __exit__ ne sera jamais appelé
+                self.close()
+                raise
+
+    def screen_candidates(self, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                          top_k=DEFAULT_TOP_K, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Candidats bruts (indices dans l'univers) des K meilleures paires"""
+        etf1_rows = np.asarray(etf1_rows, dtype=int)
+        etf1_shares = np.broadcast_to(np.asarray(etf1_shares, dtype=float), etf1_rows.shape)
+
+        if self._pool is None:
+            return screen_pairs_candidates(self.universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                                           top_k, chunk_rows)
+
+        n_shards = min(len(etf1_rows), self.workers * SHARDS_PER_WORKER) or 1
+        tasks = [
+            (rows, shares, sell_schedule, buy_schedule, top_k, chunk_rows)
+            for rows, shares in zip(np.array_split(etf1_rows, n_shards), np.array_split(etf1_shares, n_shards))
+        ]
+        return merge_top_k(self._pool.imap(_screen_shard, tasks), top_k)
+
+    def screen(self, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+               top_k=DEFAULT_TOP_K, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Équivalent parallèle de screener.screen_pairs"""
+        candidates = self.screen_candidates(etf1_rows, etf1_shares, sell_schedule, buy_schedule, top_k, chunk_rows)
+        return candidates_to_frame(self.universe, candidates)
+
+    def close(self):
+        """Arrête le pool et libère la mémoire partagée"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,99 @@
+"""
+Arbitrage d'un portefeuille multi-lignes
+
+Chaque ligne détenue (ticker, nombre de parts) est comparée à tout l'univers en
+une passe vectorisée ; le meilleur remplacement de chaque ligne est retenu s'il
+se rentabilise dans le délai demandé. Les frais, la liquidité non réinvestie
+(cash drag) et le délai de rentabilisation sont ensuite agrégés sur le
+portefeuille.
+"""
+import numpy as np
+import pandas as pd
+
+from screener import DEFAULT_CHUNK_ROWS, best_replacement_per_row
+
+LINE_COLUMNS = [
+    'etf1', 'etf1_shares', 'etf1_price', 'position_value', 'etf2', 'etf2_shares', 'total_transaction_cost',
+    'remaining_cash', 'annual_performance_gain', 'payback_months', 'replace'
+]
+
+
+def normalise_holdings(holdings):
+    """
+    Regroupe les lignes par ticker ; accepte des paires (ticker, parts) ou des
+    dictionnaires {'ticker': ..., 'shares': ...}
+    """
+    shares_by_ticker = {}
+    for holding in holdings:
+        if isinstance(holding, dict):
+            ticker, shares = holding.get('ticker'), holding.get('shares')
+        else:
+            ticker, shares = holding
+        ticker = str(ticker or '').strip()
+        if ticker and shares and shares > 0:
+            shares_by_ticker[ticker] = shares_by_ticker.get(ticker, 0) + shares
+    return shares_by_ticker
+
+
+def evaluate_portfolio(universe, holdings, sell_schedule, buy_schedule, max_payback_months=None,
+                       chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Meilleur remplacement de chaque ligne et agrégats du portefeuille
+
+    Retourne (lignes, synthèse) : un DataFrame par ligne détenue et un dictionnaire
+    d'agrégats. Les lignes sans prix ou absentes de l'univers sont ignorées
+    (listées dans synthèse['skipped']).
+    """
+    shares_by_ticker = normalise_holdings(holdings)
+    row_by_ticker = {ticker: row for row, ticker in enumerate(universe['tickers'])}
+
+    tickers = [ticker for ticker in shares_by_ticker
+               if ticker in row_by_ticker and np.isfinite(universe['price'][row_by_ticker[ticker]])]
+    skipped = [ticker for ticker in shares_by_ticker if ticker not in tickers]
+    rows = np.array([row_by_ticker[ticker] for ticker in tickers], dtype=int)
+    shares = np.array([shares_by_ticker[ticker] for ticker in tickers], dtype=float)
+
+    best = best_replacement_per_row(universe, rows, shares, sell_schedule, buy_schedule, chunk_rows)
+    replace = best['etf2_index'] >= 0
+    if max_payback_months is not None:
+        replace &= best['payback_months'] <= max_payback_months
+
+    etf1_prices = universe['price'][rows]
+    lines = pd.DataFrame({
+        'etf1': tickers,
+        'etf1_shares': shares,
+        'etf1_price': etf1_prices,
+        'position_value': shares * etf1_prices,
+        'etf2': np.where(best['etf2_index'] >= 0, universe['tickers'][np.maximum(best['etf2_index'], 0)], None),
+        'etf2_shares': best['etf2_shares'],
+        'total_transaction_cost': best['total_transaction_cost'],
+        'remaining_cash': best['remaining_cash'],
+        'annual_performance_gain': best['annual_performance_gain'],
+        'payback_months': best['payback_months'],
+        'replace': replace,
+    }, columns=LINE_COLUMNS)
+
+    return lines, summarise_portfolio(lines, skipped)
+
+
+def summarise_portfolio(lines, skipped=()):
+    """Agrégats du portefeuille pour les lignes effectivement remplacées"""
+    swapped = lines[lines['replace']]
+    portfolio_value = float(lines['position_value'].sum())
+    total_fees = float(swapped['total_transaction_cost'].sum())
+    cash_drag = float(swapped['remaining_cash'].sum())
+    annual_gain = float(swapped['annual_performance_gain'].sum())
+    payback_years = total_fees / annual_gain if annual_gain > 0 else float('inf')
+
+    return {
+        'lines': len(lines),
+        'replaced_lines': len(swapped),
+        'portfolio_value': portfolio_value,
+        'total_transaction_cost': total_fees,
+        'cash_drag': cash_drag,
+        'cash_drag_percent': cash_drag / portfolio_value * 100 if portfolio_value > 0 else 0.0,
+        'annual_performance_gain': annual_gain,
+        'payback_years': payback_years,
+        'payback_months': payback_years * 12,
+        'skipped': list(skipped),
+    }
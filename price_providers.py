@@ -0,0 +1,206 @@
+"""
+Fournisseurs de prix interchangeables
+
+Tous les fournisseurs respectent le même contrat que celui attendu par
+prices.PriceService : fournisseur(tickers) -> {ticker: prix}, les tickers sans
+prix étant absents du résultat.
+
+- YFinanceProvider : yfinance, avec une seule session HTTP réutilisée (pool de connexions)
+- FileReplayProvider : rejoue des prix depuis un fichier CSV ou Parquet local
+- FakePriceProvider : prix fixes en mémoire, délai artificiel optionnel
+- FallbackProvider : chaîne de fournisseurs, chacun complétant les prix manquants du précédent
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+DEFAULT_PERIOD = "5d"
+DEFAULT_TIMEOUT_SECONDS = 10
+
+
+class PriceProvider(ABC):
+    """Interface commune des fournisseurs de prix (une sous-classe sans fetch ne peut pas être instanciée)"""
+
+    name = "provider"
+
+    @abstractmethod
+    def fetch(self, tickers):
+        """Retourne {ticker: prix} pour une liste de tickers"""
+
+    def __call__(self, tickers):
+        return self.fetch(list(tickers))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+def create_http_session():
+    """Session HTTP persistante (connexions réutilisées d'un appel à l'autre)"""
+    try:
+        # yfinance >= 0.2.54 s'appuie sur curl_cffi
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+
+def last_closes(closes, tickers):
+    """Dernier cours non manquant de chaque colonne d'un tableau de clôtures yfinance"""
+    if not hasattr(closes, 'columns'):
+        closes = closes.to_frame(name=tickers[0])
+    if not len(closes):
+        return {}
+    latest = closes.ffill().iloc[-1]
+    return {ticker: float(price) for ticker, price in latest.items() if pd.notna(price)}
+
+
+class YFinanceProvider(PriceProvider):
+    """Prix de clôture yfinance, téléchargés par lot avec une session HTTP partagée"""
+
+    name = "yfinance"
+
+    def __init__(self, session=None, period=DEFAULT_PERIOD, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.period = period
+        self.timeout = timeout
+        self._session = session
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Session créée au premier appel puis réutilisée par tous les téléchargements"""
+        with self._session_lock:
+            if self._session is None:
+                self._session = create_http_session()
+            return self._session
+
+    def fetch(self, tickers):
+        import yfinance as yf
+
+        if not tickers:
+            return {}
+        closes = yf.download(tickers, period=self.period, progress=False, threads=True,
+                             timeout=self.timeout, session=self.session)['Close']
+        return last_closes(closes, tickers)
+
+
+class FileReplayProvider(PriceProvider):
+    """
+    Rejoue des prix depuis un fichier local (.csv ou .parquet)
+
+    Deux formats sont acceptés :
+    - long : colonnes ticker, price (ou close) et date optionnelle (dernière date retenue)
+    - large : une colonne par ticker, une ligne par date (dernière valeur non vide retenue)
+    """
+
+    name = "replay"
+
+    def __init__(self, path):
+        self.path = path
+        self._prices = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if str(self.path).endswith(".parquet"):
+            frame = pd.read_parquet(self.path)
+        else:
+            frame = pd.read_csv(self.path)
+
+        columns = {column.lower(): column for column in frame.columns}
+        if 'ticker' in columns:
+            price_column = columns.get('price', columns.get('close'))
+            if 'date' in columns:
+                frame = frame.sort_values(columns['date'], kind='stable')
+            frame = frame.dropna(subset=[price_column]).drop_duplicates(columns['ticker'], keep='last')
+            return dict(zip(frame[columns['ticker']].astype(str).str.strip(), frame[price_column].astype(float)))
+
+        if 'date' in columns:
+            frame = frame.sort_values(columns['date'], kind='stable').drop(columns=columns['date'])
+        return last_closes(frame, list(frame.columns))
+
+    @property
+    def prices(self):
+        """Prix du fichier, lus une seule fois"""
+        with self._lock:
+            if self._prices is None:
+                self._prices = self._read()
+            return self._prices
+
+    def fetch(self, tickers):
+        prices = self.prices
+        return {ticker: prices[ticker] for ticker in tickers if ticker in prices}
+
+
+class FakePriceProvider(PriceProvider):
+    """Fournisseur local pour les tests et benchmarks (prix fixes, délai artificiel optionnel)"""
+
+    name = "fake"
+
+    def __init__(self, prices, delay_seconds=0.0):
+        self.prices = dict(prices)
+        self.delay_seconds = delay_seconds
+        self.calls = []
+
+    def fetch(self, tickers):
+        self.calls.append(tickers)
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return {ticker: self.prices[ticker] for ticker in tickers if ticker in self.prices}
+
+
+class FallbackProvider(PriceProvider):
+    """
+    Chaîne de fournisseurs : les tickers sans prix (ou en erreur) sont demandés au suivant
+    L'erreur du dernier fournisseur n'est relancée que si aucun prix n'a été obtenu
+    """
+
+    name = "fallback"
+
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self.last_errors = {}
+
+    def fetch(self, tickers):
+        prices = {}
+        remaining = list(tickers)
+        error = None
+        for provider in self.providers:
+            if not remaining:
+                break
+            try:
+                prices.update(provider(remaining))
+            except Exception as e:
+                self.last_errors[provider.name] = e
+                error = e
+                continue
+            remaining = [ticker for ticker in remaining if ticker not in prices]
+        if error is not None and not prices:
+            raise error
+        return prices
+
+
+def provider_from_spec(spec):
+    """
+    Construit un fournisseur depuis une description texte, ex :
+    "yfinance", "replay:prix.csv" ou "replay:prix.parquet,yfinance" (chaîne de repli)
+    """
+    providers = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, argument = item.partition(":")
+        if kind == "yfinance":
+            providers.append(YFinanceProvider())
+        elif kind == "replay":
+            providers.append(FileReplayProvider(argument))
+        else:
+            raise ValueError(f"Fournisseur de prix inconnu : {item}")
+    if not providers:
+        raise ValueError("Aucun fournisseur de prix configuré")
+    return providers[0] if len(providers) == 1 else FallbackProvider(providers)
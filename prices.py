@@ -0,0 +1,168 @@
+"""
+Service de prix des ETFs : cache à durée de vie (TTL) et téléchargements groupés
+
+Les demandes de plusieurs tickers sont regroupées en un seul appel au
+fournisseur, et les demandes concurrentes d'un même ticker partagent le même
+téléchargement en cours. Un prix périmé (plus vieux que le TTL) est servi
+immédiatement pendant qu'il est rafraîchi en arrière-plan
+(stale-while-revalidate) ; si le fournisseur est trop lent, l'ancienne valeur
+est servie en attendant.
+
+Un fournisseur est un callable fournisseur(tickers) -> {ticker: prix}
+(voir price_providers).
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+
+DEFAULT_TTL_SECONDS = 300
+# Au-delà, un prix n'est plus servi sans attendre le fournisseur
+DEFAULT_MAX_STALE_SECONDS = 24 * 3600
+DEFAULT_FETCH_TIMEOUT_SECONDS = 10.0
+# Téléchargement groupé de tout l'univers (screener) : bien plus long qu'un cours isolé
+DEFAULT_BATCH_FETCH_TIMEOUT_SECONDS = 60.0
+
+
+class PriceService:
+    """Cache de prix partagé entre les sessions, avec compteurs hit/miss"""
+
+    def __init__(self, provider, ttl_seconds=DEFAULT_TTL_SECONDS, max_stale_seconds=DEFAULT_MAX_STALE_SECONDS,
+                 fetch_timeout_seconds=DEFAULT_FETCH_TIMEOUT_SECONDS, clock=time.monotonic, max_workers=4):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.fetch_timeout_seconds = fetch_timeout_seconds
+        self.last_error = None
+        self._clock = clock
+        self._entries = {}   # ticker -> (prix ou None, date du téléchargement)
+        self._inflight = {}  # ticker -> Future du téléchargement en cours
+        self._errors = {}    # ticker -> erreur du dernier téléchargement (effacée au succès suivant)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-fetch")
+        # Pool distinct pour les demandes asynchrones, qui attendent elles-mêmes les téléchargements
+        self._requests = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-request")
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'fetches': 0, 'timeouts': 0, 'errors': 0}
+
+    def stats(self):
+        """Copie des compteurs (hits, stale_hits, misses, fetches, timeouts, errors)"""
+        with self._lock:
+            return dict(self._stats)
+
+    def errors(self, tickers):
+        """{ticker: erreur} des tickers dont le dernier téléchargement a échoué"""
+        with self._lock:
+            return {ticker: self._errors[ticker] for ticker in tickers if ticker in self._errors}
+
+    def _fetch(self, tickers, future):
+        """Télécharge un lot de tickers et met à jour le cache (exécuté dans le pool)"""
+        try:
+            prices = self.provider(tickers)
+            fetched_at = self._clock()
+            with self._lock:
+                self._stats['fetches'] += 1
+                self.last_error = None
+                for ticker in tickers:
+                    # Un ticker sans donnée est aussi mis en cache pour ne pas solliciter le fournisseur en boucle
+                    self._entries[ticker] = (prices.get(ticker), fetched_at)
+                    self._errors.pop(ticker, None)
+            future.set_result(prices)
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += 1
+                self.last_error = e
+                self._errors.update(dict.fromkeys(tickers, e))
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                for ticker in tickers:
+                    if self._inflight.get(ticker) is future:
+                        del self._inflight[ticker]
+
+    def _submit(self, tickers):
+        """Lance un téléchargement groupé (appelé avec le verrou tenu)"""
+        future = Future()
+        for ticker in tickers:
+            self._inflight[ticker] = future
+        self._executor.submit(self._fetch, tickers, future)
+        return future
+
+    def get_prices(self, tickers, timeout=None):
+        """
+        Retourne {ticker: prix} pour les tickers demandés
+        Les tickers sans prix disponible sont absents du résultat
+        """
+        timeout = self.fetch_timeout_seconds if timeout is None else timeout
+        result = {}
+        pending = {}
+        previous = {}
+        now = self._clock()
+
+        with self._lock:
+            to_fetch = []
+            to_revalidate = []
+            for ticker in dict.fromkeys(tickers):
+                entry = self._entries.get(ticker)
+                age = now - entry[1] if entry else None
+                if entry and age <= self.ttl_seconds:
+                    self._stats['hits'] += 1
+                    result[ticker] = entry[0]
+                elif entry and age <= self.max_stale_seconds:
+                    # Périmé : servi tout de suite, rafraîchi en arrière-plan
+                    self._stats['stale_hits'] += 1
+                    result[ticker] = entry[0]
+                    if ticker not in self._inflight:
+                        to_revalidate.append(ticker)
+                else:
+                    self._stats['misses'] += 1
+                    if entry:
+                        previous[ticker] = entry[0]
+                    if ticker in self._inflight:
+                        pending[ticker] = self._inflight[ticker]
+                    else:
+                        to_fetch.append(ticker)
+
+            # Un seul téléchargement groupé : les tickers à rafraîchir accompagnent les manquants
+            if to_fetch or to_revalidate:
+                future = self._submit(to_fetch + to_revalidate)
+                pending.update(dict.fromkeys(to_fetch, future))
+
+        # Attente des téléchargements (un seul par lot, partagé entre appelants)
+        deadline = time.monotonic() + timeout
+        for ticker, future in pending.items():
+            try:
+                prices = future.result(timeout=max(deadline - time.monotonic(), 0))
+                result[ticker] = prices.get(ticker)
+            except FutureTimeoutError:
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                result[ticker] = previous.get(ticker)
+            except Exception:
+                result[ticker] = previous.get(ticker)
+
+        return {ticker: price for ticker, price in result.items() if price is not None}
+
+    def get_price(self, ticker, timeout=None):
+        """Prix d'un seul ticker (None si indisponible)"""
+        return self.get_prices([ticker], timeout).get(ticker)
+
+    def submit_price(self, ticker, timeout=None):
+        """Lance la demande de prix d'un ticker sans attendre : retourne un Future"""
+        return self._requests.submit(self.get_price, ticker, timeout)
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._lock:
+            self._entries.clear()
+
+
+def wait_for_prices(futures, timeout=DEFAULT_FETCH_TIMEOUT_SECONDS):
+    """
+    Attend ensemble plusieurs demandes de prix (Futures, None accepté)
+    Retourne la liste des prix dans le même ordre ; None si indisponible ou hors délai
+    """
+    pending = [future for future in futures if future is not None]
+    done, _ = wait(pending, timeout=timeout)
+    return [
+        future.result() if future in done and future.exception() is None else None
+        for future in futures
+    ]
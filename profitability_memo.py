@@ -0,0 +1,113 @@
+"""
+Mémoïsation LRU de calculate_replacement_profitability_td
+
+Un scénario est identifié par ses entrées normalisées : tickers, nombre de
+parts, prix arrondis (PRICE_DECIMALS décimales), TD, courtier, grille et frais
+personnalisés (ignorés hors courtier personnalisé, arrondis sinon). Le calcul
+est fait avec ces valeurs normalisées : le résultat ne dépend que de la clé.
+
+Le cache est borné (max_entries) : au-delà, le scénario utilisé le moins
+récemment est évincé. Il est vidé quand le catalogue des courtiers change
+(autre objet broker_structures). Revenir à un scénario déjà calculé, ou à un
+courtier déjà essayé, ne refait donc pas le calcul.
+
+Ce module ne dépend pas de Streamlit.
+"""
+import threading
+from collections import OrderedDict
+
+from arbitrage import calculate_replacement_profitability_td
+
+DEFAULT_MAX_ENTRIES = 256
+# Au centième de centime : les prix des fournisseurs ont au plus 4 décimales
+PRICE_DECIMALS = 4
+FEE_DECIMALS = 6
+
+
+def _fee_key(fee, fee_type):
+    """(frais, type) normalisés ; (None, None) sans frais personnalisés"""
+    if fee is None or fee_type is None:
+        return None, None
+    return round(float(fee), FEE_DECIMALS), fee_type
+
+
+def scenario_key(etf1_ticker, etf2_ticker, etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+                 broker_name, grille_name, custom_sell_fee=None, custom_sell_fee_type=None,
+                 custom_buy_fee=None, custom_buy_fee_type=None):
+    """
+    Clé normalisée d'un scénario (tuple hachable)
+    Les frais personnalisés n'entrent dans la clé que pour le courtier "Personnalisé" : les autres
+    courtiers appliquent leur grille et ne les lisent pas
+    """
+    if broker_name != "Personnalisé":
+        custom_sell_fee = custom_sell_fee_type = custom_buy_fee = custom_buy_fee_type = None
+    return (
+        etf1_ticker, etf2_ticker, int(etf1_shares),
+        round(float(etf1_price), PRICE_DECIMALS), float(etf1_td),
+        round(float(etf2_price), PRICE_DECIMALS), float(etf2_td),
+        broker_name, grille_name,
+        *_fee_key(custom_sell_fee, custom_sell_fee_type),
+        *_fee_key(custom_buy_fee, custom_buy_fee_type),
+    )
+
+
+class ProfitabilityMemo:
+    """Cache LRU borné des résultats de rentabilité, partagé entre les sessions, avec compteurs hit/miss"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, calculate=calculate_replacement_profitability_td):
+        self.max_entries = max_entries
+        self._calculate = calculate
+        self._entries = OrderedDict()  # clé -> résultat, du moins au plus récemment utilisé
+        self._broker_structures = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def stats(self):
+        """Copie des compteurs (hits, misses, evictions) et taille courante (size, max_entries)"""
+        with self._lock:
+            return {**self._stats, 'size': len(self._entries), 'max_entries': self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def calculate(self, etf1_ticker, etf2_ticker, etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+                  broker_name, grille_name, broker_structures,
+                  custom_sell_fee=None, custom_sell_fee_type=None,
+                  custom_buy_fee=None, custom_buy_fee_type=None,
+                  compiled_schedules=None):
+        """
+        Résultat de calculate_replacement_profitability_td pour ce scénario (copie du dictionnaire)
+        Les tickers ne servent qu'à la clé ; le calcul porte sur les valeurs normalisées
+        """
+        key = scenario_key(etf1_ticker, etf2_ticker, etf1_shares, etf1_price, etf1_td, etf2_price, etf2_td,
+                           broker_name, grille_name, custom_sell_fee, custom_sell_fee_type,
+                           custom_buy_fee, custom_buy_fee_type)
+        with self._lock:
+            if broker_structures is not self._broker_structures:
+                # Nouveau catalogue : les grilles ont pu changer
+                self._entries.clear()
+                self._broker_structures = broker_structures
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return dict(result)
+            self._stats['misses'] += 1
+
+        # Calcul hors verrou : deux sessions sur le même scénario peuvent calculer chacune
+        (_, _, shares, etf1_price, etf1_td, etf2_price, etf2_td, broker_name, grille_name,
+         custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type) = key
+        result = self._calculate(
+            shares, etf1_price, etf1_td, etf2_price, etf2_td, broker_name, grille_name, broker_structures,
+            custom_sell_fee, custom_sell_fee_type, custom_buy_fee, custom_buy_fee_type, compiled_schedules
+        )
+
+        with self._lock:
+            if broker_structures is self._broker_structures:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return dict(result)
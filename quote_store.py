@@ -0,0 +1,134 @@
+"""
+Stockage local des cours (SQLite) avec mode hors-ligne
+
+Les cours téléchargés sont écrits par lots avec leur date de récupération. Les
+recherches interrogent d'abord le disque : seuls les tickers absents ou trop
+anciens sont demandés au fournisseur amont. En mode hors-ligne, le fournisseur
+n'est jamais appelé et seuls les cours stockés sont servis, ce qui rend les
+exécutions reproductibles.
+
+L'historique est borné : à chaque écriture, les cours d'un ticker plus anciens
+que retention_days sont supprimés (le dernier cours de chaque ticker est
+toujours conservé).
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from price_providers import PriceProvider
+
+QUOTE_STORE_PATH = "quotes.sqlite"
+# Âge maximal d'un cours stocké servi sans interroger le fournisseur
+DEFAULT_MAX_AGE_SECONDS = 6 * 3600
+# Durée de conservation de l'historique des cours
+DEFAULT_RETENTION_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    ticker TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (ticker, fetched_at)
+)
+"""
+
+
+class QuoteStore:
+    """Historique des cours récupérés, un enregistrement par (ticker, date)"""
+
+    def __init__(self, path=QUOTE_STORE_PATH, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        with self._connect() as connection:
+            # WAL : lectures concurrentes possibles depuis plusieurs processus / réplicas
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Une connexion par opération (utilisable depuis n'importe quel thread), validée puis fermée"""
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def write_quotes(self, prices, fetched_at=None):
+        """Écrit un lot de cours {ticker: prix} et purge leurs cours trop anciens, en une seule transaction"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        rows = [(ticker, fetched_at, float(price)) for ticker, price in prices.items() if price is not None]
+        if not rows:
+            return 0
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO quotes (ticker, fetched_at, price) VALUES (?, ?, ?)", rows)
+            # Le cours qui vient d'être écrit est plus récent que la limite : chaque ticker garde au moins un cours
+            cutoff = fetched_at - self.retention_seconds
+            connection.executemany("DELETE FROM quotes WHERE ticker = ? AND fetched_at < ?",
+                                   [(ticker, cutoff) for ticker, _, _ in rows])
+        return len(rows)
+
+    def latest_quotes(self, tickers=None):
+        """Dernier cours connu de chaque ticker : {ticker: (prix, date de récupération)}"""
+        query = ("SELECT ticker, price, MAX(fetched_at) FROM quotes"
+                 "{where} GROUP BY ticker")
+        with self._connect() as connection:
+            if tickers is None:
+                rows = connection.execute(query.format(where="")).fetchall()
+            else:
+                tickers = list(dict.fromkeys(tickers))
+                rows = []
+                # Limite de paramètres SQLite : interrogation par paquets
+                for start in range(0, len(tickers), 500):
+                    batch = tickers[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows += connection.execute(
+                        query.format(where=f" WHERE ticker IN ({placeholders})"), batch
+                    ).fetchall()
+        return {ticker: (price, fetched_at) for ticker, price, fetched_at in rows}
+
+
+class StoreBackedProvider(PriceProvider):
+    """
+    Fournisseur de prix qui consulte d'abord le stockage local
+
+    Les tickers dont le cours stocké a moins de max_age_seconds sont servis depuis
+    le disque ; les autres sont demandés en un lot au fournisseur amont, puis
+    écrits en bloc. En mode hors-ligne, seul le disque est utilisé.
+    """
+
+    name = "store"
+
+    def __init__(self, store, upstream, max_age_seconds=DEFAULT_MAX_AGE_SECONDS, offline=False, clock=time.time):
+        self.store = store
+        self.upstream = upstream
+        self.max_age_seconds = max_age_seconds
+        self.offline = offline
+        self._clock = clock
+
+    def fetch(self, tickers):
+        stored = self.store.latest_quotes(tickers)
+        if self.offline:
+            return {ticker: price for ticker, (price, _) in stored.items()}
+
+        now = self._clock()
+        prices = {
+            ticker: price for ticker, (price, fetched_at) in stored.items()
+            if now - fetched_at <= self.max_age_seconds
+        }
+        to_fetch = [ticker for ticker in dict.fromkeys(tickers) if ticker not in prices]
+        if to_fetch:
+            try:
+                fetched = self.upstream(to_fetch)
+            except Exception:
+                # Fournisseur indisponible : on se rabat sur les cours stockés, même anciens
+                fetched = {}
+                if not any(ticker in stored for ticker in to_fetch):
+                    raise
+            self.store.write_quotes(fetched, fetched_at=now)
+            for ticker in to_fetch:
+                if ticker in fetched:
+                    prices[ticker] = fetched[ticker]
+                elif ticker in stored:
+                    prices[ticker] = stored[ticker][0]
+        return prices
@@ -0,0 +1,181 @@
+"""
+Screener d'arbitrages : évalue toutes les paires ETF1 -> ETF2 de l'univers
+
+Les TD, prix et frais sont traités par diffusion NumPy (ETF1 en lignes, ETF2 en
+colonnes), par blocs de lignes pour borner la mémoire. Seuls les K meilleurs
+remplacements (délai de rentabilisation le plus court) sont conservés.
+"""
+import numpy as np
+import pandas as pd
+
+from arbitrage import calculate_replacement_profitability_batch
+from etf_data import EtfTable
+
+DEFAULT_TOP_K = 20
+# Nombre de lignes ETF1 évaluées à la fois (≈ 128 x 1 488 paires par bloc)
+DEFAULT_CHUNK_ROWS = 128
+
+RESULT_COLUMNS = [
+    'etf1', 'etf2', 'etf1_shares', 'etf2_shares', 'sell_amount', 'total_transaction_cost',
+    'remaining_cash', 'annual_performance_gain', 'payback_months'
+]
+
+
+def build_universe(etfs_data, prices):
+    """
+    Construit les tableaux de l'univers à partir de etfs_data (EtfTable ou dictionnaire)
+    et d'un dictionnaire {ticker: prix} (prix manquant -> NaN, ETF ignoré)
+    """
+    if isinstance(etfs_data, EtfTable):
+        # Univers en colonnes : les tableaux sont repris tels quels, sans copie
+        tickers, tracking_difference, ter = etfs_data.tickers, etfs_data.tracking_difference, etfs_data.ter
+    else:
+        tickers = np.array(list(etfs_data.keys()), dtype=object)
+        tracking_difference = np.array([etfs_data[t]['tracking_difference'] for t in tickers], dtype=float)
+        ter = np.array([etfs_data[t]['ter'] for t in tickers], dtype=float)
+    return {
+        'tickers': tickers,
+        'tracking_difference': tracking_difference,
+        'ter': ter,
+        'price': np.array([prices.get(t) or np.nan for t in tickers], dtype=float),
+    }
+
+
+def _empty_candidates():
+    return {column: np.empty(0) for column in ['etf1_index', 'etf2_index'] + RESULT_COLUMNS[2:]}
+
+
+def _block_top_k(universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule, top_k):
+    """Évalue un bloc de lignes ETF1 contre tout l'univers et garde les K meilleures paires"""
+    prices = universe['price']
+    tds = universe['tracking_difference']
+    results = calculate_replacement_profitability_batch(
+        etf1_shares[:, None], prices[etf1_rows][:, None], tds[etf1_rows][:, None],
+        prices[None, :], tds[None, :], sell_schedule, buy_schedule
+    )
+
+    # Un ETF ne peut pas se remplacer lui-même
+    payback_months = results['payback_months'].copy()
+    payback_months[np.arange(len(etf1_rows)), etf1_rows] = np.inf
+
+    flat = payback_months.ravel()
+    finite = np.flatnonzero(np.isfinite(flat))
+    if len(finite) > top_k:
+        finite = finite[np.argpartition(flat[finite], top_k - 1)[:top_k]]
+    block_rows, etf2_index = np.unravel_index(finite, payback_months.shape)
+
+    return {
+        'etf1_index': etf1_rows[block_rows],
+        'etf2_index': etf2_index,
+        'etf1_shares': etf1_shares[block_rows],
+        'etf2_shares': results['etf2_shares'][block_rows, etf2_index],
+        'sell_amount': results['sell_amount'][block_rows, etf2_index],
+        'total_transaction_cost': results['total_transaction_cost'][block_rows, etf2_index],
+        'remaining_cash': results['remaining_cash'][block_rows, etf2_index],
+        'annual_performance_gain': results['annual_performance_gain'][block_rows, etf2_index],
+        'payback_months': flat[finite],
+    }
+
+
+def merge_top_k(candidate_blocks, top_k):
+    """Fusionne des candidats partiels en un classement global des K meilleures paires"""
+    blocks = [block for block in candidate_blocks if len(block['payback_months'])]
+    if not blocks:
+        return _empty_candidates()
+    merged = {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+    order = np.argsort(merged['payback_months'], kind='stable')[:top_k]
+    return {key: values[order] for key, values in merged.items()}
+
+
+def candidates_to_frame(universe, candidates):
+    """Convertit les candidats retenus en DataFrame trié par délai de rentabilisation"""
+    frame = pd.DataFrame({
+        'etf1': universe['tickers'][candidates['etf1_index'].astype(int)],
+        'etf2': universe['tickers'][candidates['etf2_index'].astype(int)],
+        **{column: candidates[column] for column in RESULT_COLUMNS[2:]},
+    })
+    return frame.sort_values('payback_months', kind='stable').reset_index(drop=True)
+
+
+def screen_pairs_candidates(universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                            top_k=DEFAULT_TOP_K, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Balayage des lignes ETF1 données contre tout l'univers, par blocs (candidats bruts)"""
+    etf1_rows = np.asarray(etf1_rows, dtype=int)
+    etf1_shares = np.broadcast_to(np.asarray(etf1_shares, dtype=float), etf1_rows.shape)
+
+    best = _empty_candidates()
+    for start in range(0, len(etf1_rows), chunk_rows):
+        block = _block_top_k(universe, etf1_rows[start:start + chunk_rows], etf1_shares[start:start + chunk_rows],
+                             sell_schedule, buy_schedule, top_k)
+        best = merge_top_k([best, block], top_k)
+    return best
+
+
+def screen_pairs(universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                 top_k=DEFAULT_TOP_K, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Évalue chaque ligne ETF1 (indices dans l'univers, avec son nombre de parts)
+    contre tous les ETF2 de l'univers et retourne les K meilleurs remplacements
+    """
+    candidates = screen_pairs_candidates(universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                                         top_k, chunk_rows)
+    return candidates_to_frame(universe, candidates)
+
+
+def screen_holding(universe, etf1_ticker, etf1_shares, sell_schedule, buy_schedule, top_k=DEFAULT_TOP_K):
+    """Meilleurs remplacements pour une seule ligne détenue"""
+    etf1_row = np.flatnonzero(universe['tickers'] == etf1_ticker)[:1]
+    return screen_pairs(universe, etf1_row, etf1_shares, sell_schedule, buy_schedule, top_k)
+
+
+def position_shares(universe, position_value):
+    """Nombre de parts ETF1 correspondant à un montant investi identique pour chaque fonds"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = np.floor(position_value / universe['price'])
+    return np.nan_to_num(shares, nan=0.0, posinf=0.0)
+
+
+def screen_universe(universe, position_value, sell_schedule, buy_schedule,
+                    top_k=DEFAULT_TOP_K, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Balayage N x N : chaque fonds de l'univers, détenu pour position_value €, contre tous les autres"""
+    etf1_rows = np.arange(len(universe['tickers']))
+    return screen_pairs(universe, etf1_rows, position_shares(universe, position_value),
+                        sell_schedule, buy_schedule, top_k, chunk_rows)
+
+
+def best_replacement_per_row(universe, etf1_rows, etf1_shares, sell_schedule, buy_schedule,
+                             chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Meilleur remplacement (délai de rentabilisation minimal) de chaque ligne ETF1
+    Retourne un dictionnaire de tableaux alignés sur etf1_rows ; etf2_index vaut -1
+    et les autres colonnes NaN lorsqu'aucun remplacement n'est rentable
+    """
+    etf1_rows = np.asarray(etf1_rows, dtype=int)
+    etf1_shares = np.broadcast_to(np.asarray(etf1_shares, dtype=float), etf1_rows.shape)
+    prices = universe['price']
+    tds = universe['tracking_difference']
+
+    columns = ['etf2_shares', 'sell_amount', 'sell_fees', 'buy_fees', 'total_transaction_cost',
+               'remaining_cash', 'annual_performance_gain', 'payback_months']
+    best = {column: np.full(len(etf1_rows), np.nan) for column in columns}
+    best['etf2_index'] = np.full(len(etf1_rows), -1)
+
+    for start in range(0, len(etf1_rows), chunk_rows):
+        rows = etf1_rows[start:start + chunk_rows]
+        block = slice(start, start + len(rows))
+        results = calculate_replacement_profitability_batch(
+            etf1_shares[block][:, None], prices[rows][:, None], tds[rows][:, None],
+            prices[None, :], tds[None, :], sell_schedule, buy_schedule
+        )
+        payback_months = results['payback_months'].copy()
+        payback_months[np.arange(len(rows)), rows] = np.inf
+
+        etf2_index = np.argmin(payback_months, axis=1)
+        picked = (np.arange(len(rows)), etf2_index)
+        found = np.isfinite(payback_months[picked])
+        best['etf2_index'][block] = np.where(found, etf2_index, -1)
+        # Sans remplacement, aucune valeur : la colonne 0 de l'argmin n'est pas un candidat
+        for column in columns[:-1]:
+            best[column][block] = np.where(found, results[column][picked], np.nan)
+        best['payback_months'][block] = np.where(found, payback_months[picked], np.nan)
+    return best
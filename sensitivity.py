@@ -0,0 +1,46 @@
+"""
+Sensibilité du délai de rentabilisation
+
+Calcule le délai de rentabilisation d'un arbitrage sur une grille
+(tailles de position x variations du prix ou de la TD de l'ETF2) en un seul
+calcul diffusé : la position varie le long des colonnes, la variation le long
+des lignes.
+"""
+import numpy as np
+
+from arbitrage import calculate_replacement_profitability_batch
+
+DEFAULT_GRID_SIZE = 500
+SENSITIVITY_AXES = ('price', 'td')
+
+
+def shares_grid(etf1_shares, size=DEFAULT_GRID_SIZE, spread=10):
+    """Nombres de parts ETF1 (entiers, distincts) de etf1_shares / spread à etf1_shares * spread"""
+    low = max(1.0, etf1_shares / spread)
+    high = max(low + 1, etf1_shares * spread)
+    return np.unique(np.round(np.linspace(low, high, size)))
+
+
+def payback_sensitivity(etf1_shares_grid, etf1_price, etf1_td, etf2_price, etf2_td,
+                        sell_schedule, buy_schedule, deltas, axis='price'):
+    """
+    Délai de rentabilisation (mois) pour chaque combinaison position x variation
+
+    axis='price' : deltas en % appliqués au prix de l'ETF2 (ex: -10 = prix x 0,9)
+    axis='td'    : deltas en points de TD ajoutés à la TD de l'ETF2
+    Retourne un tableau (len(deltas), len(etf1_shares_grid)) ; inf = jamais rentable
+    """
+    if axis not in SENSITIVITY_AXES:
+        raise ValueError(f"Axe de sensibilité inconnu : {axis}")
+
+    deltas = np.asarray(deltas, dtype=float)[:, None]
+    if axis == 'price':
+        etf2_price = etf2_price * (1 + deltas / 100)
+    else:
+        etf2_td = etf2_td + deltas
+
+    results = calculate_replacement_profitability_batch(
+        np.asarray(etf1_shares_grid, dtype=float)[None, :], etf1_price, etf1_td,
+        etf2_price, etf2_td, sell_schedule, buy_schedule
+    )
+    return np.broadcast_to(results['payback_months'], (deltas.shape[0], np.size(etf1_shares_grid)))
@@ -0,0 +1,96 @@
+"""
+Données de référence partagées par toutes les sessions d'un processus
+
+L'univers d'ETFs (avec son index de recherche) et le catalogue des courtiers
+(avec ses grilles compilées) sont construits une seule fois par processus et
+par version de fichier, puis figés : dictionnaires en lecture seule
+(MappingProxyType), listes en tuples, tableaux numpy non modifiables. Une
+session ne peut donc pas altérer les données des autres.
+
+Quand un fichier change (signature mtime/taille), la nouvelle version est
+entièrement construite avant de remplacer l'ancienne : une session voit soit
+l'ancienne version complète, soit la nouvelle. Si la nouvelle version ne peut
+pas être lue (fichier en cours d'écriture, JSON invalide), l'ancienne reste
+servie et l'erreur est conservée dans last_error.
+
+Ce module ne dépend pas de Streamlit.
+"""
+import threading
+from types import MappingProxyType
+
+import numpy as np
+
+from etf_data import file_signature, load_etf_info
+from etf_search import EtfSearchIndex
+from fees import compile_broker_structures, read_broker_structures
+
+
+def freeze(value):
+    """Copie en lecture seule d'une structure dict / list / tableau numpy (récursivement)"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, np.ndarray):
+        value = value.copy()
+        value.setflags(write=False)
+    return value
+
+
+def load_universe_snapshot(path):
+    """Univers figé : {'etf_info' (EtfTable, déjà en lecture seule), 'search_index', 'load_seconds'}"""
+    etf_info, load_seconds = load_etf_info(path)
+    return MappingProxyType({
+        'etf_info': etf_info,
+        'search_index': EtfSearchIndex(etf_info),
+        'load_seconds': load_seconds,
+    })
+
+
+def load_broker_snapshot(path):
+    """Catalogue figé : {'broker_structures', 'compiled_schedules'}"""
+    broker_structures = read_broker_structures(path)
+    return MappingProxyType({
+        'broker_structures': freeze(broker_structures),
+        'compiled_schedules': freeze(compile_broker_structures(broker_structures)),
+    })
+
+
+class SharedFile:
+    """Valeur construite à partir d'un fichier, partagée et reconstruite quand le fichier change"""
+
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self.loads = 0
+        self.last_error = None
+        # (signature, valeur) remplacé d'un bloc : la lecture sans verrou est cohérente
+        self._snapshot = None
+        self._failed_signature = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Version à jour ; FileNotFoundError / erreur de lecture si aucune version n'a jamais pu être chargée"""
+        signature = file_signature(self.path)
+        snapshot = self._snapshot
+        if snapshot is not None and signature in (snapshot[0], self._failed_signature):
+            return snapshot[1]
+        with self._lock:
+            # Une autre session a peut-être rechargé pendant l'attente du verrou
+            snapshot = self._snapshot
+            if snapshot is not None and signature in (snapshot[0], self._failed_signature):
+                return snapshot[1]
+            try:
+                value = self.loader(self.path)
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                # Version invalide : on garde l'ancienne sans retenter tant que le fichier ne change pas
+                self.last_error = e
+                self._failed_signature = signature
+                return snapshot[1]
+            self._snapshot = (signature, value)
+            self._failed_signature = None
+            self.last_error = None
+            self.loads += 1
+            return value
@@ -0,0 +1,249 @@
+"""
+Calcul de la Tracking Difference annualisée à partir des historiques locaux
+
+Les historiques de performance totale (niveaux de cours dividendes réinvestis)
+des fonds et de leurs indices de référence sont stockés en format large : une
+colonne Date et une colonne par série (CSV ou Parquet). Le calcul est vectorisé
+sur tous les fonds à la fois.
+
+Le calcul est incrémental : un fichier d'état conserve, pour chaque fonds, les
+derniers niveaux connus, la somme des rendements logarithmiques du fonds et de
+l'indice depuis le début de l'historique commun et la date jusqu'à laquelle
+l'historique du fonds a été traité. Lorsqu'on ajoute des jours aux
+historiques, seules les nouvelles lignes sont traitées ; un fonds ajouté aux
+historiques après coup est traité sur tout son historique.
+
+La TD annualisée (en %) est la différence entre le rendement annualisé du fonds
+et celui de son indice ; elle est réécrite dans la colonne
+Annualised_Tracking_Difference de etfs_TD.csv, relue par load_etfs_data().
+
+Usage (depuis la racine du dépôt) :
+    python -m td_pipeline --funds historiques/fonds.csv --benchmarks historiques/indices.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from etf_data import ETFS_FILE_PATH
+from etf_sidecar import refresh_sidecar
+
+TD_COLUMN = "Annualised_Tracking_Difference"
+TD_STATE_PATH = "td_state.csv"
+# Historique commun minimal pour publier une TD annualisée
+DEFAULT_MIN_YEARS = 1.0
+DAYS_PER_YEAR = 365.25
+
+# start_date / last_date : premier et dernier jour où le fonds et l'indice sont observés
+# processed_date : dernier jour de l'historique déjà traité pour ce fonds
+STATE_COLUMNS = ['ticker', 'start_date', 'last_date', 'processed_date', 'fund_level', 'benchmark_level',
+                 'fund_log_return', 'benchmark_log_return']
+
+
+def read_series(path):
+    """Lit un historique en format large : index de dates triées, une colonne par série"""
+    if str(path).endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path)
+
+    columns = {str(column).lower(): column for column in frame.columns}
+    if 'date' in columns:
+        frame = frame.set_index(columns['date'])
+    frame.index = pd.to_datetime(frame.index)
+    frame.columns = [str(column).strip() for column in frame.columns]
+    return frame.sort_index().astype(float)
+
+
+def read_benchmark_map(path):
+    """Correspondance fonds -> indice de référence (colonnes Ticker, Benchmark)"""
+    frame = pd.read_csv(path, dtype=str)
+    return dict(zip(frame['Ticker'].str.strip(), frame['Benchmark'].str.strip()))
+
+
+def empty_state():
+    """État vide (aucun fonds encore traité)"""
+    return pd.DataFrame({
+        'ticker': pd.Series(dtype=object),
+        'start_date': pd.Series(dtype='datetime64[ns]'),
+        'last_date': pd.Series(dtype='datetime64[ns]'),
+        'processed_date': pd.Series(dtype='datetime64[ns]'),
+        'fund_level': pd.Series(dtype=float),
+        'benchmark_level': pd.Series(dtype=float),
+        'fund_log_return': pd.Series(dtype=float),
+        'benchmark_log_return': pd.Series(dtype=float),
+    }).set_index('ticker')
+
+
+def load_state(path=TD_STATE_PATH):
+    """Charge l'état du calcul incrémental (état vide si le fichier n'existe pas)"""
+    if not os.path.exists(path):
+        return empty_state()
+    state = pd.read_csv(path, dtype={'ticker': str})
+    if 'processed_date' not in state.columns:
+        # État écrit avant le suivi par fonds : tout était traité jusqu'au dernier jour observé
+        state['processed_date'] = state['last_date']
+    for column in ('start_date', 'last_date', 'processed_date'):
+        state[column] = pd.to_datetime(state[column])
+    return state.set_index('ticker')[STATE_COLUMNS[1:]]
+
+
+def save_state(state, path=TD_STATE_PATH):
+    """Écrit l'état de manière atomique"""
+    temporary_path = f"{path}.tmp"
+    state.reset_index().to_csv(temporary_path, index=False, date_format='%Y-%m-%d')
+    os.replace(temporary_path, path)
+
+
+def update_state(state, fund_levels, benchmark_levels):
+    """
+    Intègre de nouvelles lignes d'historique dans l'état
+
+    fund_levels et benchmark_levels sont deux DataFrames alignés (mêmes dates,
+    mêmes colonnes = tickers des fonds), ne contenant pour chaque fonds que des
+    dates postérieures à sa processed_date (les autres cellules valent NaN).
+    Retourne le nouvel état.
+    """
+    tickers = list(dict.fromkeys(list(state.index) + list(fund_levels.columns)))
+    present = np.isin(tickers, list(fund_levels.columns))
+    state = state.reindex(tickers)
+    fund_levels = fund_levels.reindex(columns=tickers)
+    benchmark_levels = benchmark_levels.reindex(columns=tickers)
+    if fund_levels.empty:
+        return state
+
+    # Jours où le fonds et l'indice sont réellement observés (avant report des niveaux)
+    new_fund = fund_levels.to_numpy(dtype=float)
+    new_benchmark = benchmark_levels.to_numpy(dtype=float)
+    observed = np.isfinite(new_fund) & np.isfinite(new_benchmark) & (new_fund > 0) & (new_benchmark > 0)
+
+    # Les derniers niveaux observés ensemble servent de point de départ aux nouveaux rendements
+    fund = np.vstack([state['fund_level'].to_numpy(dtype=float), np.where(observed, new_fund, np.nan)])
+    benchmark = np.vstack([state['benchmark_level'].to_numpy(dtype=float), np.where(observed, new_benchmark, np.nan)])
+    # Jours où l'un des deux manque : le dernier niveau commun est reporté (rendement nul ce jour-là),
+    # fonds et indice sont ainsi mesurés sur la même période, de start_date à last_date
+    fund = pd.DataFrame(fund).ffill().to_numpy()
+    benchmark = pd.DataFrame(benchmark).ffill().to_numpy()
+
+    both_valid = np.isfinite(fund) & np.isfinite(benchmark) & (fund > 0) & (benchmark > 0)
+    # Un rendement n'est compté que si le fonds et l'indice sont connus la veille et le jour même
+    pair_valid = both_valid[1:] & both_valid[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fund_returns = np.where(pair_valid, np.log(fund[1:] / fund[:-1]), 0.0)
+        benchmark_returns = np.where(pair_valid, np.log(benchmark[1:] / benchmark[:-1]), 0.0)
+
+    # Début de l'historique commun pour les fonds qui n'en avaient pas encore
+    dates = fund_levels.index.to_numpy(dtype='datetime64[ns]')
+    starts_now = both_valid[1:].any(axis=0) & state['start_date'].isna().to_numpy()
+    first_row = np.argmax(both_valid[1:], axis=0)
+    start_date = state['start_date'].to_numpy(dtype='datetime64[ns]').copy()
+    start_date[starts_now] = dates[first_row[starts_now]]
+
+    state = state.copy()
+    state['start_date'] = start_date
+    # Le dernier jour n'avance que jusqu'à la dernière observation : un niveau reporté ne compte pas
+    last_row = len(dates) - 1 - np.argmax(observed[::-1], axis=0)
+    state['last_date'] = np.where(observed.any(axis=0), dates[last_row],
+                                  state['last_date'].to_numpy(dtype='datetime64[ns]'))
+    state['processed_date'] = np.where(present, dates[-1], state['processed_date'].to_numpy(dtype='datetime64[ns]'))
+    state['fund_level'] = fund[-1]
+    state['benchmark_level'] = benchmark[-1]
+    state['fund_log_return'] = state['fund_log_return'].fillna(0.0).to_numpy() + fund_returns.sum(axis=0)
+    state['benchmark_log_return'] = state['benchmark_log_return'].fillna(0.0).to_numpy() + benchmark_returns.sum(axis=0)
+    return state
+
+
+def annualised_tracking_difference(state, min_years=DEFAULT_MIN_YEARS):
+    """
+    TD annualisée (en %) de chaque fonds : rendement annualisé du fonds - rendement annualisé de l'indice
+    Les fonds dont l'historique commun est plus court que min_years sont exclus
+    """
+    years = (state['last_date'] - state['start_date']).dt.days / DAYS_PER_YEAR
+    eligible = years >= min_years
+    years = years[eligible]
+    fund_return = np.expm1(state.loc[eligible, 'fund_log_return'] / years)
+    benchmark_return = np.expm1(state.loc[eligible, 'benchmark_log_return'] / years)
+    return ((fund_return - benchmark_return) * 100).dropna()
+
+
+def align_benchmarks(fund_levels, benchmark_levels, benchmark_map=None):
+    """
+    Construit le tableau des indices aligné colonne à colonne sur les fonds
+    Sans correspondance explicite, l'indice d'un fonds est la colonne portant son ticker
+    """
+    benchmark_map = benchmark_map or {}
+    columns = [benchmark_map.get(ticker, ticker) for ticker in fund_levels.columns]
+    aligned = benchmark_levels.reindex(index=fund_levels.index, columns=columns)
+    aligned.columns = fund_levels.columns
+    return aligned
+
+
+def write_tracking_differences(tracking_differences, path=ETFS_FILE_PATH):
+    """
+    Met à jour la colonne TD de etfs_TD.csv pour les tickers fournis
+    Les autres colonnes sont réécrites telles quelles ; le remplacement du fichier est atomique
+    Retourne le nombre de lignes mises à jour
+    """
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    tickers = frame['Ticker'].str.strip()
+    updated = tickers.map(tracking_differences)
+    mask = updated.notna()
+    frame.loc[mask, TD_COLUMN] = updated[mask].map(lambda td: f"{td:.3f}")
+
+    temporary_path = f"{path}.tmp"
+    frame.to_csv(temporary_path, index=False)
+    os.replace(temporary_path, path)
+    return int(mask.sum())
+
+
+def pending_rows(state, fund_levels, benchmark_levels):
+    """
+    Lignes d'historique pas encore traitées, fonds par fonds
+    Les jours antérieurs à la processed_date d'un fonds sont masqués (NaN) ; un fonds absent de l'état
+    garde tout son historique. Les lignes déjà traitées pour tous les fonds sont retirées.
+    """
+    processed = state['processed_date'].reindex(fund_levels.columns).to_numpy(dtype='datetime64[ns]')
+    already_processed = fund_levels.index.to_numpy(dtype='datetime64[ns]')[:, None] <= processed[None, :]
+    pending = ~already_processed.all(axis=1)
+    return fund_levels.mask(already_processed)[pending], benchmark_levels.mask(already_processed)[pending]
+
+
+def run_pipeline(funds_path, benchmarks_path, benchmark_map_path=None, state_path=TD_STATE_PATH,
+                 etfs_path=ETFS_FILE_PATH, min_years=DEFAULT_MIN_YEARS):
+    """
+    Traite les jours ajoutés depuis la dernière exécution et réécrit les TD
+    Retourne un résumé {'new_rows', 'funds', 'updated'}
+    """
+    state = load_state(state_path)
+    fund_levels = read_series(funds_path)
+    benchmark_levels = read_series(benchmarks_path)
+    benchmark_map = read_benchmark_map(benchmark_map_path) if benchmark_map_path else None
+
+    benchmark_levels = align_benchmarks(fund_levels, benchmark_levels, benchmark_map)
+    fund_levels, benchmark_levels = pending_rows(state, fund_levels, benchmark_levels)
+
+    state = update_state(state, fund_levels, benchmark_levels)
+    save_state(state, state_path)
+    updated = write_tracking_differences(annualised_tracking_difference(state, min_years).to_dict(), etfs_path)
+    refresh_sidecar(etfs_path)
+    return {'new_rows': len(fund_levels), 'funds': len(state), 'updated': updated}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcule les TD annualisées depuis les historiques locaux")
+    parser.add_argument("--funds", required=True, help="historique des fonds (CSV ou Parquet, format large)")
+    parser.add_argument("--benchmarks", required=True, help="historique des indices (CSV ou Parquet, format large)")
+    parser.add_argument("--benchmark-map", help="CSV Ticker,Benchmark (par défaut : même nom de colonne)")
+    parser.add_argument("--state", default=TD_STATE_PATH)
+    parser.add_argument("--etfs", default=ETFS_FILE_PATH)
+    parser.add_argument("--min-years", type=float, default=DEFAULT_MIN_YEARS)
+    args = parser.parse_args()
+
+    summary = run_pipeline(args.funds, args.benchmarks, args.benchmark_map, args.state, args.etfs, args.min_years)
+    print(f"{summary['new_rows']} nouvelles lignes traitées, {summary['funds']} fonds suivis, "
+          f"{summary['updated']} TD mises à jour dans {args.etfs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Mesure des temps d'exécution par réexécution de l'application
+
+Chaque réexécution du script Streamlit ouvre un enregistrement (rerun) ; les
+portions instrumentées (span) y ajoutent leur durée et alimentent des
+histogrammes cumulés sur la durée de vie du processus. Les histogrammes sont
+exportés au format texte Prometheus ou en JSON (selon l'extension du fichier).
+
+profile() enveloppe ponctuellement une réexécution dans cProfile et écrit le
+profil complet dans un fichier horodaté (lisible par pstats ou snakeviz) ;
+seuls les keep profils les plus récents du répertoire sont conservés.
+
+Hors d'un enregistrement, span() ne coûte qu'une lecture de ContextVar : les
+mesures sont désactivées par défaut et n'ont alors quasiment aucun coût.
+
+Ce module ne dépend pas de Streamlit.
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+METRIC_NAME = "etf_arbitrage_span_seconds"
+PROFILE_DIRECTORY = "profiles"
+DEFAULT_PROFILE_TOP = 15
+# Profils conservés dans le répertoire (les plus anciens sont supprimés)
+DEFAULT_PROFILE_KEEP = 20
+# Bornes supérieures des histogrammes (secondes), comme les buckets Prometheus
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# Mesures de la réexécution en cours : liste de (nom, secondes), None si désactivé
+_current_spans = ContextVar('current_spans', default=None)
+_NULL_SPAN = nullcontext()
+# Un seul profil à la fois dans le processus (cProfile n'accepte pas deux profileurs actifs)
+_profile_lock = threading.Lock()
+
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes : nombre, somme et maximum des durées"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Quantile estimé : borne supérieure du bucket qui l'atteint (maximum observé pour le dernier)"""
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    """Histogrammes par nom de span, partagés par toutes les sessions du processus"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def summary(self):
+        """{nom: {'count', 'sum', 'mean', 'p50', 'p95', 'max'}} en secondes"""
+        with self._lock:
+            return {
+                name: {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'mean': histogram.sum / histogram.count,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                    'max': histogram.max,
+                }
+                for name, histogram in sorted(self._histograms.items())
+            }
+
+    def to_json(self):
+        with self._lock:
+            spans = {
+                name: {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'max': histogram.max,
+                    'buckets': {('+Inf' if bound == float('inf') else repr(bound)): count
+                                for bound, count in zip(histogram.buckets, histogram.counts)},
+                }
+                for name, histogram in sorted(self._histograms.items())
+            }
+        return json.dumps({'metric': METRIC_NAME, 'unit': 'seconds', 'spans': spans}, indent=2)
+
+    def to_prometheus(self):
+        """Format d'exposition texte de Prometheus (buckets cumulés)"""
+        lines = [f"# HELP {METRIC_NAME} Durée des portions instrumentées de l'application",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{METRIC_NAME}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_sum{{span="{name}"}} {histogram.sum!r}')
+                lines.append(f'{METRIC_NAME}_count{{span="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Écrit les métriques (JSON si path se termine par .json, Prometheus sinon) de façon atomique"""
+        content = self.to_json() if str(path).endswith(".json") else self.to_prometheus()
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Registre du processus
+registry = MetricsRegistry()
+
+
+def _record(name, seconds, spans):
+    spans.append((name, seconds))
+    registry.observe(name, seconds)
+
+
+@contextmanager
+def _span(name, spans):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start, spans)
+
+
+def span(name):
+    """Contexte mesurant la portion de code sous le nom name (sans effet hors d'un enregistrement)"""
+    spans = _current_spans.get()
+    if spans is None:
+        return _NULL_SPAN
+    return _span(name, spans)
+
+
+def time_future(name, future):
+    """
+    Mesure une demande asynchrone (Future), de sa soumission à son résultat
+    La mesure est rattachée à la réexécution qui a soumis la demande
+    """
+    spans = _current_spans.get()
+    if spans is None or future is None:
+        return future
+    start = time.perf_counter()
+    future.add_done_callback(lambda _: _record(name, time.perf_counter() - start, spans))
+    return future
+
+
+@contextmanager
+def rerun(enabled=True, name="rerun"):
+    """
+    Enregistre les spans d'une réexécution ; retourne la liste des (nom, secondes)
+    La durée totale est ajoutée sous le nom name. Désactivé : liste vide, aucune mesure
+    """
+    if not enabled:
+        yield []
+        return
+    spans = []
+    token = _current_spans.set(spans)
+    try:
+        with _span(name, spans):
+            yield spans
+    finally:
+        _current_spans.reset(token)
+
+
+def profile_summary(stats, top=DEFAULT_PROFILE_TOP):
+    """Fonctions les plus coûteuses en temps propre : liste de dicts triée par tottime décroissant"""
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f"{function} ({os.path.basename(filename)}:{line})",
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        })
+    rows.sort(key=lambda row: row['tottime'], reverse=True)
+    return rows[:top]
+
+
+def _prune_profiles(directory, keep):
+    """Supprime les profils les plus anciens du répertoire au-delà des keep plus récents"""
+    paths = sorted((os.path.join(directory, name) for name in os.listdir(directory)
+                    if name.startswith("profile_") and name.endswith(".prof")), key=os.path.getmtime)
+    for path in paths[:max(0, len(paths) - keep)]:
+        os.remove(path)
+
+
+def _write_profile(profiler, directory, keep):
+    """Écrit le profil complet et applique la rétention ; retourne son chemin"""
+    os.makedirs(directory, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"profile_{timestamp}_{os.getpid()}_{threading.get_ident()}.prof")
+    profiler.dump_stats(path)
+    _prune_profiles(directory, keep)
+    return path
+
+
+@contextmanager
+def profile(directory=PROFILE_DIRECTORY, top=DEFAULT_PROFILE_TOP, keep=DEFAULT_PROFILE_KEEP):
+    """
+    Profile le bloc avec cProfile et écrit directory/profile_<date>_<pid>.prof
+    Produit un dict complété à la sortie : {'profiled', 'path', 'error', 'seconds', 'top'}
+    'profiled' reste False si un autre profil est déjà en cours dans le processus (le bloc
+    s'exécute alors normalement) ; si le fichier ne peut pas être écrit (disque plein, lecture
+    seule), 'path' reste None et 'error' décrit l'erreur, le résumé 'top' restant disponible
+    """
+    result = {'profiled': False, 'path': None, 'error': None, 'seconds': 0.0, 'top': []}
+    if not _profile_lock.acquire(blocking=False):
+        yield result
+        return
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result['profiled'] = True
+            result['seconds'] = time.perf_counter() - start
+            result['top'] = profile_summary(pstats.Stats(profiler), top)
+            try:
+                result['path'] = _write_profile(profiler, directory, keep)
+            except OSError as e:
+                result['error'] = str(e)
+    finally:
+        _profile_lock.release()